@@ -0,0 +1,48 @@
+"""
+Data reduction for the 2D wind tunnel test.
+
+Submodules are imported on first use (``DATA_ANALYSIS.cm_calculations``, ...), and none of
+them reads a file or imports pandas / matplotlib at import time, so importing a single
+function stays cheap. The sweeps of the original scripts still run as ``__main__``:
+
+    python DATA_ANALYSIS/cm_calculations.py
+    python -m DATA_ANALYSIS.cm_calculations
+"""
+import importlib
+
+__all__ = [
+    'airfoil_geometry',
+    'alpha_index',
+    'batch_reduce',
+    'benchmark_reduction',
+    'cm_calculations',
+    'cn_calculations',
+    'cp_report',
+    'ct_calculations',
+    'daq_replay',
+    'drag_wake_rake',
+    'freestream',
+    'live_run',
+    'near_flow',
+    'panel_solver',
+    'polar_features',
+    'profiling',
+    'quality_checks',
+    'run_archive',
+    'run_loader',
+    'run_statistics',
+    'slope_calculator',
+    'surface_integration',
+    'uncertainty',
+    'wall_corrections',
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
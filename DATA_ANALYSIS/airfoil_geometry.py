@@ -0,0 +1,255 @@
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import run_loader
+
+# Bump when the pickled representation changes
+GEOMETRY_VERSION = 2
+
+# Points of the dense contour table used to invert x(s) and for the arc length
+DENSE_POINTS = 4001
+
+# Built from the coordinates on first use (see AirfoilGeometry._build_contour)
+_CONTOUR_ATTRIBUTES = ('x_spline', 'z_spline', 's_dense', 'x_dense', 'z_dense', 'leading_edge_index',
+                       's_leading_edge', 'arc_dense')
+
+
+class AirfoilGeometry:
+    """
+    Airfoil contour as parametric cubic splines x(s), z(s), with per-tap lookups.
+
+    The contour runs like the coordinate files: from the trailing edge over the upper
+    surface to the leading edge and back over the lower surface, parametrized by the
+    cumulative chord length between the coordinate points. Slopes, normals and arc
+    lengths at a tap layout are computed once (tap_table) and kept with the object,
+    so a pickled geometry answers later lookups without touching the spline. The
+    splines and the dense contour table are only built when first needed.
+    """
+
+    def __init__(self, x_coords, z_coords, name=''):
+        x = np.asarray(x_coords, dtype=float)
+        z = np.asarray(z_coords, dtype=float)
+        step = np.hypot(np.diff(x), np.diff(z))
+        keep = np.concatenate([[True], step > 0])  # Repeated points would break the parametrization
+
+        self.name = name
+        self.x_coords = x[keep]
+        self.z_coords = z[keep]
+        self._tap_tables = {}
+        self._cache_entry = None  # (file_path, cache_dir, content_hash) of load_geometry
+
+    def __getattr__(self, name):
+        # Only called for attributes not set yet
+        if name not in _CONTOUR_ATTRIBUTES:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        self._build_contour()
+        return self.__dict__[name]
+
+    def _build_contour(self):
+        from scipy.interpolate import CubicSpline
+
+        s = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(self.x_coords), np.diff(self.z_coords)))])
+        self.x_spline = CubicSpline(s, self.x_coords)
+        self.z_spline = CubicSpline(s, self.z_coords)
+
+        # Dense table of the contour: leading edge and cumulative arc length
+        self.s_dense = np.linspace(0.0, s[-1], DENSE_POINTS)
+        self.x_dense = self.x_spline(self.s_dense)
+        self.z_dense = self.z_spline(self.s_dense)
+        self.leading_edge_index = int(np.argmin(self.x_dense))
+        self.s_leading_edge = self.s_dense[self.leading_edge_index]
+        speed = np.hypot(self.x_spline(self.s_dense, 1), self.z_spline(self.s_dense, 1))
+        self.arc_dense = np.concatenate([[0.0], np.cumsum(np.diff(self.s_dense) * (speed[1:] + speed[:-1]) / 2.0)])
+
+    def point(self, s):
+        """Contour coordinates (x, z) at parameter values s."""
+        return self.x_spline(s), self.z_spline(s)
+
+    def slope(self, s):
+        """Surface slope dz/dx at parameter values s."""
+        return self.z_spline(s, 1) / self.x_spline(s, 1)
+
+    def normal(self, s):
+        """Outward unit normals (n x 2) at parameter values s."""
+        dx = self.x_spline(s, 1)
+        dz = self.z_spline(s, 1)
+        length = np.hypot(dx, dz)
+        # The contour runs counter-clockwise, so the outward normal is the tangent turned clockwise
+        return np.column_stack([dz / length, -dx / length])
+
+    def arc_length(self, s):
+        """Arc length from the leading edge along the surface (positive on both surfaces)."""
+        return np.abs(np.interp(s, self.s_dense, self.arc_dense) - self.arc_dense[self.leading_edge_index])
+
+    def locate(self, tap_x, tap_z):
+        """
+        Contour parameter of every tap.
+
+        Taps with z > 0 are placed on the upper surface and taps with z < 0 on the lower
+        surface at their x position (two Newton steps on x(s) after a table lookup).
+        Taps on z = 0 (leading and trailing edge) take the nearest contour point.
+        """
+        tap_x = np.asarray(tap_x, dtype=float)
+        tap_z = np.asarray(tap_z, dtype=float)
+        le = self.leading_edge_index
+        s = np.full(len(tap_x), np.nan)
+
+        upper = tap_z > 0
+        lower = tap_z < 0
+        # Upper: x decreases from the trailing edge to the leading edge, lower: x increases
+        s[upper] = np.interp(tap_x[upper], self.x_dense[le::-1], self.s_dense[le::-1])
+        s[lower] = np.interp(tap_x[lower], self.x_dense[le:], self.s_dense[le:])
+        bounds = {True: (0.0, self.s_leading_edge), False: (self.s_leading_edge, self.s_dense[-1])}
+        for mask, is_upper in ((upper, True), (lower, False)):
+            for _ in range(2):
+                s[mask] -= (self.x_spline(s[mask]) - tap_x[mask]) / self.x_spline(s[mask], 1)
+                s[mask] = np.clip(s[mask], *bounds[is_upper])
+
+        edge = ~(upper | lower) & np.isfinite(tap_x)
+        if edge.any():
+            distance = np.hypot(self.x_dense[None, :] - tap_x[edge, None], self.z_dense[None, :] - tap_z[edge, None])
+            s[edge] = self.s_dense[np.argmin(distance, axis=1)]
+        return s
+
+    def tap_table(self, tap_x, tap_z):
+        """
+        Geometry at every pressure tap, computed once per tap layout.
+
+        A new table of a geometry from load_geometry is written back to its pickle.
+
+        Arguments:
+        tap_x, tap_z : array-like
+            Tap positions (x/c, z/c) in the order of the pressure columns.
+
+        Returns:
+        dict
+            's' (contour parameter), 'x', 'z' (surface point), 'slopes' (dz/dx), 'normals'
+            (n x 2, outward), 'arc_length' (from the leading edge) and the 'upper' and
+            'lower' masks (taps on z = 0 belong to neither, as in cn_calc/cm_calc).
+        """
+        tap_x = np.ascontiguousarray(tap_x, dtype=float)
+        tap_z = np.ascontiguousarray(tap_z, dtype=float)
+        key = (tap_x.tobytes(), tap_z.tobytes())
+        if key not in self._tap_tables:
+            s = self.locate(tap_x, tap_z)
+            valid = np.isfinite(s)
+            upper = valid & (tap_z > 0)
+            lower = valid & (tap_z < 0)
+            on_surface = upper | lower
+
+            x, z = np.full(len(s), np.nan), np.full(len(s), np.nan)
+            slopes = np.zeros(len(s))
+            normals = np.full((len(s), 2), np.nan)
+            arc_length = np.full(len(s), np.nan)
+            x[valid], z[valid] = self.point(s[valid])
+            slopes[on_surface] = self.slope(s[on_surface])
+            normals[valid] = self.normal(s[valid])
+            arc_length[valid] = self.arc_length(s[valid])
+            self._tap_tables[key] = {'s': s, 'x': x, 'z': z, 'slopes': slopes, 'normals': normals,
+                                     'arc_length': arc_length, 'upper': upper, 'lower': lower}
+            if self._cache_entry is not None:
+                save_geometry(self, *self._cache_entry)
+        return self._tap_tables[key]
+
+
+def read_coordinates(file_path):
+    """
+    Airfoil coordinates from AIRFOIL_COORDINATES.xlsx or an XFOIL .dat file (name line, then x z pairs).
+
+    Returns:
+    tuple
+        (name, x, z).
+    """
+    if file_path.lower().endswith(('.xlsx', '.xls')):
+        x, z = run_loader.load_airfoil_geometry(file_path)
+        return os.path.splitext(os.path.basename(file_path))[0], x, z
+    with open(file_path) as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    values = np.array(' '.join(lines[1:]).split(), dtype=float).reshape(-1, 2)
+    return lines[0].strip(), values[:, 0], values[:, 1]
+
+
+def load_geometry(file_path, cache_dir=None):
+    """
+    Build the AirfoilGeometry of a coordinate file, or load it from its pickle.
+
+    The pickle sits in the run_loader cache directory and is validated against the
+    file's mtime/size and content hash, like the parse cache. It holds plain arrays
+    (coordinates and tap tables), not the class, so it loads the same whether the
+    module was imported as part of the package or run as a script. Tap tables
+    computed after loading are written back, so a later process loading the pickle
+    gets them without building the splines.
+
+    Returns:
+    AirfoilGeometry
+    """
+    cache_path = _geometry_path(file_path, cache_dir)
+    signature = run_loader.file_signature(file_path)
+    content_hash = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                version, cached_signature, cached_hash, state = pickle.load(f)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            version = None
+        if version == GEOMETRY_VERSION:
+            geometry = AirfoilGeometry(state['x'], state['z'], state['name'])
+            geometry._tap_tables.update(state['tap_tables'])
+            geometry._cache_entry = (file_path, cache_dir, cached_hash)
+            if cached_signature == signature:
+                return geometry
+            content_hash = run_loader.file_hash(file_path)
+            if content_hash == cached_hash:
+                save_geometry(geometry, file_path, cache_dir, content_hash)
+                return geometry
+
+    name, x, z = read_coordinates(file_path)
+    geometry = AirfoilGeometry(x, z, name)
+    geometry._cache_entry = (file_path, cache_dir, content_hash or run_loader.file_hash(file_path))
+    save_geometry(geometry, *geometry._cache_entry)
+    return geometry
+
+
+def save_geometry(geometry, file_path, cache_dir=None, content_hash=None):
+    """Pickle a geometry (with the tap tables computed so far) as the cache entry of its coordinate file."""
+    cache_path = _geometry_path(file_path, cache_dir)
+    content_hash = content_hash or run_loader.file_hash(file_path)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        state = {'name': geometry.name, 'x': geometry.x_coords, 'z': geometry.z_coords,
+                 'tap_tables': geometry._tap_tables}
+        pickle.dump((GEOMETRY_VERSION, run_loader.file_signature(file_path), content_hash, state), f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+def _geometry_path(file_path, cache_dir):
+    cache_dir = run_loader.CACHE_DIR if cache_dir is None else cache_dir
+    key = hashlib.sha1(f"geometry|{os.path.abspath(file_path)}".encode()).hexdigest()[:20]
+    return os.path.join(cache_dir, f"geometry_{key}.pkl")
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the surface geometry at every pressure tap.")
+    parser.add_argument('airfoil', nargs='?', default='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx',
+                        help="AIRFOIL_COORDINATES.xlsx or an XFOIL .dat file")
+    parser.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet")
+    args = parser.parse_args()
+
+    geometry = load_geometry(args.airfoil)
+    tap_geometry = run_loader.load_tap_geometry(args.taps)
+    table = geometry.tap_table(tap_geometry['tap_x'], tap_geometry['tap_z'])
+    for i, name in enumerate(tap_geometry['tap_names']):
+        print(f"{name}: x/c = {table['x'][i]:.5f}, z/c = {table['z'][i]:+.5f}, dz/dx = {table['slopes'][i]:+.5f}, "
+              f"normal = ({table['normals'][i, 0]:+.4f}, {table['normals'][i, 1]:+.4f}), s = {table['arc_length'][i]:.5f}")
@@ -0,0 +1,76 @@
+import numpy as np
+
+ALPHA_TOLERANCE = 0.05  # Degrees; recorded angles this close to a requested one count as a match
+
+
+class AlphaIndex:
+    """
+    Sorted index over the angle-of-attack column of a run, for row lookups in O(log n).
+
+    Every query returns row positions into the run's pressure matrix. Where an angle
+    was recorded more than once (hysteresis branches, repeated sweeps) the lookups
+    return the first recorded row, like the original equality scans; all_rows and
+    rows_between return every row.
+    """
+
+    def __init__(self, alpha):
+        self.alpha = np.asarray(alpha, dtype=float)
+        self.order = np.argsort(self.alpha, kind='stable')  # Equal angles keep their recorded order
+        self.sorted_alpha = self.alpha[self.order]
+
+    def __len__(self):
+        return len(self.alpha)
+
+    def nearest(self, angles):
+        """
+        Row of the recorded angle closest to each requested angle (first recorded row on ties).
+
+        Returns:
+        np.ndarray
+            Integer row positions, one per requested angle (-1 for NaN or an empty run).
+        """
+        angles = np.atleast_1d(np.asarray(angles, dtype=float))
+        if not len(self.sorted_alpha):
+            return np.full(len(angles), -1)
+        right = np.clip(np.searchsorted(self.sorted_alpha, angles), 0, len(self.sorted_alpha) - 1)
+        left = np.maximum(right - 1, 0)
+        use_left = np.abs(angles - self.sorted_alpha[left]) <= np.abs(self.sorted_alpha[right] - angles)
+        closest = self.sorted_alpha[np.where(use_left, left, right)]
+        # First entry of the run of equal angles, i.e. the first recorded row with that angle
+        rows = self.order[np.searchsorted(self.sorted_alpha, closest, side='left')]
+        return np.where(np.isnan(angles), -1, rows)
+
+    def find(self, angles, tolerance=ALPHA_TOLERANCE):
+        """
+        Row of the closest recorded angle within tolerance of each requested angle, or -1.
+
+        tolerance=0 reproduces an exact float comparison.
+        """
+        angles = np.atleast_1d(np.asarray(angles, dtype=float))
+        rows = self.nearest(angles)
+        found = rows >= 0
+        found[found] = np.abs(self.alpha[rows[found]] - angles[found]) <= tolerance
+        return np.where(found, rows, -1)
+
+    def rows_between(self, low, high):
+        """All rows with low <= alpha <= high, ordered by angle (recorded order among equal angles)."""
+        start = np.searchsorted(self.sorted_alpha, low, side='left')
+        stop = np.searchsorted(self.sorted_alpha, high, side='right')
+        return self.order[start:stop]
+
+    def all_rows(self, angle, tolerance=ALPHA_TOLERANCE):
+        """All rows within tolerance of one angle, in recorded order."""
+        return np.sort(self.rows_between(angle - tolerance, angle + tolerance))
+
+
+# Indexes of the angle columns seen by this process, keyed by their contents
+_indexes = {}
+
+
+def get_alpha_index(alpha):
+    """AlphaIndex of an angle column, built once per distinct column."""
+    alpha = np.ascontiguousarray(alpha, dtype=float)
+    key = alpha.tobytes()
+    if key not in _indexes:
+        _indexes[key] = AlphaIndex(alpha)
+    return _indexes[key]
@@ -0,0 +1,330 @@
+import argparse
+import csv
+import glob
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import profiling, run_archive, run_loader
+from .airfoil_geometry import load_geometry
+from .ct_calculations import ct_batch, geometry_slope_table
+from .drag_wake_rake import align_profiles, load_wake_profiles, probe_map, profile_drag, run_drag
+from .freestream import chord, load_freestream, run_freestream
+from .quality_checks import check_run, load_reference
+from .surface_integration import (integrate_cn_cm, interpolate_bad_taps, lift_drag_coefficients,
+                                  pressure_coefficients, surface_weights)
+from .wall_corrections import correct_polar, quarter_chord_moment, shape_factor
+
+POLAR_COLUMNS = ['alpha', 'cn', 'cm', 'ct', 'cl', 'cd_pressure', 'drag', 'cd_wake', 'q_inf', 'U_inf', 're',
+                 'bad_taps']
+# Written as well when the wall corrections are applied (see wall_corrections.py)
+CORRECTED_COLUMNS = ['alpha_corrected', 'cl_corrected', 'cd_pressure_corrected', 'cd_wake_corrected',
+                     'cm_c4_corrected', 're_corrected']
+
+# Physical drag coefficients; values outside are failed drag measurements
+VALID_CD_RANGE = (0.0, 0.5)
+
+logger = logging.getLogger(__name__)
+
+# Geometry shared by every task of a worker process, set once by _init_worker
+_shared = {}
+
+
+def find_run_files(patterns):
+    """
+    Expand directories and glob patterns into a sorted list of run files / archive entries.
+
+    A directory that is not itself an archive entry contributes its *.txt files and *.run entries.
+    """
+    run_files = set()
+    for pattern in patterns:
+        for path in glob.glob(pattern) or [pattern]:
+            if os.path.isdir(path) and not run_archive.is_archive_entry(path):
+                run_files.update(glob.glob(os.path.join(path, '*.txt')))
+                run_files.update(run_archive.list_entries(path, kind='run'))
+            elif os.path.exists(path):
+                run_files.add(path)
+    return sorted(run_files)
+
+
+def build_shared_geometry(tap_file, airfoil_file):
+    """
+    Tap positions and weights, the wake-rake probe map, the C_T slope table and the body
+    shape factor, computed once in the parent process.
+    """
+    tap_geometry = run_loader.load_tap_geometry(tap_file)
+    geometry = load_geometry(airfoil_file)
+    return {
+        'tap_x': tap_geometry['tap_x'],
+        'probes': probe_map(tap_geometry),
+        'weights': surface_weights(tap_geometry['tap_x'], tap_geometry['tap_z']),
+        'slope_table': geometry_slope_table(geometry, tap_geometry['tap_x'], tap_geometry['tap_z']),
+        'shape_factor': shape_factor(geometry.x_coords, geometry.z_coords),
+    }
+
+
+def _init_worker(shared):
+    _shared.update(shared)
+    profiling.init_worker(shared.get('trace', False))
+
+
+def _wake_file(pattern, run_file):
+    # '{stem}' in a wake pattern is replaced by the run file name without extension
+    if pattern is None:
+        return None
+    stem = os.path.splitext(os.path.basename(run_file.rstrip('/\\')))[0]
+    path = pattern.format(stem=stem)
+    return path if os.path.exists(path) else None
+
+
+@profiling.traced('reduce_run')
+def reduce_run(run_file, q_inf=None, chord=chord, wake_velocities=None, wake_pressures=None, tunnel_height=None,
+               max_bad_fraction=None, wake_rake=False):
+    """
+    Reduce one run to a polar table using the geometry shared with this worker.
+
+    Every row is reduced with its own freestream conditions, computed from the
+    Delta_Pb, P_bar and T columns (see freestream.py). A fixed q_inf overrides the
+    dynamic pressure; the wake drag then uses the recorded rho of every row.
+
+    The wake drag comes from the wake workbooks when both are given, against the
+    freestream at the edges of the profiles (see drag_wake_rake.profile_drag), or with
+    wake_rake straight from the rake and pitot ports of the run itself (see
+    drag_wake_rake.run_drag; rows without rake readings stay NaN). Without either the
+    wake columns are NaN.
+
+    Readings flagged by quality_checks.check_run (against the shared reference run, if
+    any) are replaced by interpolation between the good taps of the same surface before
+    integrating; 'bad_taps' counts them per row. A run with more than max_bad_fraction of
+    its readings flagged is rejected with a ValueError.
+
+    With a tunnel height the wall corrections are applied to the whole polar as a last
+    step, with the wake blockage from one drag source for the whole polar (see blockage_drag).
+
+    Returns:
+    dict
+        One array per entry of POLAR_COLUMNS (the wake columns are NaN without wake data
+        and on rows whose wake C_d is outside VALID_CD_RANGE), plus CORRECTED_COLUMNS if a
+        tunnel height was given.
+    """
+    if run_archive.is_archive_entry(run_file):
+        run = run_archive.open_entry(run_file)
+        conditions = run_freestream(run, chord)
+    else:
+        run = run_loader.load_run(run_file)
+        conditions = load_freestream(run_file, chord)
+    alpha = np.asarray(run['alpha'], dtype=float)
+    if q_inf is not None:
+        conditions = dict(conditions, q_inf=np.full(len(alpha), q_inf))
+
+    pressures = run['pressures'][:, :run_loader.SURFACE_TAPS]
+    profiling.count('runs')
+    profiling.count('rows', pressures.shape[0])
+    profiling.count('taps', pressures.size)
+    quality = check_run(pressures, conditions['q_inf'], _shared['tap_x'], alpha, _shared.get('reference'))
+    bad = quality['bad']
+    if max_bad_fraction is not None and bad.mean() > max_bad_fraction:
+        raise ValueError(f"{bad.mean():.1%} of the readings flagged {quality['counts']}")
+
+    cp = interpolate_bad_taps(pressure_coefficients(pressures, conditions['q_inf']), bad, _shared['tap_x'])
+    coefficients = integrate_cn_cm(cp, _shared['weights'])
+    ct = ct_batch(cp, _shared['slope_table'])
+    cl, cd_pressure = lift_drag_coefficients(coefficients['cn'], ct, alpha)
+
+    if wake_velocities is not None and wake_pressures is not None:
+        profiles = align_profiles(load_wake_profiles(wake_velocities), load_wake_profiles(wake_pressures), alpha)
+        wake = profile_drag(profiles, conditions['rho'] if q_inf is None else run['rho'], conditions['q_inf'], chord)
+    elif wake_rake:
+        wake = run_drag(run, _shared['probes'], conditions['rho'] if q_inf is None else None, conditions['q_inf'], chord)
+    else:
+        wake = {'drag': np.full(len(alpha), np.nan), 'cd': np.full(len(alpha), np.nan)}
+    drag, cd_wake = wake['drag'], wake['cd']
+    outside = (cd_wake < VALID_CD_RANGE[0]) | (cd_wake > VALID_CD_RANGE[1])
+    if outside.any():
+        logger.warning("%s: wake C_d outside [%g, %g] on %d rows (%s), written as NaN", run_file, *VALID_CD_RANGE,
+                       np.count_nonzero(outside), ', '.join(f"{value:.3f}" for value in cd_wake[outside]))
+        drag = np.where(outside, np.nan, drag)
+        cd_wake = np.where(outside, np.nan, cd_wake)
+
+    polar = {'alpha': alpha, 'cn': coefficients['cn'], 'cm': coefficients['cm'], 'ct': ct, 'cl': cl,
+             'cd_pressure': cd_pressure, 'drag': drag, 'cd_wake': cd_wake, 'q_inf': conditions['q_inf'],
+             'U_inf': conditions['U_inf'], 're': conditions['re'], 'bad_taps': bad.sum(axis=1)}
+
+    if tunnel_height is not None:
+        cd_total = blockage_drag(cd_pressure, cd_wake, run_file)
+        corrected = correct_polar(alpha, cl, cd_total, quarter_chord_moment(coefficients['cm'], coefficients['cn']),
+                                  chord, tunnel_height, _shared['shape_factor'], extra_cd=(cd_pressure, cd_wake))
+        polar.update({
+            'alpha_corrected': corrected['alpha'],
+            'cl_corrected': corrected['cl'],
+            'cd_pressure_corrected': corrected['extra_cd'][0],
+            'cd_wake_corrected': corrected['extra_cd'][1],
+            'cm_c4_corrected': corrected['cm_c4'],
+            're_corrected': conditions['re'] * corrected['velocity_factor'],
+        })
+    return polar
+
+
+def blockage_drag(cd_pressure, cd_wake, run_file=''):
+    """
+    Drag coefficients for the wake blockage of a polar, all from the same source.
+
+    The wake drag is used when every row has one within VALID_CD_RANGE, else the
+    pressure drag of every row: mixing the two row by row makes the corrected lift jump
+    between neighbouring angles. Values of the chosen source outside the range are
+    clipped to it with a warning instead of being passed on to the wall corrections.
+
+    Arguments:
+    cd_pressure, cd_wake : array-like
+        Pressure and wake drag coefficients, one per row (cd_wake NaN without wake data).
+    run_file : str
+        Run named in the warnings.
+
+    Returns:
+    ndarray
+        Drag coefficients for wall_corrections.correct_polar.
+    """
+    cd_pressure = np.asarray(cd_pressure, dtype=float)
+    cd_wake = np.asarray(cd_wake, dtype=float)
+    low, high = VALID_CD_RANGE
+    wake_valid = (cd_wake >= low) & (cd_wake <= high)
+    if wake_valid.all():
+        return cd_wake
+    if np.isfinite(cd_wake).any():
+        logger.warning("%s: wake C_d missing or outside [%g, %g] on %d of %d rows, "
+                       "using the pressure drag for the wake blockage", run_file, low, high,
+                       np.count_nonzero(~wake_valid), len(cd_wake))
+    outside = (cd_pressure < low) | (cd_pressure > high)
+    if outside.any():
+        logger.warning("%s: pressure C_d outside [%g, %g] on %d rows (%s), clipped for the wake blockage",
+                       run_file, low, high, np.count_nonzero(outside),
+                       ', '.join(f"{value:.3f}" for value in cd_pressure[outside]))
+    return np.clip(cd_pressure, low, high)
+
+
+def write_polar(polar, file_path):
+    """Write a polar table (see reduce_run) as CSV."""
+    columns = [name for name in POLAR_COLUMNS + CORRECTED_COLUMNS if name in polar]
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in zip(*(polar[name] for name in columns)):
+            writer.writerow([f"{value:.10g}" for value in row])
+
+
+def _reduce_task(run_file, out_dir, q_inf, chord, velocity_pattern, pressure_pattern, tunnel_height, max_bad_fraction,
+                 wake_rake):
+    polar = reduce_run(run_file, q_inf, chord, _wake_file(velocity_pattern, run_file),
+                       _wake_file(pressure_pattern, run_file), tunnel_height, max_bad_fraction, wake_rake)
+    stem = os.path.splitext(os.path.basename(run_file.rstrip('/\\')))[0]
+    out_path = os.path.join(out_dir, f"{stem}_polar.csv")
+    write_polar(polar, out_path)
+    # Spans recorded in this worker travel back with the result (see profiling.merge)
+    return out_path, len(polar['alpha']), profiling.drain() if profiling.is_enabled() else None
+
+
+def reduce_runs(run_files, out_dir, tap_file='DATA_ANALYSIS/PPS.xlsx',
+                airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx', q_inf=None, chord=chord,
+                wake_velocities=None, wake_pressures=None, workers=None, tunnel_height=None, shape_factor=None,
+                reference=None, max_bad_fraction=None, wake_rake=False):
+    """
+    Reduce many runs in parallel, one run per worker task.
+
+    The tap geometry and slope table are built once here and handed to each worker
+    process when it starts, not reloaded per run. While profiling is enabled the
+    workers record their stages too and send them back with each result.
+
+    Arguments:
+    run_files : list
+        Run files or archive entries.
+    out_dir : str
+        Directory for the '<run>_polar.csv' tables.
+    q_inf : float or None
+        Fixed dynamic pressure (Pa) instead of the per-row freestream conditions.
+    wake_velocities, wake_pressures : str or None
+        Wake workbooks; '{stem}' is replaced by each run's file name without extension.
+    workers : int or None
+        Number of worker processes (default: one per CPU).
+    tunnel_height : float or None
+        Test-section height (m); when given the wall corrections are applied.
+    shape_factor : float or None
+        Body shape factor for the solid blockage (default: computed from the airfoil coordinates).
+    reference : str or None
+        Known-good run file; readings that deviate from it are flagged as bad.
+    max_bad_fraction : float or None
+        Reject runs with a larger fraction of flagged readings.
+    wake_rake : bool
+        Without workbooks, compute the wake drag from the rake ports of each run (else NaN).
+
+    Yields:
+    tuple
+        (run_file, polar file or exception, number of rows) as runs finish.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    shared = build_shared_geometry(tap_file, airfoil_file)
+    if shape_factor is not None:
+        shared['shape_factor'] = shape_factor
+    if reference is not None:
+        shared['reference'] = load_reference(reference, q_inf)
+    shared['trace'] = profiling.is_enabled()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as executor:
+        futures = {executor.submit(_reduce_task, run_file, out_dir, q_inf, chord, wake_velocities, wake_pressures,
+                                   tunnel_height, max_bad_fraction, wake_rake): run_file
+                   for run_file in run_files}
+        for future in as_completed(futures):
+            try:
+                out_path, n_rows, trace = future.result()
+                if trace is not None:
+                    profiling.merge(*trace)
+                yield futures[future], out_path, n_rows
+            except Exception as e:
+                yield futures[future], e, 0
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reduce a batch of tunnel runs to polar tables in parallel.")
+    parser.add_argument('runs', nargs='+', help="Run files, archive entries, directories or glob patterns")
+    parser.add_argument('--out', default='polars', help="Output directory for the polar tables")
+    parser.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet")
+    parser.add_argument('--airfoil', default='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx', help="Airfoil coordinates (xlsx or XFOIL .dat)")
+    parser.add_argument('--q-inf', type=float, default=None,
+                        help="Fixed free-stream dynamic pressure (Pa), default: per row from Delta_Pb")
+    parser.add_argument('--chord', type=float, default=chord, help="Model chord (m)")
+    parser.add_argument('--wake-velocities', default=None,
+                        help="Wake velocity workbook, '{stem}' is replaced by the run name")
+    parser.add_argument('--wake-pressures', default=None,
+                        help="Wake pressure workbook, '{stem}' is replaced by the run name")
+    parser.add_argument('--wake-rake', action='store_true',
+                        help="Without workbooks, compute the wake drag from the rake ports of the run file")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument('--tunnel-height', type=float, default=None,
+                        help="Test-section height (m); applies the wall corrections")
+    parser.add_argument('--shape-factor', type=float, default=None,
+                        help="Body shape factor for the solid blockage (default: from the airfoil coordinates)")
+    parser.add_argument('--reference', default=None,
+                        help="Known-good run; readings deviating from it are treated as bad taps")
+    parser.add_argument('--max-bad-fraction', type=float, default=None,
+                        help="Reject runs with a larger fraction of flagged readings (0 - 1)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start(args)
+
+    run_files = find_run_files(args.runs)
+    print(f"Reducing {len(run_files)} runs")
+    for run_file, result, n_rows in reduce_runs(run_files, args.out, args.taps, args.airfoil, args.q_inf, args.chord,
+                                                 args.wake_velocities, args.wake_pressures, args.workers,
+                                                 args.tunnel_height, args.shape_factor, args.reference,
+                                                 args.max_bad_fraction, args.wake_rake):
+        if isinstance(result, Exception):
+            print(f"Error: {run_file}: {result}")
+        else:
+            print(f"{run_file}: {n_rows} rows -> {result}")
+    profiling.finish(args)
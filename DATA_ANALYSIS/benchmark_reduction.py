@@ -0,0 +1,368 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import cn_calculations, drag_wake_rake, run_loader
+from .airfoil_geometry import AirfoilGeometry
+from .cm_calculations import cm_calc
+from .cn_calculations import cn_calc
+from .ct_calculations import (build_slope_table, calculate_slope, ct_batch, ct_calc, geometry_slope_table,
+                              split_airfoil_surfaces)
+from .drag_wake_rake import align_profiles, calculate_drag, load_default_profiles, profile_drag, wake_drag
+from .freestream import freestream_conditions, row_conditions, row_dynamic_pressure
+from .surface_integration import integrate_cn_cm, pressure_coefficients, surface_weights
+
+# Constants of the synthetic run and the original reduction scripts
+q_inf = 335.7613443  # Free-stream dynamic pressure (Pa)
+rho = 1.181615446  # Air density (kg/m^3)
+U_inf = 23.8392323  # Freestream velocity (m/s)
+p_inf = 99831.30769  # Freestream pressure (Pa)
+
+# np.trapz was renamed to np.trapezoid in NumPy 2
+_trapz = getattr(np, 'trapz', None) or np.trapezoid
+
+
+# Synthetic data -------------------------------------------------------------
+
+def synthetic_geometry(n_taps=49, n_points=180):
+    """
+    Airfoil coordinates and a tap layout of any size, shaped like the SD6060 set-up.
+
+    Taps run from the leading edge to the trailing edge over the upper surface, then again
+    over the lower surface, with the edge taps on z = 0 (the PPS.xlsx layout).
+    """
+    def thickness(x):
+        return 0.6 * (0.2969 * np.sqrt(x) - 0.126 * x - 0.3516 * x ** 2 + 0.2843 * x ** 3 - 0.1036 * x ** 4)
+
+    beta = np.linspace(0.0, np.pi, n_points // 2 + 1)
+    x_surface = 0.5 * (1.0 - np.cos(beta))
+    camber = 0.03 * np.sin(np.pi * x_surface)
+    x_coords = np.concatenate([x_surface[::-1], x_surface[1:]])
+    z_coords = np.concatenate([(camber + thickness(x_surface))[::-1], (camber - thickness(x_surface))[1:]])
+
+    n_upper = n_taps // 2 + n_taps % 2
+    n_lower = n_taps - n_upper
+    tap_upper = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, n_upper)))
+    tap_lower = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, n_lower)))
+    tap_x = np.concatenate([tap_upper, tap_lower])
+    tap_z = np.concatenate([0.03 * np.sin(np.pi * tap_upper) + thickness(tap_upper),
+                            0.03 * np.sin(np.pi * tap_lower) - thickness(tap_lower)])
+    tap_z[[0, n_upper - 1, n_upper, n_taps - 1]] = 0.0  # Leading/trailing-edge taps
+    return x_coords, z_coords, tap_x, tap_z
+
+
+def synthetic_run(n_alpha=30, n_taps=49, n_probes=47, seed=0):
+    """
+    Random-but-plausible run of the requested size.
+
+    Returns:
+    dict
+        'alpha', 'pressures' (n_alpha x n_taps), 'x_coords', 'z_coords', 'tap_x', 'tap_z'
+        and aligned wake 'velocities', 'wake_pressures' (n_alpha x n_probes) with 'locations'.
+    """
+    rng = np.random.default_rng(seed)
+    x_coords, z_coords, tap_x, tap_z = synthetic_geometry(n_taps)
+    alpha = np.linspace(-6.0, 16.0, n_alpha)
+
+    suction = np.where(tap_z > 0, -1.0, 0.4) * np.exp(-4.0 * tap_x)
+    pressures = q_inf * (alpha[:, None] / 10.0 * suction[None, :] + 0.05 * rng.standard_normal((n_alpha, n_taps)))
+
+    locations = np.linspace(0.0, 0.219, n_probes)
+    deficit = np.exp(-((locations - 0.11) / 0.02) ** 2)
+    velocities = 25.0 - (2.0 + 0.3 * np.abs(alpha))[:, None] * deficit[None, :]
+    wake_pressures = 99500.0 + rng.standard_normal((n_alpha, n_probes))
+    return {'alpha': alpha, 'pressures': pressures, 'x_coords': x_coords, 'z_coords': z_coords,
+            'tap_x': tap_x, 'tap_z': tap_z, 'velocities': velocities + 0.01 * rng.standard_normal(velocities.shape),
+            'wake_pressures': wake_pressures, 'locations': locations}
+
+
+def write_run_file(file_path, alpha, pressures):
+    """Write pressures in the raw_2d.txt layout (surface taps first, remaining ports zero)."""
+    n_rows, n_taps = pressures.shape
+    ports = np.zeros((n_rows, max(run_loader.N_PORTS, n_taps)))
+    ports[:, :n_taps] = pressures
+    names = [f"P{i + 1:03d}" for i in range(ports.shape[1])]
+    with open(file_path, 'w') as f:
+        f.write('\t'.join(['Run_nr', 'Time', 'Alpha', 'Delta_Pb', 'P_bar', 'T', 'rpm', 'rho'] + names) + '\n')
+        f.write('\t'.join(['/', 'H:M:S', 'degrees', 'Pa', 'Pa', 'degr._C', '1/min', 'kg/m^3'] + ['Pa'] * len(names)) + '\n')
+        for row in range(n_rows):
+            fields = [f"{row + 1}", "10:00:00", f"{alpha[row]:.3f}", "173.56", "998.43", "20.09", "999.79", "1.186"]
+            f.write('\t'.join(fields + [f"{p:.2f}" for p in ports[row]]) + '\n')
+
+
+# Per-row reference implementations (the pre-batch reduction loops) ----------
+
+def legacy_cn_cm(cp, tap_x, tap_z):
+    cn = np.empty(len(cp))
+    cm = np.empty(len(cp))
+    for row, cp_values in enumerate(cp):
+        cp_u = np.where(tap_z > 0, cp_values, 0)
+        cp_l = np.where(tap_z < 0, cp_values, 0)
+        cn[row] = _trapz(cp_l, tap_x) - _trapz(cp_u, tap_x)
+        cm[row] = _trapz(cp_u * tap_x, tap_x) - _trapz(cp_l * tap_x, tap_x)
+    return cn, cm
+
+
+def legacy_ct(cp, x_coords, z_coords, tap_x, tap_z):
+    ct = np.empty(len(cp))
+    for row, cp_values in enumerate(cp):
+        x_upper, z_upper, x_lower, z_lower = split_airfoil_surfaces(x_coords, z_coords)
+        x_up, x_low, integrand_upper, integrand_lower = [], [], [], []
+        for i, x in enumerate(tap_x):
+            if tap_z[i] > 0:
+                integrand_upper.append(cp_values[i] * calculate_slope(x_upper, z_upper, x))
+                x_up.append(x)
+            elif tap_z[i] < 0:
+                integrand_lower.append(cp_values[i] * calculate_slope(x_lower, z_lower, x))
+                x_low.append(x)
+        ct[row] = _trapz(integrand_lower, x_low) - _trapz(integrand_upper, x_up)
+    return ct
+
+
+def legacy_drag(velocities, pressures, locations, rho=rho, U_inf=U_inf, p_inf=p_inf):
+    drag = np.empty(len(velocities))
+    for row in range(len(velocities)):
+        total_drag = 0
+        for i in range(len(locations) - 1):
+            start_idx = np.abs(np.array(locations) - locations[i]).argmin()
+            end_idx = np.abs(np.array(locations) - locations[i + 1]).argmin()
+            U_avg = (float(velocities[row, start_idx]) + float(velocities[row, end_idx])) / 2
+            p_avg = (float(pressures[row, start_idx]) + float(pressures[row, end_idx])) / 2
+            dy = locations[i + 1] - locations[i]
+            total_drag += rho * (U_inf - U_avg) * U_avg * dy + (p_inf - p_avg) * dy
+        drag[row] = total_drag
+    return drag
+
+
+# Timing ----------------------------------------------------------------------
+
+def best_time(function, repeat=5):
+    """Fastest of `repeat` runs, in seconds."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(n_alpha=30, n_taps=49, n_probes=47, repeat=5, legacy=True):
+    """
+    Time every reduction stage on a synthetic run.
+
+    Returns:
+    dict
+        Stage name -> {'batch': seconds, 'legacy': seconds (if timed)}.
+    """
+    data = synthetic_run(n_alpha, n_taps, n_probes)
+    cp = pressure_coefficients(data['pressures'], q_inf)
+    timings = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_file = os.path.join(tmp_dir, 'synthetic_run.txt')
+        write_run_file(run_file, data['alpha'], data['pressures'])
+        timings['load'] = {
+            'parse': best_time(lambda: run_loader.parse_run_file(run_file), repeat),
+            'cached': best_time(lambda: run_loader.load_run(run_file, cache_dir=tmp_dir), repeat),
+        }
+
+    delta_pb = np.full(n_alpha, 173.0)
+    p_bar = np.full(n_alpha, 998.4)
+    temperature = np.linspace(20.0, 22.0, n_alpha)
+    per_row_q = freestream_conditions(delta_pb, p_bar, temperature)['q_inf']
+    timings['freestream'] = {'batch': best_time(lambda: freestream_conditions(delta_pb, p_bar, temperature), repeat)}
+    timings['cp'] = {
+        'batch': best_time(lambda: pressure_coefficients(data['pressures'], q_inf), repeat),
+        'per_row_q': best_time(lambda: pressure_coefficients(data['pressures'], per_row_q), repeat),
+    }
+
+    weights = surface_weights(data['tap_x'], data['tap_z'])
+    timings['cn_cm'] = {'batch': best_time(lambda: integrate_cn_cm(cp, weights), repeat)}
+
+    slope_table = build_slope_table(data['x_coords'], data['z_coords'], data['tap_x'], data['tap_z'])
+    timings['ct'] = {
+        'slope_table': best_time(lambda: build_slope_table(data['x_coords'], data['z_coords'],
+                                                           data['tap_x'], data['tap_z']), repeat),
+        'spline_table': best_time(lambda: geometry_slope_table(AirfoilGeometry(data['x_coords'], data['z_coords']),
+                                                               data['tap_x'], data['tap_z']), repeat),
+        'batch': best_time(lambda: ct_batch(cp, slope_table), repeat),
+    }
+
+    timings['drag'] = {'batch': best_time(lambda: wake_drag(data['velocities'], data['wake_pressures'],
+                                                            data['locations'], rho, U_inf, p_inf), repeat)}
+
+    if legacy:
+        legacy_repeat = max(1, repeat // 5)
+        timings['cn_cm']['legacy'] = best_time(lambda: legacy_cn_cm(cp, data['tap_x'], data['tap_z']), legacy_repeat)
+        timings['ct']['legacy'] = best_time(lambda: legacy_ct(cp, data['x_coords'], data['z_coords'],
+                                                              data['tap_x'], data['tap_z']), legacy_repeat)
+        timings['drag']['legacy'] = best_time(lambda: legacy_drag(data['velocities'], data['wake_pressures'],
+                                                                  data['locations']), legacy_repeat)
+    return timings
+
+
+# The per-angle script functions on the real run -----------------------------
+
+def script_inputs(airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx'):
+    """
+    Inputs of the per-angle functions, from the run, tap sheet and wake workbooks the scripts are set up for.
+
+    Returns:
+    dict
+        'data' (run_loader.load_surface_run), 'angles' (distinct angles of attack of the run), 'rows' (first row
+        of each angle), 'cp' (n_rows x SURFACE_TAPS at the recorded q_inf), 'x_coords', 'z_coords' and, if the
+        wake workbooks exist, the aligned wake 'profiles'.
+    """
+    data = run_loader.load_surface_run(cn_calculations.pressure_file, cn_calculations.sensor_file)
+    rows = np.arange(len(data['angles_of_attack']))
+    angles, first_rows = np.unique(data['angles_of_attack'], return_index=True)
+    x_coords, z_coords = run_loader.load_airfoil_geometry(airfoil_file)
+    inputs = {'data': data, 'angles': angles, 'rows': first_rows, 'x_coords': x_coords, 'z_coords': z_coords,
+              'cp': pressure_coefficients(data['pressure_values'], row_dynamic_pressure(data, rows)[:, None])}
+    if os.path.exists(drag_wake_rake.velocity_file) and os.path.exists(drag_wake_rake.pressure_file):
+        inputs['profiles'] = align_profiles(*load_default_profiles())
+    return inputs
+
+
+def script_sweeps(inputs):
+    """Sweeps of cn_calc, cm_calc, ct_calc and calculate_drag over the run, each returning one value per angle."""
+    data = inputs['data']
+    sweeps = {
+        'cn_calc': lambda: np.array([cn_calc(angle) for angle in inputs['angles']], dtype=float),
+        'cm_calc': lambda: np.array([cm_calc(angle) for angle in inputs['angles']], dtype=float),
+        'ct_calc': lambda: np.array([ct_calc(data['angles_of_attack'][row], inputs['cp'][row], inputs['x_coords'],
+                                             inputs['z_coords'], data['sensor_positions'],
+                                             data['sensor_positions_y']) for row in inputs['rows']]),
+    }
+    if 'profiles' in inputs:
+        sweeps['calculate_drag'] = lambda: np.array([calculate_drag(aoa) for aoa in inputs['profiles']['aoa']])
+    return sweeps
+
+
+def benchmark_scripts(repeat=5, airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx'):
+    """
+    Time a sweep of each per-angle function over the recorded run, after a first call has loaded the files.
+
+    Returns:
+    dict
+        Function name -> {'sweep': seconds, 'per_angle': seconds}.
+    """
+    inputs = script_inputs(airfoil_file)
+    timings = {}
+    for name, sweep in script_sweeps(inputs).items():
+        n_angles = len(sweep())
+        seconds = best_time(sweep, repeat)
+        timings[name] = {'sweep': seconds, 'per_angle': seconds / n_angles}
+    return timings
+
+
+# Agreement on the real run ---------------------------------------------------
+
+def check_agreement(airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx'):
+    """
+    Compare the batch reductions with the per-angle functions of the scripts on the recorded run
+    (and C_N, C_M with the per-row reference loop).
+
+    Returns:
+    dict
+        Quantity -> {'max_abs_diff': float, 'identical': bool}.
+    """
+    inputs = script_inputs(airfoil_file)
+    data, cp, rows = inputs['data'], inputs['cp'], inputs['rows']
+    tap_x, tap_z = data['sensor_positions'], data['sensor_positions_y']
+
+    batch = integrate_cn_cm(cp, surface_weights(tap_x, tap_z))
+    cn, cm = legacy_cn_cm(cp, tap_x, tap_z)
+    ct = ct_batch(cp, geometry_slope_table(AirfoilGeometry(inputs['x_coords'], inputs['z_coords']), tap_x, tap_z))
+    sweeps = {name: sweep() for name, sweep in script_sweeps(inputs).items()}
+    pairs = {
+        'cn': (batch['cn'], cn),
+        'cm': (batch['cm'], cm),
+        'cn_calc': (batch['cn'][rows], sweeps['cn_calc']),
+        'cm_calc': (batch['cm'][rows], sweeps['cm_calc']),
+        'ct_calc': (ct[rows], sweeps['ct_calc']),
+    }
+
+    if 'profiles' in inputs:
+        # Batch drag at the rho of the run row of every workbook angle, as calculate_drag takes it
+        profiles = inputs['profiles']
+        wake_rows = data['alpha_index'].find(profiles['aoa'])
+        found = wake_rows >= 0
+        wake_rho = np.full(len(wake_rows), np.nan)
+        wake_rho[found] = row_conditions(data, wake_rows[found])['rho']
+        pairs['calculate_drag'] = (profile_drag(profiles, wake_rho)['drag'], sweeps['calculate_drag'])
+
+    return {name: {'max_abs_diff': float(np.nanmax(np.abs(new - old))), 'identical': bool(np.array_equal(new, old))}
+            for name, (new, old) in pairs.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(old, new):
+    """Print the speed ratio of every stage between two result files (>1 means faster now)."""
+    for size, stages in new['timings'].items():
+        for stage, times in stages.items():
+            for variant, seconds in times.items():
+                before = old.get('timings', {}).get(size, {}).get(stage, {}).get(variant)
+                if before:
+                    print(f"{size:>22} {stage:>14} {variant:>11}: {before / seconds:6.2f}x")
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the reduction hot paths and check them against the reference loops.")
+    parser.add_argument('--alphas', type=int, nargs='+', default=[30, 1000], help="Numbers of angles of attack")
+    parser.add_argument('--taps', type=int, nargs='+', default=[49, 400], help="Numbers of surface taps")
+    parser.add_argument('--probes', type=int, default=47, help="Number of wake probes")
+    parser.add_argument('--repeat', type=int, default=5, help="Repetitions per timing (the best is kept)")
+    parser.add_argument('--no-legacy', action='store_true', help="Skip timing the per-row reference loops")
+    parser.add_argument('--out', default=None, help="Write the results to this JSON file")
+    parser.add_argument('--compare', default=None, help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'timings': {},
+        'agreement': check_agreement(),
+    }
+    for n_alpha in args.alphas:
+        for n_taps in args.taps:
+            size = f"{n_alpha}x{n_taps}x{args.probes}"
+            results['timings'][size] = benchmark(n_alpha, n_taps, args.probes, args.repeat, not args.no_legacy)
+            for stage, times in results['timings'][size].items():
+                print(f"{size:>22} {stage:>10}: " + ", ".join(f"{k} {v * 1e3:.3f} ms" for k, v in times.items()))
+
+    # The per-angle functions of the scripts, each timed on its own over the recorded run
+    results['timings']['recorded_run'] = benchmark_scripts(args.repeat)
+    for name, times in results['timings']['recorded_run'].items():
+        print(f"{'recorded_run':>22} {name:>14}: " + ", ".join(f"{k} {v * 1e3:.3f} ms" for k, v in times.items()))
+
+    for name, agreement in results['agreement'].items():
+        print(f"{name:>14}: max |diff| = {agreement['max_abs_diff']:.3e}, identical: {agreement['identical']}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(json.load(f), results)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -1,88 +1,90 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+import logging
+import os
+import sys
 
-# Constants
-q_inf = 335.7613443  # Free-stream dynamic pressure (Pa)
+import numpy as np
 
-# Load Excel data (sensor positions)
-excel_data = pd.read_excel('DATA_ANALYSIS/PPS.xlsx', header=None)
-# Extract sensor positions from Column B, Row 3 to Row 51 (adjusting for zero-indexing)
-sensor_positions = excel_data.iloc[2:52, 1]  # Rows 2 to 51, Column B
-sensor_positions_y = excel_data.iloc[2:52, 2]
-# Load text file data (angles of attack and pressure values)
-text_data = pd.read_csv('DATA_ANALYSIS/raw_2d.txt', sep="\t", header=None)
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
 
-# Extract angles of attack (starting from Column 3, Row 3 in text file)
-angles_of_attack = text_data.iloc[2:, 2]  # Extract from Row 3, Column 3 onwards
+from .alpha_index import ALPHA_TOLERANCE
+from .freestream import row_dynamic_pressure
+from .run_loader import load_surface_run
+from .surface_integration import integrate_cn_cm, surface_weights
 
-# Convert angles of attack to numeric (to avoid any string/float issues)
-angles_of_attack = pd.to_numeric(angles_of_attack, errors='coerce')
+logger = logging.getLogger(__name__)
 
-# Extract pressure values (Columns 9 to 57 starting from Row 3 in text file)
-pressure_values = text_data.iloc[2:, 8:57]  # Extract from Columns 9 to 57, Row 3 onwards
+# Fixed free-stream dynamic pressure (Pa) overriding the recorded conditions of every row,
+# e.g. 335.7613443 of the original reduction; None takes q_inf per row from freestream.py
+q_inf = None
 
-# Ensure pressure values are numeric
-pressure_values = pressure_values.apply(pd.to_numeric, errors='coerce')
+# Input files, read on the first call rather than at import (parsed once and cached by run_loader)
+sensor_file = 'DATA_ANALYSIS/PPS.xlsx'
+pressure_file = 'DATA_ANALYSIS/raw_2d.txt'
 
 # Function to calculate Cp from pressure using q_inf
 def calculate_cp(pressure, q_inf):
     return pressure / q_inf
 
 # Function to generate Cp vs Position graph for a given angle of attack
-def cn_calc(angle, split_point=None):
+def cn_calc(angle, split_point=None, tolerance=ALPHA_TOLERANCE):
+    data = load_surface_run(pressure_file, sensor_file)
+    sensor_positions = data['sensor_positions']
+    pressure_values = data['pressure_values']
+
     # Debugging: Check if the requested angle is present
-    print(f"Searching for angle: {angle}")
+    logger.debug("Searching for angle: %s", angle)
     
-    # Find the row where the angle of attack matches
-    matching_rows = angles_of_attack[angles_of_attack == angle]
+    # Find the first row recorded within the tolerance of the requested angle
+    angle_row = data['alpha_index'].find(angle, tolerance)[0]
     
-    if matching_rows.empty:
-        print(f"Error: Angle of attack {angle} not found.")
+    if angle_row < 0:
+        logger.error("Angle of attack %s not found.", angle)
         return
-
-    # Get the row index where the angle of attack matches
-    angle_row = matching_rows.index[0]
     
     # Extract the pressure values for the corresponding angle
-    pressures_at_angle = pressure_values.iloc[angle_row - 2]  # Adjust for zero-based index
+    pressures_at_angle = pressure_values[angle_row]
     
     # Ensure the length of pressures_at_angle matches the number of sensor positions
     if len(pressures_at_angle) != len(sensor_positions):
-        print(f"Warning: Pressure values length ({len(pressures_at_angle)}) doesn't match sensor positions length ({len(sensor_positions)}).")
+        logger.warning("Pressure values length (%d) doesn't match sensor positions length (%d).",
+                       len(pressures_at_angle), len(sensor_positions))
         return
     
     # Calculate Cp values for each pressure
-    cp_values = pressures_at_angle.apply(lambda p: calculate_cp(p, q_inf))
+    cp_values = calculate_cp(pressures_at_angle, row_dynamic_pressure(data, angle_row, q_inf))
     
-    x_positions = sensor_positions/100.0
-
     # Set the split point (choose somewhere near the middle or manually set)
     if split_point is None:
         split_point = len(sensor_positions) // 2  # Default split at the midpoint of the array
-    cp_u = np.where(sensor_positions_y > 0, cp_values, 0)
-    cp_l = np.where(sensor_positions_y < 0, cp_values, 0)
 
-    area_cpu = np.trapz(cp_u, x_positions)
-    area_cpl = np.trapz(cp_l, x_positions)
+    # Upper/lower Cp integrals from the shared batch integrator
+    coefficients = integrate_cn_cm(cp_values, surface_weights(sensor_positions, data['sensor_positions_y']))
+    area_cpu = coefficients['cn_upper'][0]
+    area_cpl = coefficients['cn_lower'][0]
     area_total = area_cpl - area_cpu
-    print(area_cpu)
-    print(area_cpl)
-    print(area_total)
+    logger.debug("C_N upper: %s, lower: %s, total: %s", area_cpu, area_cpl, area_total)
     return area_total
-# Example: Plot Cp vs Position for a specific angle of attack (e.g., 5 degrees) and split point
-alpha_array = []
-c_n_array = []
 
-for i in range(-6,11):
-    cn = cn_calc(i, split_point=25)  # Try changing the split_point value to test different splits
-    alpha_array.append(i)
-    c_n_array.append(cn)
+# Sweep over the measured angles of attack when run as a script
+if __name__ == "__main__":
+    data = load_surface_run(pressure_file, sensor_file)
+    pressure_values = data['pressure_values']
+    weights = surface_weights(data['sensor_positions'], data['sensor_positions_y'])
+    alpha_array = list(range(-6, 11)) + list(np.arange(10.5, 16.5, 0.5))
 
-for j in np.arange(10.5,16.5,0.5):
-    cn = cn_calc(j, split_point=25)  # Try changing the split_point value to test different splits
-    alpha_array.append(j)
-    c_n_array.append(cn)
+    # Reduce every requested angle in one vectorized pass
+    rows = data['alpha_index'].find(alpha_array)
+    found = rows >= 0
+    cp = calculate_cp(pressure_values[rows[found]], row_dynamic_pressure(data, rows[found], q_inf)[:, None])
+    coefficients = integrate_cn_cm(cp, weights)
+
+    c_n_array = [None] * len(alpha_array)
+    for position, value in zip(np.flatnonzero(found), coefficients['cn']):
+        c_n_array[position] = value
+    for angle in np.asarray(alpha_array, dtype=float)[~found]:
+        print(f"Error: Angle of attack {angle} not found.")
 
-print(alpha_array)
-print(c_n_array)
\ No newline at end of file
+    print(alpha_array)
+    print(c_n_array)
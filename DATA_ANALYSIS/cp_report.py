@@ -0,0 +1,242 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import profiling, run_loader
+from .freestream import load_freestream
+from .surface_integration import pressure_coefficients
+
+# Bump when the plot layout changes so existing images are re-rendered
+STYLE_VERSION = 1
+HASH_FILE = '.render_hashes.json'
+
+
+def _pyplot():
+    # Non-interactive backend: nothing ever opens a window or waits for one to be closed
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def content_hash(*parts):
+    """SHA-1 over the plot inputs (arrays, numbers and strings) and the style version."""
+    digest = hashlib.sha1(f"style={STYLE_VERSION}".encode())
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part, dtype=float).tobytes())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+def _load_hashes(out_dir):
+    try:
+        with open(os.path.join(out_dir, HASH_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_hashes(out_dir, hashes):
+    tmp_path = os.path.join(out_dir, f"{HASH_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(hashes, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(out_dir, HASH_FILE))
+
+
+def _outputs_exist(out_base, formats):
+    return all(os.path.exists(f"{out_base}.{fmt}") for fmt in formats)
+
+
+def new_cp_figure():
+    """
+    Create the Cp-vs-position figure once; its lines are updated for every angle.
+
+    Returns:
+    dict
+        'figure', 'axes' and the 'upper', 'lower' and 'leading_edge' line artists.
+    """
+    plt = _pyplot()
+    figure, axes = plt.subplots(figsize=(10, 6))
+    upper, = axes.plot([], [], marker='o', linestyle='-', color='b', label='Cp curve')
+    lower, = axes.plot([], [], marker='o', linestyle='-', color='b')
+    leading_edge, = axes.plot([], [], linestyle='-', color='b')
+    axes.set_xlabel('Sensor Position (x/c) [%]')
+    axes.set_ylabel('Cp (Coefficient of Pressure) [~]')
+    axes.grid(True)
+    axes.legend()
+    return {'figure': figure, 'axes': axes, 'upper': upper, 'lower': lower, 'leading_edge': leading_edge}
+
+
+def draw_cp(cp_figure, positions, cp_values, angle, split_point=25):
+    """Update the Cp figure in place for one angle (same layout as near_flow.plot_cp_vs_position)."""
+    cp_figure['upper'].set_data(positions[:split_point], cp_values[:split_point])
+    cp_figure['lower'].set_data(positions[split_point:], cp_values[split_point:])
+    # Connect the first tap of each surface at the leading edge
+    cp_figure['leading_edge'].set_data([positions[0], positions[split_point]], [cp_values[0], cp_values[split_point]])
+
+    x_min, x_max = np.nanmin(positions), np.nanmax(positions)
+    y_min, y_max = np.nanmin(cp_values), np.nanmax(cp_values)
+    x_margin = (x_max - x_min) * 0.05  # 5% margin for x
+    y_margin = (y_max - y_min) * 0.05  # 5% margin for y
+
+    axes = cp_figure['axes']
+    axes.set_title(f'Cp vs Position for Angle of Attack = {angle}°, Re = 2.5e5')
+    axes.set_xlim(x_min - x_margin, x_max + x_margin)
+    axes.set_ylim(y_max + y_margin, y_min - y_margin)  # Inverted y-axis for Cp plots
+
+
+def _render_cp_jobs(positions, jobs, formats, split_point):
+    # Runs in a worker process: one figure per worker, reused for all of its angles
+    cp_figure = new_cp_figure()
+    rendered = []
+    for out_base, angle, cp_values, key in jobs:
+        with profiling.span('plot', angle=float(angle)):
+            draw_cp(cp_figure, positions, cp_values, angle, split_point)
+            for fmt in formats:
+                cp_figure['figure'].savefig(f"{out_base}.{fmt}", format=fmt)
+        profiling.count('plots')
+        rendered.append((out_base, key))
+    _pyplot().close(cp_figure['figure'])
+    return rendered, profiling.drain() if profiling.is_enabled() else None
+
+
+def render_cp_report(run_file, out_dir, tap_file='DATA_ANALYSIS/PPS.xlsx', q_inf=None, formats=('png',),
+                     workers=None, split_point=25, force=False):
+    """
+    Render the Cp distribution of every angle of attack in a run to image files.
+
+    Plots whose inputs (Cp row, tap positions, angle, formats, style version) are unchanged
+    since the last render are skipped. The remaining angles are split across worker processes.
+
+    Arguments:
+    run_file : str
+        Run file (raw_2d.txt layout).
+    out_dir : str
+        Output directory; files are named '<run>_cp_<n>_alpha_<angle>.<format>'.
+    q_inf : float or None
+        Fixed dynamic pressure (Pa); None uses the per-row conditions (see freestream.py).
+    formats : tuple
+        Image formats, e.g. ('png', 'svg').
+    workers : int or None
+        Worker processes (default: one per CPU; 1 renders in this process).
+    force : bool
+        Re-render even if the inputs did not change.
+
+    Returns:
+    tuple
+        (rendered, skipped) counts.
+    """
+    run = run_loader.load_run(run_file)
+    tap_geometry = run_loader.load_tap_geometry(tap_file)
+    positions = tap_geometry['tap_x'] * 100.0  # Plot positions in percent of the chord
+    if q_inf is None:
+        q_inf = load_freestream(run_file)['q_inf']
+    cp = pressure_coefficients(run['pressures'][:, :run_loader.SURFACE_TAPS], q_inf)
+
+    os.makedirs(out_dir, exist_ok=True)
+    hashes = _load_hashes(out_dir)
+    stem = os.path.splitext(os.path.basename(run_file))[0]
+
+    jobs = []
+    skipped = 0
+    for row, angle in enumerate(run['alpha']):
+        out_base = os.path.join(out_dir, f"{stem}_cp_{row:03d}_alpha_{angle:+06.2f}")
+        key = content_hash(cp[row], positions, float(angle), tuple(formats), split_point)
+        if not force and hashes.get(os.path.basename(out_base)) == key and _outputs_exist(out_base, formats):
+            skipped += 1
+            continue
+        jobs.append((out_base, angle, cp[row], key))
+
+    if jobs:
+        n_chunks = min(len(jobs), workers or os.cpu_count() or 1)
+        chunks = [jobs[i::n_chunks] for i in range(n_chunks)]
+        if n_chunks == 1:
+            results = [_render_cp_jobs(positions, chunks[0], formats, split_point)]
+        else:
+            with ProcessPoolExecutor(max_workers=n_chunks, initializer=profiling.init_worker,
+                                     initargs=(profiling.is_enabled(),)) as executor:
+                results = list(executor.map(_render_cp_jobs, [positions] * n_chunks, chunks,
+                                            [formats] * n_chunks, [split_point] * n_chunks))
+        for _, trace in results:
+            if trace is not None:
+                profiling.merge(*trace)
+        for out_base, key in (item for rendered, _ in results for item in rendered):
+            hashes[os.path.basename(out_base)] = key
+        _save_hashes(out_dir, hashes)
+    return len(jobs), skipped
+
+
+def render_polar(alpha, cl, cd, out_base, title='', formats=('png',), force=False):
+    """
+    Render a lift curve and drag polar (the plottingclcd.py layout) without opening a window.
+
+    Returns:
+    bool
+        True if the figure was rendered, False if the existing files are up to date.
+    """
+    alpha, cl, cd = (np.asarray(values, dtype=float) for values in (alpha, cl, cd))
+    out_dir = os.path.dirname(out_base) or '.'
+    os.makedirs(out_dir, exist_ok=True)
+    hashes = _load_hashes(out_dir)
+    key = content_hash(alpha, cl, cd, title, tuple(formats))
+    if not force and hashes.get(os.path.basename(out_base)) == key and _outputs_exist(out_base, formats):
+        return False
+
+    with profiling.span('plot', file=os.path.basename(out_base)):
+        _draw_polar(alpha, cl, cd, out_base, title, formats)
+    profiling.count('plots')
+
+    hashes[os.path.basename(out_base)] = key
+    _save_hashes(out_dir, hashes)
+    return True
+
+
+def _draw_polar(alpha, cl, cd, out_base, title, formats):
+    plt = _pyplot()
+    figure, axs = plt.subplots(2, 1, figsize=(8, 10))
+    axs[0].plot(alpha, cl, marker='o', color="blue", label="Cl alfa curve")
+    axs[0].set_title(f"Cl alfa curve {title}".strip())
+    axs[0].set_xlabel("alfa")
+    axs[0].set_ylabel("Cl")
+    axs[1].plot(cd, cl, marker='o', color="green", label="ClCd")
+    axs[1].set_title(f"Drag polar {title}".strip())
+    axs[1].set_xlabel("CD")
+    axs[1].set_ylabel("CL")
+    for axes in axs:
+        axes.legend()
+        axes.grid(True)
+    figure.tight_layout()
+    for fmt in formats:
+        figure.savefig(f"{out_base}.{fmt}", format=fmt)
+    plt.close(figure)
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render Cp reports for tunnel runs without a display.")
+    parser.add_argument('runs', nargs='+', help="Run files")
+    parser.add_argument('--out', default='reports', help="Output directory")
+    parser.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet")
+    parser.add_argument('--format', nargs='+', default=['png'], help="Image formats (png, svg, pdf)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument('--force', action='store_true', help="Re-render unchanged plots")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start(args)
+
+    for run_file in args.runs:
+        rendered, skipped = render_cp_report(run_file, args.out, args.taps, formats=tuple(args.format),
+                                             workers=args.workers, force=args.force)
+        print(f"{run_file}: {rendered} rendered, {skipped} unchanged")
+    profiling.finish(args)
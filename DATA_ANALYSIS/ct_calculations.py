@@ -1,16 +1,27 @@
-import pandas as pd
+import logging
+import os
+import sys
+
 import numpy as np
 
-# Constants
-q_inf = 335.7613443  # Free-stream dynamic pressure (Pa)
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import profiling, run_archive, run_loader
+from .airfoil_geometry import AirfoilGeometry, load_geometry
+from .freestream import load_freestream
+from .surface_integration import interpolate_bad_taps
+
+logger = logging.getLogger(__name__)
 
-# Step 1: Load airfoil geometry
+# Fixed free-stream dynamic pressure (Pa) overriding the recorded conditions of every row,
+# e.g. 335.7613443 of the original reduction; None takes q_inf per row from freestream.py
+q_inf = None
+
+# Step 1: Load airfoil geometry (parsed once and cached by run_loader)
 def load_airfoil_geometry(file_path, sheet_name="Sheet1", usecols="B:C"):
-    airfoil_data = pd.read_excel(file_path, sheet_name=sheet_name, header=1, usecols=usecols)
-    airfoil_data.columns = ['x', 'z']
-    x_coords = airfoil_data['x'].to_numpy()
-    z_coords = airfoil_data['z'].to_numpy()
-    return x_coords, z_coords
+    return run_loader.load_airfoil_geometry(file_path, sheet_name=sheet_name, usecols=usecols)
 
 # Step 2: Split into upper and lower surfaces
 def split_airfoil_surfaces(x_coords, z_coords):
@@ -21,19 +32,21 @@ def split_airfoil_surfaces(x_coords, z_coords):
     z_lower = z_coords[leading_edge_index:]
     return x_upper, z_upper, x_lower, z_lower
 
-# Step 3: Load sensor data
+# Step 3: Load sensor data (PPS.xlsx, or the tap geometry stored in a run archive entry)
 def load_sensor_data(file_path):
-    sensor_data = pd.read_excel(file_path, header=None)
-    x_positions = sensor_data.iloc[2:52, 1].to_numpy() / 100.0
-    z_positions = sensor_data.iloc[2:52, 2].to_numpy()
-    return x_positions, z_positions
+    if run_archive.is_archive_entry(file_path):
+        tap_geometry = run_archive.open_entry(file_path)
+    else:
+        tap_geometry = run_loader.load_tap_geometry(file_path)
+    return tap_geometry['tap_x'], tap_geometry['tap_z']
 
-# Step 4: Load pressure data
+# Step 4: Load pressure data (run file, or a run archive entry read through np.memmap)
 def load_pressure_data(file_path):
-    pressure_data = pd.read_csv(file_path, sep="\t", header=None)
-    angles_of_attack = pd.to_numeric(pressure_data.iloc[2:, 2], errors='coerce')  # Convert to numeric
-    pressure_values = pressure_data.iloc[2:, 8:57].apply(pd.to_numeric, errors='coerce')
-    return angles_of_attack, pressure_values
+    if run_archive.is_archive_entry(file_path):
+        run = run_archive.open_entry(file_path)
+    else:
+        run = run_loader.load_run(file_path)
+    return run['alpha'], run['pressures'][:, :run_loader.SURFACE_TAPS]
 
 # Step 5: Calculate Cp values
 def calculate_cp(pressure, q_inf):
@@ -61,6 +74,120 @@ def calculate_slope(x_surface, z_surface, target_x):
     # If somehow no segment is found (unlikely), raise an error
     raise ValueError(f"Target x ({target_x}) is out of bounds for the surface.")
 
+# Step 6b: Slope table, computed once per geometry and tap layout
+def surface_slopes(x_surface, z_surface, target_x):
+    """
+    Vectorized calculate_slope: dz/dx at every target x in one binary search.
+
+    The surface x-coordinates must be increasing (as returned by split_airfoil_surfaces).
+    Targets outside the surface use the first or last segment, like calculate_slope.
+    """
+    x_surface = np.asarray(x_surface, dtype=float)
+    z_surface = np.asarray(z_surface, dtype=float)
+    segment = np.searchsorted(x_surface, np.asarray(target_x, dtype=float), side='left')
+    segment = np.clip(segment, 1, len(x_surface) - 1)
+    return (z_surface[segment] - z_surface[segment - 1]) / (x_surface[segment] - x_surface[segment - 1])
+
+
+def trapezoid_weights(x):
+    """Weights w such that np.dot(w, y) is the trapezoidal integral of y over x."""
+    x = np.asarray(x, dtype=float)
+    weights = np.zeros(len(x))
+    if len(x) > 1:
+        dx = np.diff(x)
+        weights[:-1] += dx / 2.0
+        weights[1:] += dx / 2.0
+    return weights
+
+
+def build_slope_table(x_coords, z_coords, sensor_positions, sensor_positions_z):
+    """
+    Precompute the per-tap surface slopes and the C_T integration weights.
+
+    Arguments:
+    x_coords, z_coords : array-like
+        Airfoil coordinates.
+    sensor_positions : array-like
+        Sensor x/c positions corresponding to the Cp columns.
+    sensor_positions_z : array-like
+        Sensor z positions (the sign selects the surface).
+
+    Returns:
+    dict
+        'x' (tap x/c), 'slopes' (dz/dx per tap, 0 for taps on neither surface), 'upper' and 'lower' masks and
+        'ct_weights', the vector that turns a Cp row into C_T with one dot product.
+    """
+    x_upper, z_upper, x_lower, z_lower = split_airfoil_surfaces(np.asarray(x_coords), np.asarray(z_coords))
+    sensor_positions = np.asarray(sensor_positions, dtype=float)
+    sensor_positions_z = np.asarray(sensor_positions_z, dtype=float)
+
+    valid = np.isfinite(sensor_positions)
+    for x in sensor_positions[~valid]:
+        logger.warning("Sensor position x=%s is out of bounds for the surface.", x)
+    upper = valid & (sensor_positions_z > 0)
+    lower = valid & (sensor_positions_z < 0)
+
+    slopes = np.zeros(len(sensor_positions))
+    slopes[upper] = surface_slopes(x_upper, z_upper, sensor_positions[upper])
+    slopes[lower] = surface_slopes(x_lower, z_lower, sensor_positions[lower])
+    return _ct_table(slopes, sensor_positions, upper, lower)
+
+
+def geometry_slope_table(geometry, sensor_positions, sensor_positions_z):
+    """
+    Same table as build_slope_table, with the slopes looked up from an AirfoilGeometry.
+
+    The slopes are the spline derivatives at the taps instead of the slope of the
+    coordinate segment containing them.
+    """
+    sensor_positions = np.asarray(sensor_positions, dtype=float)
+    taps = geometry.tap_table(sensor_positions, sensor_positions_z)
+    return _ct_table(taps['slopes'], sensor_positions, taps['upper'], taps['lower'])
+
+
+def _ct_table(slopes, sensor_positions, upper, lower):
+    # C_T = integral over the lower surface minus integral over the upper surface of Cp * dz/dx
+    ct_weights = np.zeros(len(sensor_positions))
+    ct_weights[upper] = -slopes[upper] * trapezoid_weights(sensor_positions[upper])
+    ct_weights[lower] = slopes[lower] * trapezoid_weights(sensor_positions[lower])
+    return {'x': sensor_positions, 'slopes': slopes, 'upper': upper, 'lower': lower, 'ct_weights': ct_weights}
+
+
+_geometries = {}
+
+
+def get_slope_table(x_coords, z_coords, sensor_positions, sensor_positions_z):
+    """Slope table from the spline geometry, built once per set of coordinates so repeated ct_calc calls reuse it."""
+    x_coords = np.ascontiguousarray(x_coords, dtype=float)
+    z_coords = np.ascontiguousarray(z_coords, dtype=float)
+    key = (x_coords.tobytes(), z_coords.tobytes())
+    if key not in _geometries:
+        _geometries[key] = AirfoilGeometry(x_coords, z_coords)
+    return geometry_slope_table(_geometries[key], sensor_positions, sensor_positions_z)
+
+
+@profiling.traced('integrate_ct')
+def ct_batch(cp_matrix, slope_table, bad=None):
+    """
+    C_T for every angle of attack at once.
+
+    Arguments:
+    cp_matrix : array-like
+        (n_alpha x n_taps) pressure coefficients.
+    slope_table : dict
+        Output of build_slope_table for the tap layout.
+    bad : array-like or None
+        Mask of readings to interpolate over first (see surface_integration.interpolate_bad_taps).
+
+    Returns:
+    np.ndarray
+        One C_T value per row.
+    """
+    if bad is not None:
+        cp_matrix = interpolate_bad_taps(cp_matrix, bad, slope_table['x'])
+    return np.asarray(cp_matrix, dtype=float) @ slope_table['ct_weights']
+
+
 # Step 7: Tangential coefficient calculation
 def ct_calc(angle, cp_values, x_coords, z_coords, sensor_positions, sensor_positions_z):
     """
@@ -82,41 +209,9 @@ def ct_calc(angle, cp_values, x_coords, z_coords, sensor_positions, sensor_posit
     float
         Tangential force coefficient (C_T).
     """
-    # Split airfoil geometry into upper and lower surfaces
-    x_upper, z_upper, x_lower, z_lower = split_airfoil_surfaces(x_coords, z_coords)
-
-    # Initialize integrands and corresponding valid x-positions
-    x_positions_upper = []  # Valid x-positions for upper surface
-    x_positions_lower = []  # Valid x-positions for lower surface
-    integrand_upper = []    # Integrand for upper surface
-    integrand_lower = []    # Integrand for lower surface
-
-    for i, x in enumerate(sensor_positions):
-        cp = cp_values[i]
-
-        # Determine slope based on z position
-        if sensor_positions_z[i] > 0:  # Upper surface
-            try:
-                slope = calculate_slope(x_upper, z_upper, x)
-                integrand_upper.append(cp * slope)
-                x_positions_upper.append(x)  # Store valid x position
-            except ValueError:
-                print(f"Warning: Sensor position x={x} is out of bounds for the upper surface.")
-        elif sensor_positions_z[i] < 0:  # Lower surface
-            try:
-                slope = calculate_slope(x_lower, z_lower, x)
-                integrand_lower.append(cp * slope)
-                x_positions_lower.append(x)  # Store valid x position
-            except ValueError:
-                print(f"Warning: Sensor position x={x} is out of bounds for the lower surface.")
-
-    # Perform integration using only valid x-positions
-    upper_surface = np.trapz(integrand_upper, x_positions_upper)
-    lower_surface = np.trapz(integrand_lower, x_positions_lower)
-
-    # Compute tangential coefficient
-    ct = lower_surface - upper_surface
-    return ct
+    # Slopes and integration weights are only built the first time a geometry and tap layout are seen
+    slope_table = get_slope_table(x_coords, z_coords, sensor_positions, sensor_positions_z)
+    return float(np.dot(np.asarray(cp_values, dtype=float), slope_table['ct_weights']))
 
 # Main script
 if __name__ == "__main__":
@@ -126,19 +221,15 @@ if __name__ == "__main__":
     pressure_file = 'DATA_ANALYSIS/raw_2d.txt'
 
     # Load data
-    x_coords, z_coords = load_airfoil_geometry(airfoil_file)
+    geometry = load_geometry(airfoil_file)
     sensor_positions, sensor_positions_z = load_sensor_data(sensor_file)
     angles_of_attack, pressure_values = load_pressure_data(pressure_file)
 
-    # Loop through angles of attack and calculate C_T
-    alpha_array = []
-    ct_array = []
-
-    for angle_index, angle in enumerate(angles_of_attack):
-        cp_values = calculate_cp(pressure_values.iloc[angle_index].to_numpy(), q_inf)
-        ct = ct_calc(angle, cp_values, x_coords, z_coords, sensor_positions, sensor_positions_z)
-        alpha_array.append(angle)
-        ct_array.append(ct)
+    # Look the slopes up once, then calculate C_T for all angles of attack in one product
+    slope_table = geometry_slope_table(geometry, sensor_positions, sensor_positions_z)
+    alpha_array = angles_of_attack
+    row_q_inf = load_freestream(pressure_file)['q_inf'] if q_inf is None else q_inf
+    ct_array = ct_batch(calculate_cp(pressure_values, np.reshape(row_q_inf, (-1, 1))), slope_table)
 
     # Print results
     for alpha, ct in zip(alpha_array, ct_array):
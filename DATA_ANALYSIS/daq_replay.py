@@ -0,0 +1,354 @@
+"""
+Stand-in for the tunnel DAQ: replay a recorded run over a socket and reduce the stream live.
+
+The server sends the lines of a run file (same layout as raw_2d.txt) at a set row rate,
+each prefixed with its send time:
+
+    <time.time() when sent>\t<line of the run file>\n
+
+The client reads the stream with asyncio, batches the rows through bounded queues and
+reduces the batches in a thread or process pool (live_run.reduce_rows), so parsing and
+reduction never hold up the socket. When the reduction falls behind, the queues fill,
+the client stops reading and TCP flow control slows the server down: the server's
+achieved rate, and the end-to-end latency (send to reduced), show whether the analysis
+keeps up. Send times come from the server's clock, so the latencies assume both ends run
+on the same machine (or on synchronized clocks).
+
+    python DATA_ANALYSIS/daq_replay.py serve DATA_ANALYSIS/raw_2d.txt --rate 500
+    python DATA_ANALYSIS/daq_replay.py consume
+    python DATA_ANALYSIS/daq_replay.py loopback --rate 20000 --repeat 200 --quiet
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import profiling
+from .batch_reduce import build_shared_geometry
+from .live_run import parse_run_lines, reduce_rows
+
+ADDRESS = '127.0.0.1:5025'  # 'host:port' or 'unix:<socket path>'
+ROW_RATE = 100.0  # Rows per second sent by the server (0: as fast as the client reads)
+BATCH_ROWS = 256  # Most rows reduced in one task
+QUEUE_ROWS = 4096  # Received rows waiting for a task before the client stops reading
+
+# Geometry of the reduction, set once per worker (see _init_worker)
+_shared = {}
+
+
+def _is_data_line(text):
+    # Data lines start with the run number, header lines with a column name
+    try:
+        float(text.split('\t', 1)[0])
+        return True
+    except ValueError:
+        return False
+
+
+async def open_address(address):
+    """(reader, writer) of a connection to 'host:port' or 'unix:<path>'."""
+    if address.startswith('unix:'):
+        return await asyncio.open_unix_connection(address[len('unix:'):])
+    host, _, port = address.rpartition(':')
+    return await asyncio.open_connection(host, int(port))
+
+
+async def start_replay_server(file_path, address=ADDRESS, rate=ROW_RATE, repeat=1):
+    """
+    Serve a recorded run: every client that connects gets the header lines and then the
+    data lines of the file, repeated repeat times, at rate rows per second.
+
+    Rows that are due are written in one go and the writer is drained before waiting for
+    the next row, so a client that reads slowly slows the replay down instead of letting
+    the send buffer grow.
+
+    Arguments:
+    file_path : str
+        Run file to replay.
+    address : str
+        'host:port' or 'unix:<socket path>'.
+    rate : float
+        Rows per second (0: as fast as the client reads).
+    repeat : int
+        Times the data lines are sent, to replay a longer run.
+
+    Returns:
+    asyncio.Server
+        The listening server (use it as an async context manager).
+    """
+    with open(file_path) as f:
+        lines = f.read().splitlines()
+    header = [line for line in lines if not _is_data_line(line)]
+    rows = [line for line in lines if _is_data_line(line)]
+
+    async def replay(reader, writer):
+        try:
+            writer.write(''.join(f"{time.time():.6f}\t{line}\n" for line in header).encode())
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            for i in range(len(rows) * repeat):
+                if rate > 0:
+                    delay = start + i / rate - loop.time()
+                    if delay > 0:
+                        await writer.drain()
+                        await asyncio.sleep(delay)
+                writer.write(f"{time.time():.6f}\t{rows[i % len(rows)]}\n".encode())
+                if rate <= 0 and i % 64 == 63:
+                    await writer.drain()
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Client went away or the server is shutting down
+        finally:
+            writer.close()
+
+    if address.startswith('unix:'):
+        path = address[len('unix:'):]
+        if os.path.exists(path):
+            os.remove(path)  # Socket left behind by an earlier server
+        return await asyncio.start_unix_server(replay, path)
+    host, _, port = address.rpartition(':')
+    return await asyncio.start_server(replay, host, int(port))
+
+
+def _init_worker(shared):
+    _shared.update(shared)
+    profiling.init_worker(shared.get('trace', False))
+
+
+def _reduce_lines(lines, q_inf):
+    # Task of the pool: parse and reduce one batch of data lines
+    rows = parse_run_lines(lines)
+    reduced = reduce_rows(rows, _shared['weights'], _shared['slope_table'], q_inf, _shared['probes'])
+    # Spans of a worker process travel back with the result (see profiling.merge); threads record directly
+    trace = profiling.drain() if _shared.get('process') and profiling.is_enabled() else None
+    return reduced, trace
+
+
+class StreamMetrics:
+    """End-to-end latency and throughput of a reduced stream."""
+
+    def __init__(self):
+        self.rows = 0
+        self.batches = 0
+        self.max_queue = 0
+        self.first_received = None
+        self.last_reduced = None
+        self._latencies = []
+
+    def received(self, queue_size):
+        if self.first_received is None:
+            self.first_received = time.time()
+        self.max_queue = max(self.max_queue, queue_size)
+
+    def reduced(self, sent, done):
+        self.rows += len(sent)
+        self.batches += 1
+        self.last_reduced = done
+        self._latencies.append(done - np.asarray(sent))
+
+    def summary(self):
+        """
+        Returns:
+        dict
+            'rows', 'batches', 'rows_per_batch', 'throughput' (rows/s, first row received to
+            last row reduced), 'latency_p50', 'latency_p95', 'latency_max' (s, send to reduced)
+            and 'max_queue' (rows waiting at most).
+        """
+        latencies = np.concatenate(self._latencies) if self._latencies else np.full(1, np.nan)
+        elapsed = (self.last_reduced - self.first_received) if self.rows else np.nan
+        p50, p95 = np.percentile(latencies, [50.0, 95.0])
+        return {
+            'rows': self.rows,
+            'batches': self.batches,
+            'rows_per_batch': self.rows / self.batches if self.batches else np.nan,
+            'throughput': self.rows / elapsed if elapsed > 0 else np.nan,
+            'latency_p50': p50,
+            'latency_p95': p95,
+            'latency_max': latencies.max(),
+            'max_queue': self.max_queue,
+        }
+
+    def format_summary(self):
+        """Summary as printable lines."""
+        summary = self.summary()
+        return [f"Rows: {summary['rows']} in {summary['batches']} batches "
+                f"({summary['rows_per_batch']:.1f} rows per batch), {summary['throughput']:.0f} rows/s",
+                f"Latency: {summary['latency_p50'] * 1e3:.2f} ms median, {summary['latency_p95'] * 1e3:.2f} ms p95, "
+                f"{summary['latency_max'] * 1e3:.2f} ms max; at most {summary['max_queue']} rows queued"]
+
+
+async def _read_rows(reader, queue, metrics):
+    # Socket -> queue of (send time, line); waits while the queue is full, which stops the socket reads
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            stamp, _, text = line.decode('utf-8', errors='replace').rstrip('\r\n').partition('\t')
+            if _is_data_line(text):
+                await queue.put((float(stamp), text))
+                metrics.received(queue.qsize())
+    finally:
+        await queue.put(None)
+
+
+async def _dispatch_batches(queue, pending, executor, batch_rows, q_inf):
+    # Queue of rows -> pool tasks; every waiting row joins the batch, up to batch_rows, so
+    # batches stay small while the pool keeps up and grow when it falls behind
+    loop = asyncio.get_running_loop()
+    finished = False
+    while not finished:
+        item = await queue.get()
+        batch = []
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= batch_rows or queue.empty():
+                break
+            item = queue.get_nowait()
+        finished = item is None
+        if batch:
+            sent = [stamp for stamp, _ in batch]
+            future = loop.run_in_executor(executor, _reduce_lines, [text for _, text in batch], q_inf)
+            await pending.put((sent, future))  # Waits while max_pending tasks are in flight
+    await pending.put(None)
+
+
+async def reduce_stream(address=ADDRESS, tap_file='DATA_ANALYSIS/PPS.xlsx',
+                        airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx', q_inf=None, batch_rows=BATCH_ROWS,
+                        queue_rows=QUEUE_ROWS, workers=None, processes=False, metrics=None, wake_rake=False):
+    """
+    Receive a replayed (or live) run from a socket and reduce it as it arrives.
+
+    One task reads the socket into a queue of at most queue_rows rows, another groups the
+    waiting rows into batches and submits them to the pool, at most two batches per worker
+    in flight. Blocks are yielded in the order the rows were sent.
+
+    Arguments:
+    address : str
+        'host:port' or 'unix:<socket path>' of the server.
+    tap_file, airfoil_file : str
+        Pressure-port sheet and airfoil coordinates.
+    q_inf : float or None
+        Fixed free-stream dynamic pressure (Pa); None uses the per-row conditions.
+    batch_rows, queue_rows : int
+        Most rows per task and most rows waiting for a task.
+    workers : int or None
+        Pool size (default: 4 threads, or one process per CPU).
+    processes : bool
+        Reduce in worker processes instead of threads.
+    metrics : StreamMetrics or None
+        Collects latency and throughput.
+    wake_rake : bool
+        Compute the wake drag from the rake ports of every row (else NaN).
+
+    Yields:
+    dict
+        Output of live_run.reduce_rows for each batch, plus 'sent' (send times) and
+        'latency' (seconds from send to reduced), one per row.
+    """
+    shared = build_shared_geometry(tap_file, airfoil_file)
+    if not wake_rake:
+        shared['probes'] = None
+    metrics = StreamMetrics() if metrics is None else metrics
+    if processes:
+        workers = workers or os.cpu_count()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(dict(shared, trace=profiling.is_enabled(), process=True),))
+        # Start the workers before connecting: forked later they would inherit the socket and a
+        # closing server would never reach the client as end of stream
+        await asyncio.wrap_future(executor.submit(os.getpid))
+    else:
+        workers = workers or 4
+        _shared.update(shared)
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    reader, writer = await open_address(address)
+    queue = asyncio.Queue(maxsize=queue_rows)
+    pending = asyncio.Queue(maxsize=2 * workers)
+    tasks = [asyncio.create_task(_read_rows(reader, queue, metrics)),
+             asyncio.create_task(_dispatch_batches(queue, pending, executor, batch_rows, q_inf))]
+    try:
+        while (entry := await pending.get()) is not None:
+            sent, future = entry
+            reduced, trace = await future
+            if trace is not None:
+                profiling.merge(*trace)
+            done = time.time()
+            metrics.reduced(sent, done)
+            profiling.count('batches')
+            reduced['sent'] = np.asarray(sent)
+            reduced['latency'] = done - reduced['sent']
+            yield reduced
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        writer.close()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def _consume(args, metrics):
+    async for block in reduce_stream(args.address, args.taps, args.airfoil, args.q_inf, args.batch_rows,
+                                     args.queue_rows, args.workers, args.processes, metrics, args.wake_rake):
+        if not args.quiet:
+            for alpha, cn, cm, ct, cd, latency in zip(block['alpha'], block['cn'], block['cm'], block['ct'],
+                                                      block['cd_wake'], block['latency']):
+                print(f"Angle of Attack: {alpha:.2f} degrees, C_N: {cn:.6f}, C_M: {cm:.6f}, C_T: {ct:.6f}, "
+                      f"C_D wake: {cd:.6f}, latency: {latency * 1e3:.1f} ms")
+
+
+async def _main(args):
+    metrics = StreamMetrics()
+    if args.mode == 'consume':
+        await _consume(args, metrics)
+    else:
+        server = await start_replay_server(args.run_file, args.address, args.rate, args.repeat)
+        async with server:
+            if args.mode == 'serve':
+                print(f"Replaying {args.run_file} on {args.address} at {args.rate:g} rows/s")
+                await server.serve_forever()
+            await _consume(args, metrics)
+        if args.address.startswith('unix:') and os.path.exists(args.address[len('unix:'):]):
+            os.remove(args.address[len('unix:'):])
+    if metrics.rows:
+        for line in metrics.format_summary():
+            print(line)
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a run file over a socket like the DAQ and reduce the stream live.")
+    parser.add_argument('mode', choices=['serve', 'consume', 'loopback'],
+                        help="Run the replay server, the reducing client, or both in one process")
+    parser.add_argument('run_file', nargs='?', default='DATA_ANALYSIS/raw_2d.txt', help="Run file to replay")
+    parser.add_argument('--address', default=ADDRESS, help="'host:port' or 'unix:<socket path>'")
+    parser.add_argument('--rate', type=float, default=ROW_RATE, help="Rows per second (0: as fast as possible)")
+    parser.add_argument('--repeat', type=int, default=1, help="Replay the data lines this many times")
+    parser.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet")
+    parser.add_argument('--airfoil', default='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx', help="Airfoil coordinates")
+    parser.add_argument('--q-inf', type=float, default=None,
+                        help="Fixed free-stream dynamic pressure (Pa), default: per row from Delta_Pb")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS, help="Most rows per reduction task")
+    parser.add_argument('--queue-rows', type=int, default=QUEUE_ROWS, help="Most received rows waiting for a task")
+    parser.add_argument('--workers', type=int, default=None, help="Reduction threads or processes")
+    parser.add_argument('--processes', action='store_true', help="Reduce in worker processes instead of threads")
+    parser.add_argument('--wake-rake', action='store_true', help="Compute the wake drag from the rake ports")
+    parser.add_argument('--quiet', action='store_true', help="Print only the latency and throughput summary")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start(args)
+
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass  # Ctrl-C stops the server
+    finally:
+        profiling.finish(args)
@@ -1,92 +1,401 @@
-import pandas as pd
+import argparse
+import functools
+import os
+import sys
+
 import numpy as np
-from scipy.integrate import quad
 
-# Load the Excel sheet provided by the user
-file_path = 'DATA_ANALYSIS/wake_velocities.xlsx'
-data = pd.read_excel(file_path, header=2)
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
 
-# Extract AoA values and spanwise locations
-aoa_column = 'Location (mm)'  # The first column contains AoA values
-aoa_values = data[aoa_column][1:]  # Exclude the header row
-spanwise_locations = [col for col in data.columns if col != aoa_column]  # All other columns are spanwise locations
+from . import profiling, run_archive, run_loader
+from .freestream import row_conditions
+from .surface_integration import first_matching_rows
 
-# Convert the spanwise locations to numeric for integration
-spanwise_locations = list(map(float, spanwise_locations))
+# Fixed freestream overriding the recorded conditions in calculate_drag, e.g. rho = 1.181615446,
+# U_inf = 23.8392323 and p_inf = 99831.30769 of the original reduction. None takes rho per row
+# from freestream.py and U_inf, p_inf from the edges of the wake profiles (see edge_freestream).
+rho = None  # Air density (kg/m^3)
+U_inf = None  # Freestream velocity (m/s)
+p_inf = None  # Freestream pressure (Pa)
 
-# Create a dictionary of velocity profiles for each AoA
-velocity_profiles = data.iloc[1:, 1:].set_index(data[aoa_column][1:])
+EDGE_PROBES = 5  # Outermost probes on each side of a workbook profile that see the freestream
 
-# Load the Excel sheet provided by the user pressures
-file_path = 'DATA_ANALYSIS/wake_pressures.xlsx'
-data = pd.read_excel(file_path, header=2)
 
-# Extract AoA values and spanwise locations
-aoa_column_p = 'Location (mm)'  # The first column contains AoA values
-aoa_values_p = data[aoa_column][1:]  # Exclude the header row
-spanwise_locations_p = [col for col in data.columns if col != aoa_column]  # All other columns are spanwise locations
+def load_wake_profiles(file_path):
+    """
+    Load a wake workbook, or a wake entry of a run archive (see run_archive).
 
-# Convert the spanwise locations to numeric for integration
-spanwise_locations_p = list(map(float, spanwise_locations_p))
+    Returns:
+    dict
+        'aoa' (n_alpha), 'locations' (n_probes) and 'values' (n_alpha x n_probes).
+    """
+    if run_archive.is_archive_entry(file_path):
+        return run_archive.open_entry(file_path)
+    return run_loader.load_wake_profiles(file_path)
 
-# Create a dictionary of pressure profiles for each AoA
-pressure_profiles = data.iloc[1:, 1:].set_index(data[aoa_column][1:])
 
-# Define constants
-rho = 1.181615446 # Air density, replace with actual value
+def nearest_indices(locations, targets):
+    """
+    Index of the nearest location for every target, in one binary search.
 
-# Function to calculate drag for a given AoA
-def calculate_drag(aoa):
-    velocity_profile = velocity_profiles.loc[aoa]
-    pressure_profile = pressure_profiles.loc[aoa]
+    Gives the same answer as np.abs(locations - target).argmin() per target, including
+    picking the first of several equally near locations.
+    """
+    locations = np.asarray(locations, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    unique_locations, first_index = np.unique(locations, return_index=True)
+
+    right = np.clip(np.searchsorted(unique_locations, targets), 0, len(unique_locations) - 1)
+    left = np.clip(right - 1, 0, len(unique_locations) - 1)
+    distance_left = np.abs(unique_locations[left] - targets)
+    distance_right = np.abs(unique_locations[right] - targets)
+
+    index_left = first_index[left]
+    index_right = first_index[right]
+    use_left = (distance_left < distance_right) | ((distance_left == distance_right) & (index_left < index_right))
+    return np.where(use_left, index_left, index_right)
+
+
+def align_profiles(velocity_profiles, pressure_profiles, aoa=None):
+    """
+    Align velocity and pressure profiles into matching (n_alpha x n_probes) arrays.
+
+    Rows are matched on AoA and every velocity probe is paired with the nearest
+    pressure probe, once for the whole data set.
+
+    Arguments:
+    velocity_profiles, pressure_profiles : dict
+        Output of load_wake_profiles.
+    aoa : array-like or None
+        AoA values to extract (default: every AoA in the velocity profiles).
+
+    Returns:
+    dict
+        'aoa', 'locations' (velocity probe locations), 'velocities' and 'pressures'.
+        Rows for AoA values missing from either profile are NaN.
+    """
+    aoa = velocity_profiles['aoa'] if aoa is None else np.asarray(aoa, dtype=float)
+    locations = velocity_profiles['locations']
+
+    velocity_rows = first_matching_rows(velocity_profiles['aoa'], aoa)
+    pressure_rows = first_matching_rows(pressure_profiles['aoa'], aoa)
+    pressure_columns = nearest_indices(pressure_profiles['locations'], locations)
+
+    velocities = velocity_profiles['values'][velocity_rows]
+    pressures = pressure_profiles['values'][pressure_rows][:, pressure_columns]
+    velocities[velocity_rows < 0] = np.nan
+    pressures[pressure_rows < 0] = np.nan
+    return {'aoa': aoa, 'locations': locations, 'velocities': velocities, 'pressures': pressures}
+
+
+@profiling.traced('drag')
+def wake_drag(velocities, pressures, locations, rho, U_inf, p_inf, q_inf=None, chord=None):
+    """
+    Momentum-deficit drag for every AoA in one vectorized integration.
+
+    Each segment between neighbouring probes contributes
+    rho * (U_inf - U_avg) * U_avg * dy + (p_inf - p_avg) * dy,
+    with U_avg and p_avg the averages of the two probes bounding the segment.
+
+    Arguments:
+    velocities, pressures : array-like
+        (n_alpha x n_probes) aligned wake profiles (see align_profiles).
+    locations : array-like
+        Spanwise probe locations.
+    rho, U_inf, p_inf : float or array-like
+        Freestream density, velocity and pressure (scalars or one value per AoA).
+    q_inf : float or array-like or None
+        Dynamic pressure used for C_d (default: 0.5 * rho * U_inf**2).
+    chord : float or None
+        Model chord. When given, the drag coefficient is returned as well.
+
+    Returns:
+    dict
+        'drag' (per unit span), 'momentum' and 'pressure' terms, and 'cd' if a chord was given.
+    """
+    velocities = np.atleast_2d(np.asarray(velocities, dtype=float))
+    pressures = np.atleast_2d(np.asarray(pressures, dtype=float))
+    dy = np.diff(np.asarray(locations, dtype=float))
+
+    rho = np.asarray(rho, dtype=float)[..., None] if np.ndim(rho) else rho
+    U_inf = np.asarray(U_inf, dtype=float)[..., None] if np.ndim(U_inf) else U_inf
+    p_inf = np.asarray(p_inf, dtype=float)[..., None] if np.ndim(p_inf) else p_inf
+
+    U_avg = (velocities[:, :-1] + velocities[:, 1:]) / 2
+    p_avg = (pressures[:, :-1] + pressures[:, 1:]) / 2
+    momentum = (rho * (U_inf - U_avg) * U_avg * dy).sum(axis=1)
+    pressure = ((p_inf - p_avg) * dy).sum(axis=1)
+
+    result = {'drag': momentum + pressure, 'momentum': momentum, 'pressure': pressure}
+    if chord is not None:
+        if q_inf is None:
+            q_inf = 0.5 * rho * U_inf ** 2
+        result['cd'] = result['drag'] / (np.ravel(q_inf) * chord)
+    return result
+
+
+def edge_freestream(profiles, edge_probes=EDGE_PROBES):
+    """
+    Freestream of aligned workbook profiles, taken from their own edges.
+
+    The workbook velocities are sqrt(2 p_total / rho) of the total probes, not referenced
+    to the tunnel's pitot-static tube, so they sit about 1 m/s above the U_inf of the
+    Delta_Pb calibration. Measured against that U_inf the whole rake looks faster than the
+    freestream and the drag comes out negative. Like the pitot of run_wake_profiles, the
+    freestream is therefore read in the frame of the profiles themselves: U_inf and p_inf
+    are the medians over the edge_probes outermost probes on both sides of every row,
+    which stays clear of the few probes with fixed offsets.
+
+    Arguments:
+    profiles : dict
+        Output of align_profiles.
+    edge_probes : int
+        Probes taken from each end of the rake.
+
+    Returns:
+    dict
+        'U_inf' and 'p_inf', one value per row (NaN where a probe is missing).
+    """
+    n_probes = profiles['velocities'].shape[1]
+    edge = np.r_[:edge_probes, n_probes - edge_probes:n_probes]
+    return {'U_inf': np.median(profiles['velocities'][:, edge], axis=1),
+            'p_inf': np.median(profiles['pressures'][:, edge], axis=1)}
+
+
+def profile_drag(profiles, rho, q_inf=None, chord=None, edge_probes=EDGE_PROBES):
+    """
+    Wake drag of aligned workbook profiles against their edge freestream (see edge_freestream).
 
-    def U_infinity():
-        return 23.8392323  # Freestream velocity (m/s)
+    Probes faster than the edge velocity are outside the wake and taken at U_inf, as the
+    rake route clips its total probes at the pitot total.
 
-    def p_infinity():
-        return 99831.30769  # Freestream pressure (Pa)
+    Arguments:
+    profiles : dict
+        Output of align_profiles.
+    rho : float or array-like
+        Air density (scalar or one value per row).
+    q_inf : float or array-like or None
+        Dynamic pressure for C_d (default: 0.5 * rho * U_inf**2 of the edge velocity).
+    chord : float or None
+        Model chord, for C_d.
 
-    def first_term(location_start, location_end):
-        # Find the nearest spanwise location indices
-        location_start_idx = np.abs(np.array(spanwise_locations) - location_start).argmin()
-        location_end_idx = np.abs(np.array(spanwise_locations) - location_end).argmin()
+    Returns:
+    dict
+        Output of wake_drag, plus the edge 'U_inf' and 'p_inf'.
+    """
+    freestream = edge_freestream(profiles, edge_probes)
+    velocities = np.minimum(profiles['velocities'], freestream['U_inf'][:, None])
+    result = wake_drag(velocities, profiles['pressures'], profiles['locations'], rho, freestream['U_inf'],
+                       freestream['p_inf'], q_inf, chord)
+    result.update(freestream)
+    return result
 
-        # Extract velocities at segment bounds
-        U_start = float(velocity_profile.iloc[location_start_idx])
-        U_end = float(velocity_profile.iloc[location_end_idx])
 
-        # Average velocity over the segment and return the momentum integrand
-        return (U_infinity() - ((U_start + U_end) / 2)) * ((U_start + U_end) / 2) * (location_end - location_start)
+def port_column(name):
+    """Column of a port (e.g. 'P050') in the pressure matrix of a run: P001 is column 0."""
+    return int(str(name).strip().lstrip('Pp')) - 1
 
-    def second_term(location_start, location_end):
-        # Find the nearest spanwise location indices
-        location_start_idx = np.abs(np.array(spanwise_locations_p) - location_start).argmin()
-        location_end_idx = np.abs(np.array(spanwise_locations_p) - location_end).argmin()
 
-        # Extract pressures at segment bounds
-        p_start = float(pressure_profile.iloc[location_start_idx])
-        p_end = float(pressure_profile.iloc[location_end_idx])
+def probe_map(tap_geometry=None, total=None, static=None, pitot=None):
+    """
+    Rake probes and the freestream pitot-static tube in the run file: port columns and
+    spanwise locations.
 
-        # Approximate pressure integral using trapezoidal rule
-        return ((p_infinity() - ((p_start + p_end) / 2)) * (location_end - location_start))
+    The default is the rake of the pressure-port sheet (total-pressure probes P050 - P096,
+    static probes P098 - P109, locations in mm) and its wall pitot-static tube (P097 total,
+    P110 static); total / static override the rake with {port name: location in mm}
+    mappings, e.g. for a different rake, and pitot the (total, static) port names.
 
-    # Compute total drag
-    total_drag = 0
-    for i in range(len(spanwise_locations) - 1):
-        location_start = spanwise_locations[i]
-        location_end = spanwise_locations[i + 1]
+    Arguments:
+    tap_geometry : dict or None
+        Output of run_loader.load_tap_geometry (needed unless all overrides are given).
+    total, static : dict or None
+        Probe name -> spanwise location (mm).
+    pitot : tuple or None
+        (total, static) port names of the freestream pitot-static tube.
 
-        # Compute contributions from both terms
-        segment_drag = rho * first_term(location_start, location_end)
-        pressure_drag = second_term(location_start, location_end)
-        total_drag += segment_drag + pressure_drag
+    Returns:
+    dict
+        'total_columns', 'static_columns' (columns of the pressure matrix, sorted by location),
+        'total_locations', 'static_locations' (m, like the wake workbooks) and
+        'pitot_columns' (columns of the pitot total and static ports).
+    """
+    if total is None:
+        total = dict(zip(tap_geometry['wake_total_names'], tap_geometry['wake_total_mm']))
+    if static is None:
+        static = dict(zip(tap_geometry['wake_static_names'], tap_geometry['wake_static_mm']))
+    if pitot is None:
+        pitot = (str(tap_geometry['pitot_total_name']), str(tap_geometry['pitot_static_name']))
+
+    probes = {}
+    for kind, mapping in (('total', total), ('static', static)):
+        names = sorted(mapping, key=lambda name: mapping[name])
+        probes[f"{kind}_columns"] = np.array([port_column(name) for name in names], dtype=int)
+        probes[f"{kind}_locations"] = np.array([mapping[name] for name in names], dtype=float) / 1000.0
+    probes['pitot_columns'] = np.array([port_column(name) for name in pitot], dtype=int)
+    return probes
+
+
+@profiling.traced('wake_profiles')
+def run_wake_profiles(run, probes, rho=None, static_rake=False):
+    """
+    Wake profiles of every row of a run straight from the rake ports, in the layout of align_profiles.
+
+    All ports read relative to the same tunnel reference pressure, so the profiles are
+    kept in that gauge frame together with the freestream they are compared to: the wall
+    pitot-static tube gives the freestream static pressure p_inf and total pressure
+    p_t_inf of every row, and U_inf = sqrt(2 (p_t_inf - p_inf) / rho). The static pressure
+    in the wake is p_inf (static pressure recovered across the far wake); with static_rake
+    it is the static rake interpolated to every total probe instead (the end values beyond
+    the rake). The local velocity is sqrt(2 (p_t - p) / rho). Total probes that read above
+    p_t_inf are outside the wake and are taken as p_t_inf, so fixed probe offsets (up to
+    30 Pa on some probes of raw_2d.txt) do not add negative drag around the wake.
+
+    Arguments:
+    run : dict
+        Run with 'alpha', 'rho' and the full 'pressures' matrix (run_loader.load_run,
+        live_run.parse_run_lines or a run archive entry).
+    probes : dict
+        Output of probe_map.
+    rho : float or array-like or None
+        Air density (default: the rho column of the run).
+    static_rake : bool
+        Take the wake static pressure from the static rake. Its readings sit about 15 Pa
+        above the wall static port in raw_2d.txt, which alone shifts C_d by about -0.06.
+
+    Returns:
+    dict
+        'aoa', 'locations' (m), 'velocities' and 'pressures' (gauge, n_rows x n_total_probes),
+        and per row 'U_inf' and 'p_inf' (gauge) for wake_drag.
+    """
+    pressures = np.asarray(run['pressures'], dtype=float)
+    total = pressures[:, probes['total_columns']]
+    p_total_inf = pressures[:, probes['pitot_columns'][0]]
+    p_inf = pressures[:, probes['pitot_columns'][1]]
+
+    if static_rake:
+        # Linear interpolation of the static rake onto the total probes, shared by all rows
+        static = pressures[:, probes['static_columns']]
+        static_locations = probes['static_locations']
+        targets = np.clip(probes['total_locations'], static_locations[0], static_locations[-1])
+        right = np.clip(np.searchsorted(static_locations, targets, side='right'), 1, len(static_locations) - 1)
+        left = right - 1
+        weight = (targets - static_locations[left]) / (static_locations[right] - static_locations[left])
+        wake_static = static[:, left] * (1.0 - weight) + static[:, right] * weight
+    else:
+        wake_static = np.repeat(p_inf[:, None], total.shape[1], axis=1)
+
+    rho = np.asarray(run['rho'] if rho is None else rho, dtype=float)
+    with np.errstate(invalid='ignore'):
+        velocities = np.sqrt(2.0 * (np.minimum(total, p_total_inf[:, None]) - wake_static) / (rho[:, None] if rho.ndim else rho))
+        U_inf = np.sqrt(2.0 * (p_total_inf - p_inf) / rho)
+    return {
+        'aoa': np.asarray(run['alpha'], dtype=float),
+        'locations': probes['total_locations'],
+        'velocities': velocities,
+        'pressures': wake_static,
+        'U_inf': U_inf,
+        'p_inf': p_inf,
+    }
+
+
+def has_wake_data(profiles):
+    """Rows of run_wake_profiles output where the rake and pitot were recorded (no missing readings)."""
+    return (np.isfinite(profiles['velocities']).all(axis=1) & np.isfinite(profiles['pressures']).all(axis=1)
+            & np.isfinite(profiles['U_inf']))
+
+
+def run_drag(run, probes, rho=None, q_inf=None, chord=None, static_rake=False):
+    """
+    Wake drag of every row of a run from its own rake and pitot readings (no wake workbooks needed).
+
+    On raw_2d.txt C_d is 0.007 - 0.025 over the attached range (XFOIL at Re = 2.5e5:
+    0.01 - 0.02) and about 0.17 once the airfoil has stalled.
+
+    Arguments:
+    run : dict
+        Loaded run or block of live rows (see run_wake_profiles).
+    probes : dict
+        Output of probe_map.
+    rho : float or array-like or None
+        Per-row air density (e.g. freestream.run_freestream); None uses the rho column of the run.
+    q_inf : float or array-like or None
+        Dynamic pressure for C_d (default: that of the pitot-static tube, 0.5 * rho * U_inf**2).
+    chord : float or None
+        Model chord; when given 'cd' is returned as well.
+    static_rake : bool
+        See run_wake_profiles.
+
+    Returns:
+    dict
+        Output of wake_drag, one value per row (NaN for rows without rake or pitot readings).
+    """
+    profiles = run_wake_profiles(run, probes, rho, static_rake)
+    rho = np.asarray(run['rho'] if rho is None else rho, dtype=float)
+    with np.errstate(invalid='ignore'):
+        wake = wake_drag(profiles['velocities'], profiles['pressures'], profiles['locations'], rho,
+                         profiles['U_inf'], profiles['p_inf'], q_inf, chord)
+    missing = ~has_wake_data(profiles)
+    return {name: np.where(missing, np.nan, values) for name, values in wake.items()}
+
+
+def load_run_wake(run_file, tap_file='DATA_ANALYSIS/PPS.xlsx', cache_dir=None, static_rake=False):
+    """Wake profiles of a run file through the cached run loader (see run_wake_profiles)."""
+    probes = probe_map(run_loader.load_tap_geometry(tap_file, cache_dir))
+    return run_wake_profiles(run_loader.load_run(run_file, cache_dir), probes, static_rake=static_rake)
+
+
+# Velocity and pressure profiles provided by the user, and the run whose conditions they were
+# measured at, read on the first call rather than at import
+velocity_file = 'DATA_ANALYSIS/wake_velocities.xlsx'
+pressure_file = 'DATA_ANALYSIS/wake_pressures.xlsx'
+run_file = 'DATA_ANALYSIS/raw_2d.txt'
+sensor_file = 'DATA_ANALYSIS/PPS.xlsx'
+
+
+@functools.lru_cache(maxsize=None)
+def load_default_profiles():
+    """Velocity and pressure profiles of the default wake workbooks (parsed once and cached by run_loader)."""
+    return load_wake_profiles(velocity_file), load_wake_profiles(pressure_file)
+
+
+# Function to calculate drag for a given AoA
+def calculate_drag(aoa):
+    velocity_profiles, pressure_profiles = load_default_profiles()
+    profiles = align_profiles(velocity_profiles, pressure_profiles, [aoa])
+    row_rho = rho
+    if row_rho is None:
+        # rho of the run row recorded at this angle (freestream.py)
+        data = run_loader.load_surface_run(run_file, sensor_file)
+        row = data['alpha_index'].find(aoa)[0]
+        row_rho = row_conditions(data, row)['rho'] if row >= 0 else np.nan
+    if U_inf is None or p_inf is None:
+        return float(profile_drag(profiles, row_rho)['drag'][0])
+    return float(wake_drag(profiles['velocities'], profiles['pressures'], profiles['locations'],
+                           row_rho, U_inf, p_inf)['drag'][0])
 
-    return total_drag
 
 # Iterate over AoAs and compute drag
-aoa_range = [-6, -5, -4, -3, -2, -1, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10.5, 11, 11.5, 12, 12.5, 13, 13.5, 14, 14.5, 15, 15.5, 16] 
-drag_results = [(aoa, calculate_drag(aoa)) for aoa in aoa_range]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wake-rake drag from the wake workbooks or straight from a run file.")
+    parser.add_argument('run_file', nargs='?', default=None,
+                        help="Run file with the rake ports (default: the wake workbooks)")
+    parser.add_argument('--tap-file', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet with the rake layout")
+    parser.add_argument('--static-rake', action='store_true',
+                        help="Take the wake static pressure from the static rake instead of the wall static port")
+    args = parser.parse_args()
+
+    if args.run_file:
+        run = run_loader.load_run(args.run_file)
+        probes = probe_map(run_loader.load_tap_geometry(args.tap_file))
+        aoa_range = run['alpha']
+        drags = run_drag(run, probes, static_rake=args.static_rake)['drag']
+    else:
+        aoa_range = [-6, -5, -4, -3, -2, -1, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10.5, 11, 11.5, 12, 12.5, 13, 13.5, 14, 14.5, 15, 15.5, 16]
+        drags = [calculate_drag(aoa) for aoa in aoa_range]
 
-# Output the results
-for aoa, drag in drag_results:
-    print(f"AoA: {aoa}°, Drag (D): {drag}")
+    # Output the results
+    for aoa, drag in zip(aoa_range, drags):
+        print(f"AoA: {aoa}°, Drag (D): {drag}")
@@ -0,0 +1,140 @@
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import run_loader
+
+logger = logging.getLogger(__name__)
+
+# Constants
+chord = 0.16  # Model chord (m)
+R_AIR = 287.05  # Specific gas constant of dry air (J/(kg K))
+
+# LTT calibration of the contraction pressure drop against the test-section dynamic pressure:
+# q_inf = a0 + a1 * Delta_Pb + a2 * Delta_Pb**2
+Q_CALIBRATION = (0.211804, 1.928442, 1.879374e-4)
+
+# Sutherland's law for the dynamic viscosity of air
+SUTHERLAND_MU_REF = 1.716e-5  # Pa s at T_REF
+SUTHERLAND_T_REF = 273.15  # K
+SUTHERLAND_S = 110.4  # K
+
+# Relative difference between the recorded rho and the ideal-gas value that is reported
+RHO_TOLERANCE = 0.01
+
+# Bump when the computed conditions change so cached entries are recomputed
+FREESTREAM_VERSION = 3
+
+
+def dynamic_pressure(delta_pb):
+    """Test-section dynamic pressure (Pa) from the contraction pressure drop Delta_Pb (Pa)."""
+    a0, a1, a2 = Q_CALIBRATION
+    delta_pb = np.asarray(delta_pb, dtype=float)
+    return a0 + a1 * delta_pb + a2 * delta_pb ** 2
+
+
+def air_viscosity(temperature_k):
+    """Dynamic viscosity of air (Pa s) at the given temperature in Kelvin (Sutherland)."""
+    temperature_k = np.asarray(temperature_k, dtype=float)
+    return (SUTHERLAND_MU_REF * (temperature_k / SUTHERLAND_T_REF) ** 1.5
+            * (SUTHERLAND_T_REF + SUTHERLAND_S) / (temperature_k + SUTHERLAND_S))
+
+
+def freestream_conditions(delta_pb, p_bar, temperature, chord=chord, rho=None):
+    """
+    Freestream conditions of every data point from the tunnel columns of the run file.
+
+    P_bar is the barometric pressure the tunnel draws its air from, so it is taken as the
+    freestream total pressure: the test-section static pressure is p_inf = P_bar - q_inf.
+    rho is the density recorded by the tunnel (the rho column) where there is one, else
+    the ideal-gas value at p_inf and T. Recorded values more than RHO_TOLERANCE away from
+    the ideal-gas value are logged as a warning.
+
+    Arguments:
+    delta_pb : array-like
+        Contraction pressure drop (Pa).
+    p_bar : array-like
+        Barometric pressure (hPa, as recorded in the P_bar column).
+    temperature : array-like
+        Air temperature (degrees C).
+    chord : float
+        Model chord for the Reynolds number (m).
+    rho : array-like or None
+        Recorded air density (kg/m^3); NaN entries take the ideal-gas value.
+
+    Returns:
+    dict
+        'q_inf' (Pa), 'p_inf' (static, Pa), 'rho' (kg/m^3), 'U_inf' (m/s), 'mu' (Pa s)
+        and 're', one value per data point.
+    """
+    q_inf = dynamic_pressure(delta_pb)
+    p_inf = np.asarray(p_bar, dtype=float) * 100.0 - q_inf
+    temperature_k = np.asarray(temperature, dtype=float) + 273.15
+    rho_ideal = p_inf / (R_AIR * temperature_k)
+    if rho is None:
+        rho = rho_ideal
+    else:
+        rho = np.asarray(rho, dtype=float)
+        with np.errstate(invalid='ignore'):
+            mismatch = np.abs(rho / rho_ideal - 1.0) > RHO_TOLERANCE
+        if mismatch.any():
+            logger.warning("Recorded rho differs from the ideal-gas value by more than %g%% on %d rows",
+                           100 * RHO_TOLERANCE, np.count_nonzero(mismatch))
+        rho = np.where(np.isfinite(rho), rho, rho_ideal)
+    U_inf = np.sqrt(2.0 * q_inf / rho)
+    mu = air_viscosity(temperature_k)
+    return {'q_inf': q_inf, 'p_inf': p_inf, 'rho': rho, 'U_inf': U_inf, 'mu': mu, 're': rho * U_inf * chord / mu}
+
+
+def run_freestream(run, chord=chord):
+    """Freestream conditions for a loaded run (run_loader.load_run, live rows or an archive entry)."""
+    return freestream_conditions(run['delta_pb'], run['p_bar'], run['temperature'], chord, run.get('rho'))
+
+
+def row_conditions(data, rows, chord=chord):
+    """Freestream conditions of rows of a surface view (run_loader.load_surface_run) from their recorded columns."""
+    return freestream_conditions(data['delta_pb'][rows], data['p_bar'][rows], data['temperature'][rows], chord,
+                                 data['rho'][rows])
+
+
+def row_dynamic_pressure(data, rows, q_inf=None):
+    """Dynamic pressure of rows of a surface view: a fixed q_inf if one is given, else that of row_conditions."""
+    if q_inf is not None:
+        return np.full(np.shape(rows), q_inf, dtype=float)
+    return row_conditions(data, rows)['q_inf']
+
+
+def load_freestream(run_file, chord=chord, cache_dir=None):
+    """
+    Freestream conditions of a run file, cached next to the parsed run.
+
+    Returns:
+    dict
+        See freestream_conditions.
+    """
+    def parse(path):
+        return run_freestream(run_loader.load_run(path, cache_dir), chord)
+
+    return run_loader.cached_parse(run_file, f"freestream_v{FREESTREAM_VERSION}_{chord:g}", parse, cache_dir)
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the freestream conditions of every data point in a run.")
+    parser.add_argument('run_file', nargs='?', default='DATA_ANALYSIS/raw_2d.txt')
+    parser.add_argument('--chord', type=float, default=chord, help="Model chord (m)")
+    args = parser.parse_args()
+
+    alpha = run_loader.load_run(args.run_file)['alpha']
+    conditions = load_freestream(args.run_file, args.chord)
+    for row, angle in enumerate(alpha):
+        print(f"Angle of Attack: {angle:.2f} degrees, q_inf: {conditions['q_inf'][row]:.2f} Pa, "
+              f"p_inf: {conditions['p_inf'][row]:.1f} Pa, rho: {conditions['rho'][row]:.4f} kg/m^3, U_inf: {conditions['U_inf'][row]:.3f} m/s, "
+              f"Re: {conditions['re'][row]:.4g}")
@@ -0,0 +1,183 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import profiling
+from .airfoil_geometry import load_geometry
+from .ct_calculations import ct_batch, geometry_slope_table
+from .drag_wake_rake import probe_map, run_drag
+from .freestream import chord, run_freestream
+from .run_loader import FIRST_PORT_COLUMN, N_PORTS, RUN_COLUMNS, SURFACE_TAPS, load_tap_geometry
+from .surface_integration import integrate_cn_cm, pressure_coefficients, surface_weights
+
+
+def _to_float(field):
+    try:
+        return float(field)
+    except ValueError:
+        return np.nan
+
+
+def parse_run_lines(lines):
+    """
+    Parse data lines of a run file (same layout as raw_2d.txt) into arrays.
+
+    Header lines (anything whose Run_nr field is not a number) are skipped.
+
+    Returns:
+    dict
+        Same keys as run_loader.parse_run_file, without 'ports'.
+    """
+    records = []
+    for line in lines:
+        fields = line.rstrip('\r\n').split('\t')
+        if len(fields) <= FIRST_PORT_COLUMN or not np.isfinite(_to_float(fields[0])):
+            continue
+        fields = fields[:FIRST_PORT_COLUMN + N_PORTS] + [''] * (FIRST_PORT_COLUMN + N_PORTS - len(fields))
+        records.append([_to_float(field) if column != 1 else np.nan for column, field in enumerate(fields)])
+
+    table = np.array(records, dtype=float).reshape(len(records), FIRST_PORT_COLUMN + N_PORTS)
+    rows = {name: table[:, column] for name, column in RUN_COLUMNS.items()}
+    rows['pressures'] = np.ascontiguousarray(table[:, FIRST_PORT_COLUMN:])
+    return rows
+
+
+def read_appended_rows(file_path, offset=0):
+    """
+    Parse only the rows appended to a run file since the last call.
+
+    A trailing line without a newline is treated as still being written and is left for
+    the next call. If the file shrank (new run written over it) reading restarts at 0.
+
+    Arguments:
+    file_path : str
+        Run file that is being appended to.
+    offset : int
+        Byte offset returned by the previous call (0 for the first call).
+
+    Returns:
+    tuple
+        (rows, new_offset): rows as returned by parse_run_lines.
+    """
+    if os.path.getsize(file_path) < offset:
+        offset = 0
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        chunk = f.read()
+
+    complete = chunk.rfind(b'\n') + 1
+    lines = chunk[:complete].decode('utf-8', errors='replace').splitlines()
+    return parse_run_lines(lines), offset + complete
+
+
+def reduce_rows(rows, weights, slope_table, q_inf=None, probes=None):
+    """
+    Cp, C_N, C_M and C_T for a block of rows through the batch reduction functions.
+
+    Without a fixed q_inf every row uses its own dynamic pressure (see freestream.py).
+    With a rake probe map (drag_wake_rake.probe_map) the wake drag of the rows is
+    computed from their rake and pitot ports as well.
+
+    Returns:
+    dict
+        'alpha', 'q_inf', 'cp', 'cn', 'cm', 'ct', 'drag' and 'cd_wake', one entry per
+        row (the wake columns are NaN without probes).
+    """
+    profiling.count('rows', len(rows['alpha']))
+    profiling.count('taps', len(rows['alpha']) * SURFACE_TAPS)
+    freestream = None
+    if q_inf is None:
+        freestream = run_freestream(rows)
+        q_inf = freestream['q_inf']
+    cp = pressure_coefficients(rows['pressures'][:, :SURFACE_TAPS], q_inf)
+    coefficients = integrate_cn_cm(cp, weights)
+    reduced = {
+        'alpha': rows['alpha'],
+        'q_inf': np.broadcast_to(q_inf, rows['alpha'].shape),
+        'cp': cp,
+        'cn': coefficients['cn'],
+        'cm': coefficients['cm'],
+        'ct': ct_batch(cp, slope_table),
+    }
+    if probes is not None:
+        wake = run_drag(rows, probes, None if freestream is None else freestream['rho'], reduced['q_inf'], chord)
+        reduced['drag'], reduced['cd_wake'] = wake['drag'], wake['cd']
+    else:
+        reduced['drag'] = reduced['cd_wake'] = np.full(len(rows['alpha']), np.nan)
+    return reduced
+
+
+def follow_run(file_path, tap_file='DATA_ANALYSIS/PPS.xlsx', airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx',
+               q_inf=None, poll_interval=0.2, timeout=None, wake_rake=False):
+    """
+    Follow a run file during a live sweep and reduce every new data point as it lands.
+
+    Tap weights, the slope table and the rake probe map are built once; each poll only
+    parses and reduces the rows appended since the previous poll.
+
+    Arguments:
+    file_path : str
+        Run file written by the DAQ.
+    tap_file, airfoil_file : str
+        Pressure-port sheet and airfoil coordinates.
+    q_inf : float or None
+        Fixed free-stream dynamic pressure (Pa); None uses the per-row conditions.
+    poll_interval : float
+        Seconds between polls when no new rows arrived.
+    timeout : float or None
+        Stop after this many seconds without new rows (None: follow forever).
+    wake_rake : bool
+        Compute the wake drag from the rake ports of every row (else NaN).
+
+    Yields:
+    dict
+        Output of reduce_rows for each block of new rows.
+    """
+    tap_geometry = load_tap_geometry(tap_file)
+    weights = surface_weights(tap_geometry['tap_x'], tap_geometry['tap_z'])
+    slope_table = geometry_slope_table(load_geometry(airfoil_file), tap_geometry['tap_x'], tap_geometry['tap_z'])
+    probes = probe_map(tap_geometry) if wake_rake else None
+
+    offset = 0
+    last_update = time.monotonic()
+    while True:
+        if os.path.exists(file_path):
+            with profiling.span('load', file=os.path.basename(file_path), offset=offset):
+                rows, offset = read_appended_rows(file_path, offset)
+            if len(rows['alpha']):
+                last_update = time.monotonic()
+                yield reduce_rows(rows, weights, slope_table, q_inf, probes)
+                continue
+        if timeout is not None and time.monotonic() - last_update > timeout:
+            return
+        time.sleep(poll_interval)
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reduce a run file live while the DAQ appends to it.")
+    parser.add_argument('run_file', nargs='?', default='DATA_ANALYSIS/raw_2d.txt')
+    parser.add_argument('--poll', type=float, default=0.2, help="Polling interval in seconds")
+    parser.add_argument('--timeout', type=float, default=None, help="Stop after this many idle seconds")
+    parser.add_argument('--q-inf', type=float, default=None,
+                        help="Fixed free-stream dynamic pressure (Pa), default: per row from Delta_Pb")
+    parser.add_argument('--wake-rake', action='store_true', help="Compute the wake drag from the rake ports")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start(args)
+
+    try:
+        for block in follow_run(args.run_file, q_inf=args.q_inf, poll_interval=args.poll, timeout=args.timeout,
+                                wake_rake=args.wake_rake):
+            for alpha, cn, cm, ct, cd in zip(block['alpha'], block['cn'], block['cm'], block['ct'], block['cd_wake']):
+                print(f"Angle of Attack: {alpha:.2f} degrees, C_N: {cn:.6f}, C_M: {cm:.6f}, C_T: {ct:.6f}, "
+                      f"C_D wake: {cd:.6f}")
+    finally:
+        profiling.finish(args)  # Also after Ctrl-C, the usual way to stop following
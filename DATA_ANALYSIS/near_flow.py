@@ -1,30 +1,27 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-
-# Constants
-q_inf = 335.7613443  # Free-stream dynamic pressure (Pa)
+import argparse
+import logging
+import os
+import sys
 
-# Load Excel data (sensor positions)
-excel_data = pd.read_excel('DATA_ANALYSIS/PPS.xlsx', header=None)
-# Extract sensor positions from Column B, Row 3 to Row 51 (adjusting for zero-indexing)
-sensor_positions = excel_data.iloc[2:52, 1]  # Rows 2 to 51, Column B
-sensor_positions_y = excel_data.iloc[2:52, 2]
+import numpy as np
 
-# Load text file data (angles of attack and pressure values)
-text_data = pd.read_csv('DATA_ANALYSIS/raw_2d.txt', sep="\t", header=None)
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
 
-# Extract angles of attack (starting from Column 3, Row 3 in text file)
-angles_of_attack = text_data.iloc[2:, 2]  # Extract from Row 3, Column 3 onwards
+from .alpha_index import ALPHA_TOLERANCE
+from .freestream import row_dynamic_pressure
+from .run_loader import load_surface_run
 
-# Convert angles of attack to numeric (to avoid any string/float issues)
-angles_of_attack = pd.to_numeric(angles_of_attack, errors='coerce')
+logger = logging.getLogger(__name__)
 
-# Extract pressure values (Columns 9 to 57 starting from Row 3 in text file)
-pressure_values = text_data.iloc[2:, 8:57]  # Extract from Columns 9 to 57, Row 3 onwards
+# Fixed free-stream dynamic pressure (Pa) overriding the recorded conditions of every row,
+# e.g. 335.7613443 of the original reduction; None takes q_inf per row from freestream.py
+q_inf = None
 
-# Ensure pressure values are numeric
-pressure_values = pressure_values.apply(pd.to_numeric, errors='coerce')
+# Input files, read on the first call rather than at import (parsed once and cached by run_loader)
+sensor_file = 'DATA_ANALYSIS/PPS.xlsx'
+pressure_file = 'DATA_ANALYSIS/raw_2d.txt'
 
 # Function to calculate Cp from pressure using q_inf
 def calculate_cp(pressure, q_inf):
@@ -32,31 +29,38 @@ def calculate_cp(pressure, q_inf):
 
 # Function to generate Cp vs Position graph for a given angle of attack
 # Function to generate Cp vs Position graph for a given angle of attack
-def plot_cp_vs_position(angle, split_point=None):
+def plot_cp_vs_position(angle, split_point=None, tolerance=ALPHA_TOLERANCE, out_file=None):
+    import matplotlib.pyplot as plt
+    if out_file:
+        plt.switch_backend('Agg')  # Only saved, so render without a display
+
+    data = load_surface_run(pressure_file, sensor_file)
+    sensor_positions = data['sensor_positions']  # x/c of the surface taps
+    sensor_positions_y = data['sensor_positions_y']
+    pressure_values = data['pressure_values']
+
     # Debugging: Check if the requested angle is present
-    print(f"Searching for angle: {angle}")
+    logger.debug("Searching for angle: %s", angle)
     
-    # Find the row where the angle of attack matches
-    matching_rows = angles_of_attack[angles_of_attack == angle]
+    # Find the first row recorded within the tolerance of the requested angle
+    angle_row = data['alpha_index'].find(angle, tolerance)[0]
     
-    if matching_rows.empty:
-        print(f"Error: Angle of attack {angle} not found.")
+    if angle_row < 0:
+        logger.error("Angle of attack %s not found.", angle)
         return
-
-    # Get the row index where the angle of attack matches
-    angle_row = matching_rows.index[0]
     
     # Extract the pressure values for the corresponding angle
-    pressures_at_angle = pressure_values.iloc[angle_row - 2]  # Adjust for zero-based index
+    pressures_at_angle = pressure_values[angle_row]
     
     # Ensure the length of pressures_at_angle matches the number of sensor positions
     if len(pressures_at_angle) != len(sensor_positions):
-        print(f"Warning: Pressure values length ({len(pressures_at_angle)}) doesn't match sensor positions length ({len(sensor_positions)}).")
+        logger.warning("Pressure values length (%d) doesn't match sensor positions length (%d).",
+                       len(pressures_at_angle), len(sensor_positions))
         return
     
     # Calculate Cp values for each pressure
-    cp_values = pressures_at_angle.apply(lambda p: calculate_cp(p, q_inf)).to_numpy()  # Convert to numpy array
-    sensor_positions_np = sensor_positions.to_numpy()  # Convert positions to numpy array
+    cp_values = calculate_cp(pressures_at_angle, row_dynamic_pressure(data, angle_row, q_inf))
+    sensor_positions_np = sensor_positions * 100.0  # Plot positions in percent of the chord
 
     # Set the split point (choose somewhere near the middle or manually set)
     if split_point is None or split_point >= len(sensor_positions):
@@ -119,29 +123,39 @@ def plot_cp_vs_position(angle, split_point=None):
     # Add the legend
     plt.legend()
     
-    # Show the plot
-    plt.show()
+    # Show the plot, or save it without opening a window
+    if out_file:
+        plt.savefig(out_file)
+        plt.close()
+        logger.info("Figure saved to %s", out_file)
+    else:
+        plt.show()
 
     # Calculate areas under the curve
     cp_u = np.where(sensor_positions_y > 0, cp_values, 0)
     cp_l = np.where(sensor_positions_y < 0, cp_values, 0)
-    x_positions = sensor_positions / 100.0  # Convert sensor positions to x/c
+    x_positions = sensor_positions  # Sensor positions are already x/c
 
     area_cpu = np.trapz(cp_u, x_positions)
     area_cpl = np.trapz(cp_l, x_positions)
     area_total = area_cpl - area_cpu
 
-    print("Area Cp Upper:", area_cpu)
-    print("Area Cp Lower:", area_cpl)
-    print("Total Area:", area_total)
+    logger.info("Area Cp Upper: %s", area_cpu)
+    logger.info("Area Cp Lower: %s", area_cpl)
+    logger.info("Total Area: %s", area_total)
 
 
 
 
 
 # Example: Plot Cp vs Position for a specific angle of attack (e.g., 5 degrees) and split point
-plot_cp_vs_position(-5, split_point=25)  # Try changing the split_point value to test different splits
-plot_cp_vs_position(0, split_point=25)
-plot_cp_vs_position(5, split_point=25)
-plot_cp_vs_position(10, split_point=25)
-plot_cp_vs_position(15, split_point=25)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plot Cp against the tap position for a few angles of attack.")
+    parser.add_argument('--out', default=None, help="Save the figures to this directory instead of showing them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    for angle in (-5, 0, 5, 10, 15):
+        out_file = os.path.join(args.out, f"near_flow_cp_{angle}.png") if args.out else None
+        plot_cp_vs_position(angle, split_point=25, out_file=out_file)  # Try changing the split_point value to test different splits
\ No newline at end of file
@@ -0,0 +1,277 @@
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import run_loader
+from .airfoil_geometry import load_geometry
+
+PANELS = 160  # Default number of panels when repanelling the contour
+
+
+def panel_nodes(geometry, n_panels=PANELS):
+    """
+    Panel end points on the contour of an AirfoilGeometry, in contour order (trailing edge,
+    upper surface, leading edge, lower surface, trailing edge).
+
+    With n_panels the contour is repanelled with half-cosine spacing on each surface: dense
+    at the leading edge, close to uniform at the trailing edge, where very short panels on
+    both surfaces of the sharp edge make the surface velocity oscillate. With None the
+    coordinate points themselves are the nodes.
+
+    Returns:
+    tuple
+        (x, z, s): node coordinates and contour parameters, n_panels + 1 each.
+    """
+    if n_panels is None:
+        s = geometry.x_spline.x
+    else:
+        n_upper = n_panels // 2
+        s_end = geometry.s_dense[-1]
+        s_le = geometry.s_leading_edge
+        upper = np.sin(np.linspace(0.0, np.pi / 2.0, n_upper + 1))
+        lower = 1.0 - np.cos(np.linspace(0.0, np.pi / 2.0, n_panels - n_upper + 1))
+        s = np.concatenate([s_le * upper, s_le + (s_end - s_le) * lower[1:]])
+    x, z = geometry.point(s)
+    return x, z, s
+
+
+class PanelSolver:
+    """
+    Linear-strength vortex panel method, factorized once per panel layout.
+
+    The vortex strength varies linearly over every panel and is continuous at the nodes;
+    the flow is tangent to the surface at the panel midpoints and the Kutta condition
+    closes the system at the trailing edge. The influence matrix depends only on the
+    geometry, so it is LU-factorized once and every set of angles of attack is a single
+    solve with one right-hand side per angle. Lengths are in chords, velocities in U_inf.
+
+    The panels run counter-clockwise (trailing edge, upper surface, lower surface); nodes
+    given clockwise are reversed, so the per-node and per-panel outputs then run opposite
+    to the input while the contour parameters keep their values.
+    """
+
+    def __init__(self, x_nodes, z_nodes, s_nodes=None):
+        from scipy.linalg import lu_factor
+
+        x_nodes = np.asarray(x_nodes, dtype=float)
+        z_nodes = np.asarray(z_nodes, dtype=float)
+        s_nodes = np.arange(len(x_nodes), dtype=float) if s_nodes is None else np.asarray(s_nodes, dtype=float)
+        # A negative signed (shoelace) area of the closed contour means it runs clockwise
+        self.reversed = bool(np.dot(x_nodes, np.roll(z_nodes, -1)) - np.dot(np.roll(x_nodes, -1), z_nodes) < 0.0)
+        if self.reversed:
+            x_nodes, z_nodes, s_nodes = x_nodes[::-1], z_nodes[::-1], s_nodes[::-1]
+        self.x_nodes = x_nodes
+        self.z_nodes = z_nodes
+        self.s_nodes = s_nodes
+        dx = np.diff(self.x_nodes)
+        dz = np.diff(self.z_nodes)
+        self.length = np.hypot(dx, dz)
+        self.theta = np.arctan2(dz, dx)
+        self.x_mid = (self.x_nodes[:-1] + self.x_nodes[1:]) / 2.0
+        self.z_mid = (self.z_nodes[:-1] + self.z_nodes[1:]) / 2.0
+        self.s_mid = (self.s_nodes[:-1] + self.s_nodes[1:]) / 2.0
+        # The contour runs counter-clockwise, so the outward normal is the tangent turned clockwise
+        self.normals = np.column_stack([np.sin(self.theta), -np.cos(self.theta)])
+
+        normal, self.tangential = self._influence_matrices()
+        self.lu = lu_factor(normal)
+
+    def __len__(self):
+        return len(self.length)
+
+    def _influence_matrices(self):
+        # Normal and tangential velocity at every midpoint (rows) induced by a unit vortex
+        # strength at every node (columns); the last row of the normal matrix is the Kutta
+        # condition. The coefficients are those of a clockwise contour, so they are assembled
+        # on the reversed nodes and flipped back into contour order: strengths count positive
+        # in the clockwise direction.
+        n_panels = len(self.length)
+        x_nodes = self.x_nodes[::-1]
+        z_nodes = self.z_nodes[::-1]
+        x_mid = self.x_mid[::-1]
+        z_mid = self.z_mid[::-1]
+        theta = self.theta[::-1] + np.pi
+        x = x_mid[:, None] - x_nodes[None, :-1]
+        z = z_mid[:, None] - z_nodes[None, :-1]
+        theta_i = theta[:, None]
+        theta_j = theta[None, :]
+        length = self.length[::-1][None, :]
+
+        a = -x * np.cos(theta_j) - z * np.sin(theta_j)
+        b = x ** 2 + z ** 2
+        c = np.sin(theta_i - theta_j)
+        d = np.cos(theta_i - theta_j)
+        e = x * np.sin(theta_j) - z * np.cos(theta_j)
+        f = np.log1p((length ** 2 + 2.0 * a * length) / b)
+        g = np.arctan2(e * length, b + a * length)
+        p = x * np.sin(theta_i - 2.0 * theta_j) + z * np.cos(theta_i - 2.0 * theta_j)
+        q = x * np.cos(theta_i - 2.0 * theta_j) - z * np.sin(theta_i - 2.0 * theta_j)
+
+        cn2 = d + 0.5 * q * f / length - (a * c + d * e) * g / length
+        cn1 = 0.5 * d * f + c * g - cn2
+        ct2 = c + 0.5 * p * f / length + (a * d - c * e) * g / length
+        ct1 = 0.5 * c * f - d * g - ct2
+        diagonal = np.arange(n_panels)
+        cn1[diagonal, diagonal], cn2[diagonal, diagonal] = -1.0, 1.0
+        ct1[diagonal, diagonal] = ct2[diagonal, diagonal] = np.pi / 2.0
+
+        # Node k collects the end of panel k - 1 and the start of panel k
+        normal = np.zeros((n_panels + 1, n_panels + 1))
+        tangential = np.zeros((n_panels, n_panels + 1))
+        normal[:-1, :-1] += cn1
+        normal[:-1, 1:] += cn2
+        tangential[:, :-1] += ct1
+        tangential[:, 1:] += ct2
+        normal[:-1] = normal[-2::-1, ::-1]
+        tangential = tangential[::-1, ::-1]
+        normal[-1, [0, -1]] = 1.0
+        return normal, tangential
+
+    def solve(self, alphas, x_ref=0.25):
+        """
+        Surface pressures and force coefficients for every angle of attack in one solve.
+
+        Arguments:
+        alphas : array-like
+            Angles of attack (degrees).
+        x_ref : float
+            Moment reference point (x/c); 0.25 like XFOIL's CM.
+
+        Returns:
+        dict
+            'alpha', 'gamma' (n_alpha x n_nodes, in 2 pi U_inf), 'cp' (n_alpha x n_panels, at
+            the panel midpoints), 'cl', 'cd' (pressure drag, zero up to discretization error)
+            and 'cm' (nose up positive), one per alpha.
+        """
+        from scipy.linalg import lu_solve
+
+        alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+        alpha = np.radians(alphas)
+        rhs = np.zeros((len(self) + 1, len(alphas)))
+        rhs[:-1] = np.sin(alpha[None, :] - self.theta[:, None])
+        gamma = lu_solve(self.lu, rhs).T
+
+        # Surface velocity in the clockwise direction, like the strengths
+        velocity = gamma @ self.tangential.T - np.cos(self.theta[None, :] - alpha[:, None])
+        cp = 1.0 - velocity ** 2
+
+        # Pressure force on every panel, -Cp n dl, summed in body axes and turned to wind axes
+        force_x = -(cp * self.normals[:, 0] * self.length).sum(axis=1)
+        force_z = -(cp * self.normals[:, 1] * self.length).sum(axis=1)
+        moment = (-(cp * self.length) * (self.z_mid * self.normals[:, 0]
+                                         - (self.x_mid - x_ref) * self.normals[:, 1])).sum(axis=1)
+        return {
+            'alpha': alphas,
+            'gamma': gamma,
+            'cp': cp,
+            'cl': force_z * np.cos(alpha) - force_x * np.sin(alpha),
+            'cd': force_x * np.cos(alpha) + force_z * np.sin(alpha),
+            'cm': moment,
+        }
+
+    def interpolation_matrix(self, s):
+        """
+        Linear interpolation along the contour from the panel midpoints to points at contour
+        parameters s, as an (n_points x n_panels) matrix; points without a parameter get NaN rows.
+        """
+        s = np.asarray(s, dtype=float)
+        matrix = np.zeros((len(s), len(self)))
+        valid = np.isfinite(s)
+        # Panels are searched in increasing s; on a reversed contour s decreases along them
+        panels = np.arange(len(self))[::-1] if self.s_mid[0] > self.s_mid[-1] else np.arange(len(self))
+        s_mid = self.s_mid[panels]
+        targets = np.clip(s[valid], s_mid[0], s_mid[-1])
+        right = np.clip(np.searchsorted(s_mid, targets, side='right'), 1, len(self) - 1)
+        left = right - 1
+        t = (targets - s_mid[left]) / (s_mid[right] - s_mid[left])
+        rows = np.flatnonzero(valid)
+        matrix[rows, panels[left]] = 1.0 - t
+        matrix[rows, panels[right]] += t
+        matrix[~valid] = np.nan
+        return matrix
+
+
+# Factorized solvers of the panel layouts seen by this process, keyed by their nodes
+_solvers = {}
+
+
+def get_solver(geometry, n_panels=PANELS):
+    """PanelSolver of a geometry and panel count, assembled and factorized once per distinct layout."""
+    x, z, s = panel_nodes(geometry, n_panels)
+    key = np.concatenate([x, z]).tobytes()
+    if key not in _solvers:
+        _solvers[key] = PanelSolver(x, z, s)
+    return _solvers[key]
+
+
+def inviscid_reference(alphas, airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx', tap_file='DATA_ANALYSIS/PPS.xlsx',
+                       n_panels=PANELS, x_ref=0.25):
+    """
+    Inviscid Cl, Cm and Cp at the pressure taps for every angle of attack.
+
+    Arguments:
+    alphas : array-like
+        Angles of attack (degrees).
+    airfoil_file : str
+        AIRFOIL_COORDINATES.xlsx or an XFOIL .dat file (see airfoil_geometry.read_coordinates).
+    tap_file : str
+        Pressure-port sheet.
+    n_panels : int or None
+        Panels of the repanelled contour (None: the coordinate points).
+    x_ref : float
+        Moment reference point (x/c).
+
+    Returns:
+    dict
+        The output of PanelSolver.solve plus 'tap_names' and 'cp_taps' (n_alpha x n_taps,
+        in the order of the pressure columns).
+    """
+    geometry = load_geometry(airfoil_file)
+    tap_geometry = run_loader.load_tap_geometry(tap_file)
+    solver = get_solver(geometry, n_panels)
+    solution = solver.solve(alphas, x_ref)
+    taps = geometry.tap_table(tap_geometry['tap_x'], tap_geometry['tap_z'])
+    solution['tap_names'] = tap_geometry['tap_names']
+    solution['cp_taps'] = solution['cp'] @ solver.interpolation_matrix(taps['s']).T
+    return solution
+
+
+def write_reference(solution, file_path):
+    """Write Cl, Cm and the tap Cp of inviscid_reference as CSV, one row per alpha."""
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['alpha', 'cl', 'cm'] + [f"cp_{name}" for name in solution['tap_names']])
+        for i, alpha in enumerate(solution['alpha']):
+            writer.writerow([f"{value:.10g}" for value in
+                             [alpha, solution['cl'][i], solution['cm'][i]] + list(solution['cp_taps'][i])])
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inviscid Cl, Cm and tap Cp from a linear-strength vortex panel method.")
+    parser.add_argument('airfoil', nargs='?', default='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx',
+                        help="AIRFOIL_COORDINATES.xlsx or an XFOIL .dat file")
+    parser.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet")
+    parser.add_argument('--alpha', type=float, nargs=3, default=[-6.0, 16.0, 1.0], metavar=('START', 'STOP', 'STEP'),
+                        help="Alpha sweep (degrees, inclusive)")
+    parser.add_argument('--panels', type=int, default=PANELS,
+                        help="Panels of the repanelled contour (0: use the coordinate points)")
+    parser.add_argument('--x-ref', type=float, default=0.25, help="Moment reference point (x/c)")
+    parser.add_argument('--out', default=None, help="Write Cl, Cm and the tap Cp as CSV")
+    args = parser.parse_args()
+
+    start, stop, step = args.alpha
+    alphas = np.round(np.arange(start, stop + step / 2.0, step), 6)
+    solution = inviscid_reference(alphas, args.airfoil, args.taps, args.panels or None, args.x_ref)
+    for alpha, cl, cm in zip(solution['alpha'], solution['cl'], solution['cm']):
+        print(f"Angle of Attack: {alpha:.2f} degrees, C_L: {cl:.4f}, C_M: {cm:.4f}")
+    if args.out:
+        write_reference(solution, args.out)
+        print(f"Reference written to {args.out}")
@@ -0,0 +1,234 @@
+import argparse
+import csv
+import warnings
+
+import numpy as np
+
+ATTACHED_RANGE = (-4.0, 8.0)  # Degrees; alpha range of the linear lift fit
+STALL_DEVIATION = 0.1  # Cl below the linear fit that marks stall onset
+
+FEATURE_COLUMNS = ['lift_slope', 'alpha_zero_lift', 'cl_max', 'alpha_cl_max', 'alpha_stall_onset',
+                   'ld_max', 'alpha_ld_max', 'cm0', 'x_ac']
+
+
+def up_branch(alpha):
+    """Rows of the upward sweep (up to the first maximum of alpha), sorted by alpha."""
+    alpha = np.asarray(alpha, dtype=float)
+    if not len(alpha) or np.isnan(alpha).all():
+        return np.arange(0)
+    rows = np.arange(np.nanargmax(alpha) + 1)
+    rows = rows[np.isfinite(alpha[rows])]
+    return rows[np.argsort(alpha[rows], kind='stable')]
+
+
+def pack_polars(polars, columns):
+    """
+    Stack polars of different lengths into NaN-padded (n_polars x n_points) arrays.
+
+    Each polar contributes the rows of its upward sweep (see up_branch), so the
+    return branch of a hysteresis sweep does not mix into the fits.
+
+    Arguments:
+    polars : list
+        Dicts (or structured arrays) with an 'alpha' entry and the given columns.
+    columns : list
+        Column names to pack besides 'alpha'.
+
+    Returns:
+    dict
+        'alpha' and one array per column.
+    """
+    branches = [up_branch(polar['alpha']) for polar in polars]
+    n_points = max((len(rows) for rows in branches), default=0)
+    packed = {name: np.full((len(polars), n_points), np.nan) for name in ['alpha'] + list(columns)}
+    for i, (polar, rows) in enumerate(zip(polars, branches)):
+        for name in packed:
+            packed[name][i, :len(rows)] = np.asarray(polar[name], dtype=float)[rows]
+    return packed
+
+
+def robust_line(x, y, mask):
+    """
+    Theil-Sen line through the masked points of every row: the median of the pairwise
+    slopes and the median intercept, so a few bad points do not tilt the fit.
+
+    Arguments:
+    x, y : np.ndarray
+        (n_polars x n_points) values.
+    mask : np.ndarray
+        Points to fit.
+
+    Returns:
+    tuple
+        (slope, intercept), one value per row (NaN with fewer than two points).
+    """
+    mask = mask & np.isfinite(x) & np.isfinite(y)
+    dx = x[:, None, :] - x[:, :, None]
+    dy = y[:, None, :] - y[:, :, None]
+    pairs = mask[:, None, :] & mask[:, :, None] & (dx > 0)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)  # Rows without a pair
+        slope = np.nanmedian(np.where(pairs, dy / dx, np.nan).reshape(len(x), -1), axis=1)
+        intercept = np.nanmedian(np.where(mask, y - slope[:, None] * x, np.nan), axis=1)
+    return slope, intercept
+
+
+def _at_argmax(values, other):
+    # Maximum of every row and the matching entry of other (NaN for all-NaN rows)
+    filled = np.where(np.isfinite(values), values, -np.inf)
+    index = np.argmax(filled, axis=1)
+    rows = np.arange(len(values))
+    found = np.isfinite(filled[rows, index])
+    return np.where(found, values[rows, index], np.nan), np.where(found, other[rows, index], np.nan)
+
+
+def extract_features(alpha, cl, cd=None, cm=None, x_ref=0.0, attached_range=ATTACHED_RANGE,
+                     stall_deviation=STALL_DEVIATION):
+    """
+    Aerodynamic features of many polars at once.
+
+    Arguments:
+    alpha, cl : array-like
+        (n_polars x n_points) angle of attack (degrees) and lift coefficient, NaN-padded
+        (see pack_polars); one polar may be given as 1-D arrays.
+    cd : array-like or None
+        Drag coefficient, for (Cl/Cd)max (points with Cd <= 0 are left out).
+    cm : array-like or None
+        Moment coefficient about x_ref, for Cm0 and the aerodynamic centre.
+    x_ref : float
+        Moment reference point (x/c): 0 for cm_calc / batch_reduce 'cm', 0.25 for XFOIL CM.
+    attached_range : tuple
+        Alpha range (degrees) of the attached-flow fits.
+    stall_deviation : float
+        Drop of Cl below the linear fit, beyond the fit range, that counts as stall onset.
+
+    Returns:
+    dict
+        One array per FEATURE_COLUMNS entry: 'lift_slope' (per degree), 'alpha_zero_lift',
+        'cl_max', 'alpha_cl_max', 'alpha_stall_onset', 'ld_max', 'alpha_ld_max',
+        'cm0' (Cm at zero lift) and 'x_ac' (x/c, from dCm/dCl).
+    """
+    alpha = np.atleast_2d(np.asarray(alpha, dtype=float))
+    cl = np.atleast_2d(np.asarray(cl, dtype=float))
+    n_polars = len(alpha)
+    attached = (alpha >= attached_range[0]) & (alpha <= attached_range[1])
+
+    lift_slope, cl_intercept = robust_line(alpha, cl, attached)
+    features = {'lift_slope': lift_slope}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features['alpha_zero_lift'] = -cl_intercept / lift_slope
+        features['cl_max'], features['alpha_cl_max'] = _at_argmax(cl, alpha)
+
+        linear_cl = lift_slope[:, None] * alpha + cl_intercept[:, None]
+        stalled = (alpha > attached_range[1]) & (linear_cl - cl > stall_deviation)
+    first = np.argmax(stalled, axis=1)
+    features['alpha_stall_onset'] = np.where(stalled.any(axis=1), alpha[np.arange(n_polars), first], np.nan)
+
+    if cd is not None:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cd = np.atleast_2d(np.asarray(cd, dtype=float))
+            lift_to_drag = np.where(cd > 0, cl / cd, np.nan)
+        features['ld_max'], features['alpha_ld_max'] = _at_argmax(lift_to_drag, alpha)
+    else:
+        features['ld_max'] = features['alpha_ld_max'] = np.full(n_polars, np.nan)
+
+    if cm is not None:
+        # Cm_ref = Cm_ac - (x_ac - x_ref) * Cl, so the Cm(Cl) line gives both at once
+        moment_slope, features['cm0'] = robust_line(cl, np.atleast_2d(np.asarray(cm, dtype=float)), attached)
+        features['x_ac'] = x_ref - moment_slope
+    else:
+        features['cm0'] = features['x_ac'] = np.full(n_polars, np.nan)
+    return features
+
+
+def read_polar_file(file_path, corrected=False, drag='wake'):
+    """
+    Polar of a batch_reduce table (CSV) or an XFOIL polar file, in common columns.
+
+    batch_reduce tables give Cl, the drag column chosen by drag ('wake' or 'pressure')
+    and the leading-edge moment; with corrected=True the wall-corrected columns are used
+    (quarter-chord moment). There is no fallback between the drag columns: the pressure
+    drag leaves out the skin friction, so mixing it with the wake drag makes L/D
+    meaningless, and a table without wake drag gives NaN L/D unless drag='pressure'.
+    XFOIL polars give CL, CD and the quarter-chord CM.
+
+    Returns:
+    dict
+        'alpha', 'cl', 'cd', 'cm' arrays and 'x_ref' (moment reference, x/c).
+    """
+    with open(file_path) as f:
+        lines = f.read().splitlines()
+
+    if lines and lines[0].startswith('alpha,'):
+        table = {name: np.array(values, dtype=float) for name, values in zip(lines[0].split(','),
+                                                                             zip(*csv.reader(lines[1:])))}
+        if drag not in ('wake', 'pressure'):
+            raise ValueError(f"Unknown drag column '{drag}', expected 'wake' or 'pressure'")
+        if corrected:
+            return {'alpha': table['alpha_corrected'], 'cl': table['cl_corrected'],
+                    'cd': table[f"cd_{drag}_corrected"], 'cm': table['cm_c4_corrected'], 'x_ref': 0.25}
+        return {'alpha': table['alpha'], 'cl': table['cl'], 'cd': table[f"cd_{drag}"], 'cm': table['cm'],
+                'x_ref': 0.0}
+
+    # XFOIL polar: column names above the '-------' line, numbers below it
+    separator = next((i for i, line in enumerate(lines) if line.strip().startswith('---')), None)
+    if not separator:
+        raise ValueError(f"{file_path}: neither a batch_reduce table nor an XFOIL polar")
+    names = lines[separator - 1].split()
+    values = np.array(' '.join(lines[separator + 1:]).split(), dtype=float).reshape(-1, len(names))
+    table = dict(zip(names, values.T))
+    return {'alpha': table['alpha'], 'cl': table['CL'], 'cd': table['CD'], 'cm': table['CM'], 'x_ref': 0.25}
+
+
+def polar_summary(file_paths, corrected=False, attached_range=ATTACHED_RANGE, drag='wake'):
+    """
+    Feature table of many polar files; files with the same moment reference are processed together.
+
+    Returns:
+    dict
+        'file' and one array per FEATURE_COLUMNS entry, in the order of file_paths.
+    """
+    polars = [read_polar_file(file_path, corrected, drag) for file_path in file_paths]
+    summary = {'file': list(file_paths)}
+    summary.update({name: np.full(len(polars), np.nan) for name in FEATURE_COLUMNS})
+    for x_ref in sorted({polar['x_ref'] for polar in polars}):
+        members = [i for i, polar in enumerate(polars) if polar['x_ref'] == x_ref]
+        packed = pack_polars([polars[i] for i in members], ['cl', 'cd', 'cm'])
+        features = extract_features(packed['alpha'], packed['cl'], packed['cd'], packed['cm'], x_ref, attached_range)
+        for name in FEATURE_COLUMNS:
+            summary[name][members] = features[name]
+    return summary
+
+
+def write_summary(summary, file_path):
+    """Write the feature table of polar_summary as CSV."""
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file'] + FEATURE_COLUMNS)
+        for i, name in enumerate(summary['file']):
+            writer.writerow([name] + [f"{summary[column][i]:.6g}" for column in FEATURE_COLUMNS])
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lift slope, zero-lift angle, Clmax, stall and L/D of many polars.")
+    parser.add_argument('polars', nargs='+', help="batch_reduce polar tables (CSV) or XFOIL polar files")
+    parser.add_argument('--corrected', action='store_true', help="Use the wall-corrected batch_reduce columns")
+    parser.add_argument('--drag', choices=['wake', 'pressure'], default='wake',
+                        help="Drag column of the batch_reduce tables for L/D")
+    parser.add_argument('--attached', type=float, nargs=2, default=list(ATTACHED_RANGE), metavar=('LOW', 'HIGH'),
+                        help="Alpha range of the linear fits (degrees)")
+    parser.add_argument('--out', default=None, help="Write the summary table as CSV")
+    args = parser.parse_args()
+
+    summary = polar_summary(args.polars, args.corrected, tuple(args.attached), args.drag)
+    for i, file_path in enumerate(summary['file']):
+        print(f"{file_path}: dCl/dalpha = {summary['lift_slope'][i]:.4f} /deg, "
+              f"alpha_0 = {summary['alpha_zero_lift'][i]:.2f} deg, "
+              f"Clmax = {summary['cl_max'][i]:.3f} at {summary['alpha_cl_max'][i]:.2f} deg, "
+              f"stall onset = {summary['alpha_stall_onset'][i]:.2f} deg, "
+              f"(L/D)max = {summary['ld_max'][i]:.1f} at {summary['alpha_ld_max'][i]:.2f} deg, "
+              f"Cm0 = {summary['cm0'][i]:.4f}, x_ac = {summary['x_ac'][i]:.3f}")
+    if args.out:
+        write_summary(summary, args.out)
+        print(f"Summary written to {args.out}")
@@ -0,0 +1,205 @@
+"""
+Opt-in timing of the reduction stages.
+
+Stages are marked with span() (a context manager) or @traced (a decorator) and
+counted with count(). Nothing is recorded until enable() is called: a disabled
+span is a shared null context and a disabled counter returns at once, so the
+instrumented functions cost a flag check per call.
+
+    profiling.enable()
+    with profiling.span('load', file=run_file):
+        run = run_loader.load_run(run_file)
+    profiling.count('rows', len(run['alpha']))
+    profiling.write_trace('trace.json')  # Chrome trace (chrome://tracing, Perfetto); .jsonl for JSON lines
+
+The command-line scripts take --trace PATH and --log-level (see add_arguments).
+"""
+import collections
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+_enabled = False
+_events = []  # Finished spans: name, ts / dur (microseconds), pid, tid, args
+_counters = collections.Counter()
+_null_span = contextlib.nullcontext()
+
+
+def enable():
+    """Start recording spans and counters."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording (what was recorded is kept until reset or drain)."""
+    global _enabled
+    _enabled = False
+
+
+def init_worker(enabled):
+    """
+    Initializer of worker processes: record if the parent does, starting empty (a forked
+    worker inherits the parent's spans, which the parent already has).
+    """
+    reset()
+    enable() if enabled else disable()
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget all recorded spans and counters."""
+    _events.clear()
+    _counters.clear()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        _events.append({'name': self.name, 'ts': self.start / 1e3, 'dur': (end - self.start) / 1e3,
+                        'pid': os.getpid(), 'tid': threading.get_ident(), 'args': self.args})
+        return False
+
+
+def span(name, **args):
+    """Context manager timing one stage; keyword arguments are stored with the span."""
+    if not _enabled:
+        return _null_span
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """Decorator: time every call of the function as a span (default name: the function name)."""
+    def decorate(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(label, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add n to a counter (rows, taps, files, ...)."""
+    if _enabled:
+        _counters[name] += int(n)
+
+
+def drain():
+    """Recorded spans and counters, removed from this process (to send them from a worker to the parent)."""
+    events, counters = list(_events), dict(_counters)
+    reset()
+    return events, counters
+
+
+def merge(events, counters):
+    """Add spans and counters drained in another process."""
+    _events.extend(events)
+    _counters.update(counters)
+
+
+def summary():
+    """
+    Time per stage.
+
+    Returns:
+    dict
+        Span name -> {'count', 'total', 'mean', 'max'} (seconds), in order of total time.
+        Nested spans are included in the time of their parents.
+    """
+    stages = {}
+    for event in _events:
+        stage = stages.setdefault(event['name'], {'count': 0, 'total': 0.0, 'max': 0.0})
+        stage['count'] += 1
+        stage['total'] += event['dur'] / 1e6
+        stage['max'] = max(stage['max'], event['dur'] / 1e6)
+    for stage in stages.values():
+        stage['mean'] = stage['total'] / stage['count']
+    return dict(sorted(stages.items(), key=lambda item: -item[1]['total']))
+
+
+def format_summary():
+    """Stage timings and counters as printable lines."""
+    lines = [f"{name:>16}: {stage['total'] * 1e3:10.2f} ms total, {stage['count']:6d} calls, "
+             f"{stage['mean'] * 1e3:9.3f} ms mean, {stage['max'] * 1e3:9.3f} ms max"
+             for name, stage in summary().items()]
+    lines += [f"{name:>16}: {value}" for name, value in sorted(_counters.items())]
+    return lines
+
+
+def write_jsonl(file_path):
+    """Write the spans, then the counters, as one JSON object per line."""
+    with open(file_path, 'w') as f:
+        for event in _events:
+            f.write(json.dumps(dict(event, type='span')) + '\n')
+        for name, value in sorted(_counters.items()):
+            f.write(json.dumps({'type': 'counter', 'name': name, 'value': value}) + '\n')
+
+
+def write_chrome_trace(file_path):
+    """Write the spans as complete events of the Chrome trace format, the counters as one counter event."""
+    trace = [dict(event, ph='X', cat='reduction') for event in _events]
+    if _counters:
+        end = max((event['ts'] + event['dur'] for event in _events), default=0.0)
+        trace.append({'name': 'counters', 'ph': 'C', 'ts': end, 'pid': os.getpid(), 'tid': 0,
+                      'args': dict(_counters)})
+    with open(file_path, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+def write_trace(file_path):
+    """JSON lines for a .jsonl path, else a Chrome trace."""
+    if file_path.endswith('.jsonl'):
+        write_jsonl(file_path)
+    else:
+        write_chrome_trace(file_path)
+
+
+def configure_logging(level='WARNING'):
+    """Send the log messages of the reduction modules to stderr at the given level."""
+    logging.basicConfig(level=getattr(logging, str(level).upper()), format="%(levelname)s %(name)s: %(message)s")
+
+
+def add_arguments(parser):
+    """Add --trace and --log-level to a command-line parser."""
+    parser.add_argument('--trace', default=None,
+                        help="Record stage timings to this file (.jsonl: JSON lines, else Chrome trace)")
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Log level of the reduction modules")
+
+
+def start(args):
+    """Apply --log-level and start recording if --trace was given."""
+    configure_logging(args.log_level)
+    if args.trace:
+        enable()
+
+
+def finish(args):
+    """Write the trace of --trace and print the stage summary."""
+    if args.trace:
+        write_trace(args.trace)
+        for line in format_summary():
+            print(line)
+        print(f"Trace written to {args.trace}")
@@ -0,0 +1,193 @@
+import argparse
+import os
+import sys
+import warnings
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import profiling, run_loader
+from .freestream import load_freestream
+from .surface_integration import first_matching_rows, pressure_coefficients, surface_segments
+
+# One bit per check in the flags matrix returned by check_run
+FLAG_NAN = 1         # Missing / non-numeric reading
+FLAG_STUCK = 2       # Tap reads the same value over the whole run
+FLAG_SATURATED = 4   # Reading at the transducer limit, or pinned at the tap's extreme
+FLAG_SPIKE = 8       # Cp jumps against the neighbouring taps of the same surface
+FLAG_REFERENCE = 16  # Cp deviates from the reference run at the same angle
+FLAG_NAMES = {FLAG_NAN: 'nan', FLAG_STUCK: 'stuck', FLAG_SATURATED: 'saturated', FLAG_SPIKE: 'spike',
+              FLAG_REFERENCE: 'reference'}
+
+# Default thresholds
+STUCK_TOLERANCE = 0.5     # Pa, standard deviation over the run below which a tap counts as stuck
+SATURATION_ROWS = 3       # Rows pinned at exactly the same extreme value before a tap counts as saturated
+SPIKE_THRESHOLD = 8.0     # Robust standard deviations of the neighbour residual
+MIN_SPIKE = 0.2           # Smallest Cp jump reported as a spike
+REFERENCE_TOLERANCE = 0.1  # Cp difference to the reference run
+
+
+def neighbour_residuals(cp, tap_x):
+    """
+    Compare every reading with its two neighbours on the same surface.
+
+    Returns:
+    tuple
+        (residuals, overshoot), both shaped like cp and NaN for the first and last tap of
+        each surface: the deviation from the line through the neighbours, and how far the
+        reading lies outside the interval spanned by the neighbours (0 inside it).
+    """
+    cp = np.atleast_2d(np.asarray(cp, dtype=float))
+    tap_x = np.asarray(tap_x, dtype=float)
+    residuals = np.full(cp.shape, np.nan)
+    overshoot = np.full(cp.shape, np.nan)
+    for start, stop in surface_segments(tap_x):
+        if stop - start < 3:
+            continue
+        x = tap_x[start:stop]
+        span = x[2:] - x[:-2]
+        weight = np.divide(x[2:] - x[1:-1], span, out=np.full(len(span), 0.5), where=span > 0)
+        block = cp[:, start:stop]
+        before, centre, after = block[:, :-2], block[:, 1:-1], block[:, 2:]
+        residuals[:, start + 1:stop - 1] = centre - (weight * before + (1.0 - weight) * after)
+        overshoot[:, start + 1:stop - 1] = np.maximum(0.0, np.maximum(centre - np.maximum(before, after),
+                                                                      np.minimum(before, after) - centre))
+    return residuals, overshoot
+
+
+@profiling.traced('quality')
+def check_run(pressures, q_inf, tap_x, alpha=None, reference=None, saturation=None,
+              stuck_tolerance=STUCK_TOLERANCE, spike_threshold=SPIKE_THRESHOLD, min_spike=MIN_SPIKE,
+              reference_tolerance=REFERENCE_TOLERANCE):
+    """
+    Flag bad readings over a whole run (n_alpha x n_taps) in a few array operations.
+
+    Checks:
+    - NaN: missing or non-numeric readings.
+    - stuck: taps whose pressure hardly changes over the run (needs at least 3 rows).
+    - saturated: readings at or beyond +-saturation (Pa), and taps pinned at exactly the
+      same extreme value in SATURATION_ROWS or more rows.
+    - spike: Cp off the line through the neighbouring taps by more than spike_threshold
+      robust standard deviations of that tap's residual over the run, and outside the
+      range of the two neighbours by at least min_spike (so a sharp but smooth suction
+      peak is not a spike).
+    - reference: |Cp - Cp_reference| above reference_tolerance at the same angle of attack.
+
+    Arguments:
+    pressures : array-like
+        (n_alpha x n_taps) surface pressures (Pa).
+    q_inf : float or array-like
+        Dynamic pressure, constant or per row.
+    tap_x : array-like
+        Tap x/c positions (the surfaces are split where x/c decreases).
+    alpha : array-like or None
+        Angle of attack per row (needed for the reference check).
+    reference : dict or None
+        {'alpha', 'cp'} of a known-good run.
+    saturation : float or None
+        Transducer range (Pa).
+
+    Returns:
+    dict
+        'flags' (uint8, one bit per failed check, see FLAG_*), 'bad' (boolean mask),
+        'row_deviation' (RMS Cp difference to the reference per row, NaN without one)
+        and 'counts' (number of flagged readings per check name).
+    """
+    pressures = np.atleast_2d(np.asarray(pressures, dtype=float))
+    n_rows, n_taps = pressures.shape
+    flags = np.zeros((n_rows, n_taps), dtype=np.uint8)
+    finite = np.isfinite(pressures)
+    flags[~finite] |= FLAG_NAN
+
+    if n_rows >= 3:
+        spread = np.nanstd(np.where(finite, pressures, np.nan), axis=0)
+        stuck = spread < stuck_tolerance
+        flags[:, stuck] |= FLAG_STUCK
+    else:
+        stuck = np.zeros(n_taps, dtype=bool)
+
+    if saturation is not None:
+        flags[finite & (np.abs(np.where(finite, pressures, 0.0)) >= saturation)] |= FLAG_SATURATED
+    if n_rows >= SATURATION_ROWS:
+        filled = np.where(finite, pressures, np.nan)
+        for extreme in (np.nanmax, np.nanmin):
+            pinned = filled == extreme(filled, axis=0)
+            pinned_taps = (pinned.sum(axis=0) >= SATURATION_ROWS) & ~stuck
+            flags[pinned & pinned_taps] |= FLAG_SATURATED
+
+    cp = pressure_coefficients(pressures, q_inf)
+    residuals, overshoot = neighbour_residuals(cp, tap_x)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)  # Edge taps have no residual at all
+        centre = np.nanmedian(residuals, axis=0)
+        scale = 1.4826 * np.nanmedian(np.abs(residuals - centre), axis=0)
+        spikes = (np.abs(residuals - centre) > spike_threshold * scale) & (overshoot > min_spike)
+    # A neighbour that is already flagged makes the residual meaningless
+    flags[spikes & (flags == 0)] |= FLAG_SPIKE
+
+    row_deviation = np.full(n_rows, np.nan)
+    if reference is not None and alpha is not None:
+        alpha = np.asarray(alpha, dtype=float)
+        if np.array_equal(alpha, reference['alpha']):
+            rows = np.arange(n_rows)  # Same sweep: compare row by row (keeps hysteresis branches apart)
+        else:
+            rows = first_matching_rows(reference['alpha'], alpha)
+        matched = rows >= 0
+        difference = cp[matched] - np.asarray(reference['cp'], dtype=float)[rows[matched]]
+        with np.errstate(invalid='ignore'):
+            flags[np.flatnonzero(matched)[:, None], np.arange(n_taps)] |= np.where(
+                np.abs(difference) > reference_tolerance, FLAG_REFERENCE, 0).astype(np.uint8)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            row_deviation[matched] = np.sqrt(np.nanmean(difference ** 2, axis=1))
+
+    counts = {name: int(np.count_nonzero(flags & bit)) for bit, name in FLAG_NAMES.items()}
+    return {'flags': flags, 'bad': flags != 0, 'row_deviation': row_deviation, 'counts': counts}
+
+
+def load_reference(run_file, q_inf=None):
+    """Alpha and Cp of a known-good run file, for the reference check of check_run."""
+    run = run_loader.load_run(run_file)
+    if q_inf is None:
+        q_inf = load_freestream(run_file)['q_inf']
+    return {'alpha': run['alpha'], 'cp': pressure_coefficients(run['pressures'][:, :run_loader.SURFACE_TAPS], q_inf)}
+
+
+def describe_flags(flags, tap_names, alpha):
+    """One line per flagged tap: the checks it failed and the angles of attack concerned."""
+    lines = []
+    for tap in np.flatnonzero(flags.any(axis=0)):
+        failed = [name for bit, name in FLAG_NAMES.items() if (flags[:, tap] & bit).any()]
+        rows = np.flatnonzero(flags[:, tap])
+        if len(rows) == len(alpha):
+            where = "all rows"
+        else:
+            where = "alpha " + ", ".join(f"{angle:g}" for angle in np.asarray(alpha)[rows])
+        lines.append(f"{tap_names[tap]}: {'/'.join(failed)} ({where})")
+    return lines
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag bad taps and readings in tunnel run files.")
+    parser.add_argument('runs', nargs='+', help="Run files")
+    parser.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet")
+    parser.add_argument('--reference', default=None, help="Known-good run to compare against")
+    parser.add_argument('--saturation', type=float, default=None, help="Transducer range (Pa)")
+    args = parser.parse_args()
+
+    tap_geometry = run_loader.load_tap_geometry(args.taps)
+    reference = load_reference(args.reference) if args.reference else None
+    for run_file in args.runs:
+        run = run_loader.load_run(run_file)
+        result = check_run(run['pressures'][:, :run_loader.SURFACE_TAPS], load_freestream(run_file)['q_inf'],
+                           tap_geometry['tap_x'], run['alpha'], reference, args.saturation)
+        n_bad = int(result['bad'].sum())
+        print(f"{run_file}: {n_bad} of {result['bad'].size} readings flagged {result['counts']}")
+        for line in describe_flags(result['flags'], tap_geometry['tap_names'], run['alpha']):
+            print(f"  {line}")
+        if reference is not None:
+            print(f"  max RMS Cp deviation from the reference: {np.nanmax(result['row_deviation']):.4f}")
@@ -0,0 +1,184 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import run_loader
+from .alpha_index import ALPHA_TOLERANCE, get_alpha_index
+
+# Every archived run/workbook is a directory '<name>.run' holding:
+#   meta.json    - kind, source file, content hash and matrix shape
+#   columns.npz  - the small per-row and per-tap vectors
+#   matrix.f32   - the (n_rows x n_columns) data matrix as raw little-endian float32 (memory-mapped on read)
+ENTRY_SUFFIX = '.run'
+MATRIX_DTYPE = '<f4'
+ARCHIVE_VERSION = 1
+
+
+def is_archive_entry(path):
+    """True if path is an archive entry directory."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'meta.json'))
+
+
+def _write_entry(archive_dir, name, meta, columns, matrix):
+    # Build the entry next to its final location and swap it in at the end
+    os.makedirs(archive_dir, exist_ok=True)
+    entry_path = os.path.join(archive_dir, name + ENTRY_SUFFIX)
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    matrix = np.ascontiguousarray(matrix, dtype=MATRIX_DTYPE)
+    matrix.tofile(os.path.join(tmp_path, 'matrix.f32'))
+    with open(os.path.join(tmp_path, 'columns.npz'), 'wb') as f:
+        np.savez(f, **columns)
+    meta = dict(meta, version=ARCHIVE_VERSION, shape=list(matrix.shape), dtype=MATRIX_DTYPE)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    if os.path.exists(entry_path):
+        shutil.rmtree(entry_path)
+    os.replace(tmp_path, entry_path)
+    return entry_path
+
+
+def write_run(archive_dir, run_file, tap_file=None, name=None):
+    """
+    Archive a tunnel run file (raw_2d.txt layout).
+
+    Arguments:
+    archive_dir : str
+        Archive root directory.
+    run_file : str
+        Run file to convert.
+    tap_file : str or None
+        Pressure-port sheet stored with the run (PPS.xlsx), optional.
+    name : str or None
+        Entry name (default: the run file name without extension).
+
+    Returns:
+    str
+        Path of the archive entry.
+    """
+    run = run_loader.load_run(run_file)
+    columns = {key: value for key, value in run.items() if key != 'pressures'}
+    if tap_file is not None:
+        columns.update(run_loader.load_tap_geometry(tap_file))
+
+    meta = {
+        'kind': 'run',
+        'source': os.path.abspath(run_file),
+        'source_hash': run_loader.file_hash(run_file),
+        'tap_source': os.path.abspath(tap_file) if tap_file is not None else None,
+    }
+    name = name or os.path.splitext(os.path.basename(run_file))[0]
+    return _write_entry(archive_dir, name, meta, columns, run['pressures'])
+
+
+def write_wake(archive_dir, workbook, name=None):
+    """
+    Archive a wake workbook (wake_velocities.xlsx / wake_pressures.xlsx layout).
+
+    Returns:
+    str
+        Path of the archive entry.
+    """
+    profiles = run_loader.load_wake_profiles(workbook)
+    meta = {
+        'kind': 'wake',
+        'source': os.path.abspath(workbook),
+        'source_hash': run_loader.file_hash(workbook),
+    }
+    name = name or os.path.splitext(os.path.basename(workbook))[0]
+    columns = {'aoa': profiles['aoa'], 'locations': profiles['locations']}
+    return _write_entry(archive_dir, name, meta, columns, profiles['values'])
+
+
+def read_meta(entry_path):
+    with open(os.path.join(entry_path, 'meta.json')) as f:
+        return json.load(f)
+
+
+def open_entry(entry_path):
+    """
+    Open an archive entry without reading its data matrix into memory.
+
+    Returns:
+    dict
+        For runs the same keys as run_loader.load_run (plus any stored tap geometry), with
+        'pressures' as a read-only np.memmap. For wake workbooks the same keys as
+        run_loader.load_wake_profiles, with 'values' as a np.memmap.
+    """
+    meta = read_meta(entry_path)
+    with np.load(os.path.join(entry_path, 'columns.npz'), allow_pickle=False) as columns:
+        entry = {name: columns[name] for name in columns.files}
+
+    matrix = np.memmap(os.path.join(entry_path, 'matrix.f32'), dtype=meta['dtype'], mode='r',
+                       shape=tuple(meta['shape']))
+    entry['pressures' if meta['kind'] == 'run' else 'values'] = matrix
+    return entry
+
+
+def list_entries(archive_dir, kind=None):
+    """All entry paths in an archive, optionally only those of one kind ('run' or 'wake')."""
+    entries = sorted(glob.glob(os.path.join(archive_dir, '*' + ENTRY_SUFFIX)))
+    return [entry for entry in entries if is_archive_entry(entry) and (kind is None or read_meta(entry)['kind'] == kind)]
+
+
+def find_alpha(archive_dir, alpha, tolerance=ALPHA_TOLERANCE):
+    """
+    Find every archived data point at a given angle of attack, across all runs.
+
+    Only the small alpha vectors are read, and each is searched through its AlphaIndex
+    (built once per distinct column); the pressure rows can then be sliced from the
+    memory-mapped matrices.
+
+    Returns:
+    list
+        (entry_path, row positions) for every run with at least one matching row.
+    """
+    matches = []
+    for entry_path in list_entries(archive_dir, kind='run'):
+        with np.load(os.path.join(entry_path, 'columns.npz'), allow_pickle=False) as columns:
+            rows = get_alpha_index(columns['alpha']).all_rows(alpha, tolerance)
+        if rows.size:
+            matches.append((entry_path, rows))
+    return matches
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert run files and wake workbooks into a memory-mapped archive.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help="Add run files (*.txt) and wake workbooks (*.xlsx) to the archive")
+    convert.add_argument('archive')
+    convert.add_argument('sources', nargs='+')
+    convert.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet stored with each run")
+
+    query = subparsers.add_parser('query', help="List archived rows at an angle of attack")
+    query.add_argument('archive')
+    query.add_argument('--alpha', type=float, required=True)
+    query.add_argument('--tolerance', type=float, default=ALPHA_TOLERANCE, help="Degrees")
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        for pattern in args.sources:
+            for source in sorted(glob.glob(pattern)):
+                if source.lower().endswith('.xlsx'):
+                    print(write_wake(args.archive, source))
+                else:
+                    print(write_run(args.archive, source, tap_file=args.taps))
+    else:
+        for entry_path, rows in find_alpha(args.archive, args.alpha, args.tolerance):
+            alpha = open_entry(entry_path)['alpha'][rows]
+            print(f"{entry_path}: rows {rows.tolist()} (alpha {alpha.tolist()})")
@@ -0,0 +1,289 @@
+import hashlib
+import os
+
+import numpy as np
+
+from . import profiling
+from .alpha_index import AlphaIndex
+
+# Parsed files are cached here as .npz archives so a re-run skips pandas/openpyxl
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# Layout of the tunnel run file (raw_2d.txt): two header rows, then one row per data point
+RUN_COLUMNS = {
+    'run_nr': 0,
+    'alpha': 2,
+    'delta_pb': 3,
+    'p_bar': 4,
+    'temperature': 5,
+    'rpm': 6,
+    'rho': 7,
+}
+FIRST_PORT_COLUMN = 8   # P001 starts in column 9
+N_PORTS = 113           # P001 - P113
+SURFACE_TAPS = 49       # P001 - P049 are the airfoil surface taps
+
+# Bump when the layout of a cached entry changes
+CACHE_VERSION = 2
+
+
+def file_signature(file_path):
+    """
+    Cheap identity of a file on disk.
+
+    Returns:
+    tuple
+        (modification time in ns, size in bytes).
+    """
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(file_path):
+    """Return the SHA-1 hex digest of the file contents."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(file_path, tag, cache_dir):
+    key = hashlib.sha1(f"{tag}|{os.path.abspath(file_path)}".encode()).hexdigest()[:20]
+    prefix = ''.join(ch if ch.isalnum() else '_' for ch in tag)
+    return os.path.join(cache_dir, f"{prefix}_{key}.npz")
+
+
+def _write_cache(cache_path, arrays):
+    # Write to a temporary file first so concurrent readers never see half an archive
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, cache_path)
+
+
+def cached_parse(file_path, tag, parser, cache_dir=None):
+    """
+    Parse a file once and reuse the result from an on-disk cache.
+
+    The cache entry is keyed by the file path and tag and validated against the
+    file's mtime/size and, if those changed, its content hash. A file that was only
+    touched (same contents) is not re-parsed.
+
+    Arguments:
+    file_path : str
+        File to parse.
+    tag : str
+        Name of the parse variant (different parsers of the same file get different entries).
+    parser : callable
+        parser(file_path) -> dict of NumPy arrays.
+    cache_dir : str or None
+        Cache directory (default: CACHE_DIR).
+
+    Returns:
+    dict
+        Parsed arrays.
+    """
+    profiling.count('files')
+    with profiling.span('load', file=os.path.basename(os.path.normpath(file_path)), tag=tag):
+        return _cached_parse(file_path, tag, parser, cache_dir)
+
+
+def _cached_parse(file_path, tag, parser, cache_dir):
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    cache_path = _cache_path(file_path, tag, cache_dir)
+    mtime, size = file_signature(file_path)
+    content_hash = None
+
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as cached:
+                arrays = {name: cached[name] for name in cached.files}
+        except (OSError, ValueError):
+            arrays = None  # Corrupt entry, parse again
+
+        if arrays is not None and int(arrays.pop('_version')) == CACHE_VERSION:
+            cached_mtime = int(arrays.pop('_mtime'))
+            cached_size = int(arrays.pop('_size'))
+            cached_hash = str(arrays.pop('_hash'))
+            if (cached_mtime, cached_size) == (mtime, size):
+                return arrays
+            content_hash = file_hash(file_path)
+            if content_hash == cached_hash:
+                # Same contents with a new timestamp: refresh the entry instead of re-parsing
+                _write_cache(cache_path, dict(arrays, _version=CACHE_VERSION, _mtime=mtime,
+                                              _size=size, _hash=content_hash))
+                return arrays
+
+    if content_hash is None:
+        content_hash = file_hash(file_path)
+    profiling.count('files_parsed')
+    arrays = {name: np.asarray(value) for name, value in parser(file_path).items()}
+    _write_cache(cache_path, dict(arrays, _version=CACHE_VERSION, _mtime=mtime,
+                                  _size=size, _hash=content_hash))
+    return arrays
+
+
+def parse_run_file(file_path):
+    """
+    Parse a tab-separated tunnel run file (same layout as raw_2d.txt).
+
+    Returns:
+    dict
+        'alpha', 'delta_pb', 'p_bar', 'temperature', 'rpm', 'rho', 'run_nr' as 1-D float arrays
+        (one entry per data point), 'pressures' as an (n_rows x 113) float array of P001 - P113
+        and 'ports' with the port names.
+    """
+    import pandas as pd
+
+    text_data = pd.read_csv(file_path, sep="\t", header=None)
+    ports = [str(name).strip() for name in text_data.iloc[0, FIRST_PORT_COLUMN:FIRST_PORT_COLUMN + N_PORTS]]
+    rows = text_data.iloc[2:]
+
+    run = {}
+    for name, column in RUN_COLUMNS.items():
+        run[name] = pd.to_numeric(rows.iloc[:, column], errors='coerce').to_numpy(dtype=float)
+    pressures = rows.iloc[:, FIRST_PORT_COLUMN:FIRST_PORT_COLUMN + N_PORTS].apply(pd.to_numeric, errors='coerce')
+    run['pressures'] = np.ascontiguousarray(pressures.to_numpy(dtype=float))
+    run['ports'] = np.array(ports)
+    return run
+
+
+def parse_tap_geometry(file_path):
+    """
+    Parse the pressure-port sheet (PPS.xlsx).
+
+    Returns:
+    dict
+        'tap_names', 'tap_x', 'tap_z' for the surface taps (x/c and z/c as fractions of the chord),
+        'wake_total_names', 'wake_total_mm' for the total-pressure rake probes and
+        'wake_static_names', 'wake_static_mm' for the static-pressure rake probes and
+        'pitot_total_name', 'pitot_static_name' for the pitot-static tube at the test-section wall.
+    """
+    import pandas as pd
+
+    excel_data = pd.read_excel(file_path, header=None)
+
+    def column_block(name_col, value_col):
+        block = excel_data.iloc[2:, [name_col, value_col]].dropna()
+        names = np.array([str(name).strip() for name in block.iloc[:, 0]])
+        values = pd.to_numeric(block.iloc[:, 1], errors='coerce').to_numpy(dtype=float)
+        return names, values
+
+    taps = excel_data.iloc[2:2 + SURFACE_TAPS, :3]
+    total_names, total_mm = column_block(4, 5)
+    static_names, static_mm = column_block(7, 8)
+    pitot = excel_data.iloc[2:, [10, 11]].dropna()
+    pitot = {str(kind).strip(): str(name).strip() for name, kind in zip(pitot.iloc[:, 0], pitot.iloc[:, 1])}
+    return {
+        'tap_names': np.array([str(name).strip() for name in taps.iloc[:, 0]]),
+        'tap_x': pd.to_numeric(taps.iloc[:, 1], errors='coerce').to_numpy(dtype=float) / 100.0,
+        'tap_z': pd.to_numeric(taps.iloc[:, 2], errors='coerce').to_numpy(dtype=float) / 100.0,
+        'wake_total_names': total_names,
+        'wake_total_mm': total_mm,
+        'wake_static_names': static_names,
+        'wake_static_mm': static_mm,
+        'pitot_total_name': np.array(pitot.get('total pressure', '')),
+        'pitot_static_name': np.array(pitot.get('static pressure', '')),
+    }
+
+
+def parse_wake_profiles(file_path):
+    """
+    Parse a wake workbook (wake_velocities.xlsx / wake_pressures.xlsx layout).
+
+    Row 3 holds the spanwise probe locations, the first column the AoA values.
+    Columns without a numeric location or without data are dropped.
+
+    Returns:
+    dict
+        'aoa' (n_alpha), 'locations' (n_probes) and 'values' (n_alpha x n_probes).
+    """
+    import pandas as pd
+
+    data = pd.read_excel(file_path, header=2)
+    aoa_column = data.columns[0]  # 'Location (mm)': the first column contains AoA values
+    rows = data.iloc[1:]  # Exclude the 'Alpha (degrees)' row
+
+    probe_columns = []
+    locations = []
+    for column in data.columns[1:]:
+        location = pd.to_numeric(pd.Series([column]), errors='coerce').iloc[0]
+        if np.isfinite(location) and rows[column].notna().any():
+            probe_columns.append(column)
+            locations.append(float(location))
+
+    return {
+        'aoa': pd.to_numeric(rows[aoa_column], errors='coerce').to_numpy(dtype=float),
+        'locations': np.array(locations),
+        'values': rows[probe_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float),
+    }
+
+
+def load_run(file_path, cache_dir=None):
+    """Load a tunnel run file through the parse cache (see parse_run_file)."""
+    return cached_parse(file_path, 'run', parse_run_file, cache_dir)
+
+
+def load_tap_geometry(file_path, cache_dir=None):
+    """Load the pressure-port geometry through the parse cache (see parse_tap_geometry)."""
+    return cached_parse(file_path, 'taps', parse_tap_geometry, cache_dir)
+
+
+def load_airfoil_geometry(file_path, sheet_name="Sheet1", usecols="B:C", cache_dir=None):
+    """
+    Load airfoil geometry (x and z columns) from an Excel file through the parse cache.
+
+    Returns:
+    tuple
+        x and z coordinates as NumPy arrays.
+    """
+    def parse(path):
+        import pandas as pd
+
+        airfoil_data = pd.read_excel(path, sheet_name=sheet_name, header=1, usecols=usecols)
+        airfoil_data.columns = ['x', 'z']
+        return {'x': airfoil_data['x'].to_numpy(dtype=float), 'z': airfoil_data['z'].to_numpy(dtype=float)}
+
+    coords = cached_parse(file_path, f"airfoil_{sheet_name}_{usecols}", parse, cache_dir)
+    return coords['x'], coords['z']
+
+
+def load_wake_profiles(file_path, cache_dir=None):
+    """Load a wake workbook through the parse cache (see parse_wake_profiles)."""
+    return cached_parse(file_path, 'wake', parse_wake_profiles, cache_dir)
+
+
+# Surface views of runs already loaded by this process (see load_surface_run)
+_surface_runs = {}
+
+
+def load_surface_run(run_file, tap_file, cache_dir=None):
+    """
+    Tap positions, angles of attack and surface pressures of a run, loaded on first use.
+
+    Repeated calls with the same unchanged files return the same arrays after only a stat of
+    each file, so per-angle functions can call this instead of loading data at import time.
+    A file rewritten since (new mtime or size) is loaded again.
+
+    Returns:
+    dict
+        'sensor_positions' (x/c), 'sensor_positions_y' (z/c), 'angles_of_attack',
+        'alpha_index' (AlphaIndex of the angles), 'pressure_values' (n_rows x SURFACE_TAPS)
+        and the 'delta_pb', 'p_bar', 'temperature', 'rho' columns for the freestream conditions.
+    """
+    key = (os.path.abspath(run_file), os.path.abspath(tap_file))
+    signature = (file_signature(run_file), file_signature(tap_file))
+    if key not in _surface_runs or _surface_runs[key][0] != signature:
+        tap_geometry = load_tap_geometry(tap_file, cache_dir)
+        run = load_run(run_file, cache_dir)
+        _surface_runs[key] = signature, {
+            'sensor_positions': tap_geometry['tap_x'],
+            'sensor_positions_y': tap_geometry['tap_z'],
+            'angles_of_attack': run['alpha'],
+            'alpha_index': AlphaIndex(run['alpha']),
+            'pressure_values': run['pressures'][:, :SURFACE_TAPS],
+            **{name: run[name] for name in ('delta_pb', 'p_bar', 'temperature', 'rho')},
+        }
+    return _surface_runs[key][1]
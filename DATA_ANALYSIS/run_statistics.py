@@ -0,0 +1,247 @@
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import profiling, run_loader
+from .airfoil_geometry import load_geometry
+from .alpha_index import ALPHA_TOLERANCE
+from .ct_calculations import geometry_slope_table
+from .live_run import reduce_rows
+from .surface_integration import surface_weights
+
+CONFIDENCE = 0.95  # Two-sided confidence level of the intervals
+
+COEFFICIENTS = ['cn', 'cm', 'ct']
+DIRECTION_NAMES = {1: 'up', -1: 'down'}
+
+
+def sweep_direction(alpha):
+    """
+    Sweep direction of every row: +1 while alpha increases, -1 while it decreases.
+
+    The turning point belongs to the branch that reaches it, a repeated angle keeps the
+    direction of the step before it and the first row takes the direction of the first step.
+    """
+    alpha = np.asarray(alpha, dtype=float)
+    step = np.sign(np.diff(alpha))
+    if not len(step) or not step.any():
+        return np.ones(len(alpha), dtype=int)
+    # Forward-fill the zero steps with the last non-zero one
+    last = np.maximum.accumulate(np.where(step != 0, np.arange(len(step)), 0))
+    step = step[last]
+    first = np.flatnonzero(step)[0]
+    step[:first] = step[first]
+    return np.concatenate([[step[0]], step]).astype(int)
+
+
+def group_rows(alpha, direction=None, tolerance=ALPHA_TOLERANCE):
+    """
+    Bucket rows by angle of attack (and sweep direction).
+
+    Sorted angles less than tolerance apart fall into the same bin, so a chain of
+    close angles ends up in one bin.
+
+    Arguments:
+    alpha : array-like
+        Angle of attack of every row.
+    direction : array-like or None
+        Sweep direction of every row (see sweep_direction); None pools both branches.
+
+    Returns:
+    tuple
+        (labels, bins, directions): group index of every row, and the alpha bin and
+        direction (0 when pooled) of every group, groups ordered by alpha bin.
+    """
+    alpha = np.asarray(alpha, dtype=float)
+    order = np.argsort(alpha, kind='stable')
+    new_bin = np.concatenate([[True], np.diff(alpha[order]) > tolerance])
+    row_bins = np.empty(len(alpha), dtype=int)
+    row_bins[order] = np.cumsum(new_bin) - 1
+    row_directions = np.zeros(len(alpha), dtype=int) if direction is None else np.asarray(direction, dtype=int)
+
+    keys, labels = np.unique(row_bins * 3 + row_directions + 1, return_inverse=True)
+    return labels.ravel(), keys // 3, keys % 3 - 1
+
+
+def group_statistics(values, labels, confidence=CONFIDENCE):
+    """
+    Mean, standard deviation and confidence half-width of every column per group, in one pass.
+
+    NaN readings are left out of their column. The interval uses Student's t with
+    n - 1 degrees of freedom; groups with a single valid row get NaN spread.
+
+    Arguments:
+    values : array-like
+        (n_rows x n_columns) values.
+    labels : array-like
+        Group index of every row (0 .. n_groups - 1, every group present).
+
+    Returns:
+    dict
+        'count', 'mean', 'std' and 'ci', each (n_groups x n_columns).
+    """
+    from scipy.stats import t
+
+    values = np.asarray(values, dtype=float)
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind='stable')
+    starts = np.flatnonzero(np.concatenate([[True], np.diff(labels[order]) != 0]))
+
+    sorted_values = values[order]
+    finite = np.isfinite(sorted_values)
+    count = np.add.reduceat(finite, starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(np.where(finite, sorted_values, 0.0), starts, axis=0) / count
+        squares = np.where(finite, (sorted_values - mean[labels[order]]) ** 2, 0.0)
+        std = np.sqrt(np.add.reduceat(squares, starts, axis=0) / (count - 1))
+        std[count < 2] = np.nan
+        ci = t.ppf(0.5 + confidence / 2.0, np.maximum(count - 1, 1)) * std / np.sqrt(count)
+    return {'count': count, 'mean': mean, 'std': std, 'ci': ci}
+
+
+def reduce_runs(run_files, tap_file='DATA_ANALYSIS/PPS.xlsx', airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx',
+                q_inf=None):
+    """
+    Reduce the rows of one or more run files and stack them, with the sweep direction per file.
+
+    Returns:
+    dict
+        Output of live_run.reduce_rows for all rows, plus 'direction' and 'run' (file index).
+    """
+    tap_geometry = run_loader.load_tap_geometry(tap_file)
+    weights = surface_weights(tap_geometry['tap_x'], tap_geometry['tap_z'])
+    slope_table = geometry_slope_table(load_geometry(airfoil_file), tap_geometry['tap_x'], tap_geometry['tap_z'])
+
+    reduced = []
+    for index, run_file in enumerate(run_files):
+        rows = reduce_rows(run_loader.load_run(run_file), weights, slope_table, q_inf)
+        rows = {name: np.asarray(values) for name, values in rows.items()}
+        rows['direction'] = sweep_direction(rows['alpha'])
+        rows['run'] = np.full(len(rows['alpha']), index)
+        reduced.append(rows)
+    return {name: np.concatenate([rows[name] for rows in reduced]) for name in reduced[0]}
+
+
+def sweep_statistics(rows, tolerance=ALPHA_TOLERANCE, by_direction=True, confidence=CONFIDENCE):
+    """
+    Statistics of repeated measurements at the same angle of attack.
+
+    Cp of every tap and C_N, C_M, C_T are stacked into one matrix and aggregated
+    together, so the whole table takes one grouping pass.
+
+    Arguments:
+    rows : dict
+        Reduced rows with 'alpha', 'cp', 'cn', 'cm', 'ct' and 'direction' (see reduce_runs).
+    tolerance : float
+        Alpha bin width (degrees), see group_rows.
+    by_direction : bool
+        Keep the up and down branches of the sweep apart (needed for hysteresis).
+
+    Returns:
+    dict
+        One entry per group: 'alpha' (mean), 'bin', 'direction' (+1, -1 or 0 when pooled),
+        'count', and for every coefficient '<name>', '<name>_std', '<name>_ci'
+        ('cp' entries are (n_groups x n_taps)).
+    """
+    cp = np.atleast_2d(np.asarray(rows['cp'], dtype=float))
+    labels, bins, directions = group_rows(rows['alpha'], rows['direction'] if by_direction else None, tolerance)
+    values = np.column_stack([cp] + [rows[name] for name in COEFFICIENTS] + [rows['alpha']])
+    aggregated = group_statistics(values, labels, confidence)
+
+    n_taps = cp.shape[1]
+    statistics = {'alpha': aggregated['mean'][:, -1], 'bin': bins, 'direction': directions,
+                  'count': np.bincount(labels)}
+    columns = {'cp': slice(0, n_taps)}
+    columns.update({name: n_taps + i for i, name in enumerate(COEFFICIENTS)})
+    for name, column in columns.items():
+        statistics[name] = aggregated['mean'][:, column]
+        statistics[f"{name}_std"] = aggregated['std'][:, column]
+        statistics[f"{name}_ci"] = aggregated['ci'][:, column]
+    return statistics
+
+
+def hysteresis(statistics):
+    """
+    Difference between the down and up branches at every alpha bin measured in both directions.
+
+    Arguments:
+    statistics : dict
+        Output of sweep_statistics with by_direction=True.
+
+    Returns:
+    dict
+        'alpha' (mean of both branches) and for every coefficient '<name>_up', '<name>_down',
+        'delta_<name>' (down - up), 'delta_<name>_ci' (root sum of squares of both intervals)
+        and 'loop_<name>' (area between the branches over the paired bins, coefficient x degrees).
+    """
+    up = np.flatnonzero(statistics['direction'] == 1)
+    down = np.flatnonzero(statistics['direction'] == -1)
+    shared_bins, up_index, down_index = np.intersect1d(statistics['bin'][up], statistics['bin'][down],
+                                                       return_indices=True)
+    up, down = up[up_index], down[down_index]
+
+    alpha = (statistics['alpha'][up] + statistics['alpha'][down]) / 2.0
+    loops = {'alpha': alpha}
+    for name in COEFFICIENTS:
+        delta = statistics[name][down] - statistics[name][up]
+        loops[f"{name}_up"] = statistics[name][up]
+        loops[f"{name}_down"] = statistics[name][down]
+        loops[f"delta_{name}"] = delta
+        loops[f"delta_{name}_ci"] = np.hypot(statistics[f"{name}_ci"][up], statistics[f"{name}_ci"][down])
+        loops[f"loop_{name}"] = float(np.sum(np.diff(alpha) * (delta[1:] + delta[:-1]) / 2.0)) if len(alpha) > 1 else 0.0
+    return loops
+
+
+def write_statistics(statistics, file_path):
+    """Write the coefficient statistics of sweep_statistics (without Cp) as CSV."""
+    columns = ['alpha', 'direction', 'count'] + [f"{name}{suffix}" for name in COEFFICIENTS
+                                                 for suffix in ('', '_std', '_ci')]
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in zip(*(statistics[name] for name in columns)):
+            writer.writerow([f"{value:.10g}" for value in row])
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Average repeated measurements per angle of attack and report hysteresis.")
+    parser.add_argument('runs', nargs='*', default=['DATA_ANALYSIS/raw_2d.txt'], help="Run files (pooled)")
+    parser.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet")
+    parser.add_argument('--airfoil', default='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx', help="Airfoil coordinates")
+    parser.add_argument('--q-inf', type=float, default=None,
+                        help="Fixed free-stream dynamic pressure (Pa), default: per row from Delta_Pb")
+    parser.add_argument('--tolerance', type=float, default=ALPHA_TOLERANCE, help="Alpha bin width (degrees)")
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE, help="Confidence level of the intervals")
+    parser.add_argument('--pool-directions', action='store_true', help="Average the up and down branches together")
+    parser.add_argument('--out', default=None, help="Write the statistics table as CSV")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start(args)
+
+    rows = reduce_runs(args.runs, args.taps, args.airfoil, args.q_inf)
+    statistics = sweep_statistics(rows, args.tolerance, not args.pool_directions, args.confidence)
+    for i in range(len(statistics['alpha'])):
+        branch = DIRECTION_NAMES.get(int(statistics['direction'][i]), 'both')
+        print(f"Angle of Attack: {statistics['alpha'][i]:6.2f} degrees ({branch:>4}, n = {statistics['count'][i]}), "
+              + ", ".join(f"{name.upper()}: {statistics[name][i]:+.4f} +- {statistics[f'{name}_ci'][i]:.4f}"
+                          for name in COEFFICIENTS))
+    if not args.pool_directions:
+        loops = hysteresis(statistics)
+        print(f"\nHysteresis (down - up) at {len(loops['alpha'])} angles:")
+        for i, angle in enumerate(loops['alpha']):
+            print(f"Angle of Attack: {angle:6.2f} degrees, "
+                  + ", ".join(f"dC{name[1].upper()}: {loops[f'delta_{name}'][i]:+.4f} +- {loops[f'delta_{name}_ci'][i]:.4f}"
+                              for name in COEFFICIENTS))
+        print("Loop areas: " + ", ".join(f"C{name[1].upper()}: {loops[f'loop_{name}']:+.4f} deg" for name in COEFFICIENTS))
+    if args.out:
+        write_statistics(statistics, args.out)
+        print(f"Statistics written to {args.out}")
+    profiling.finish(args)
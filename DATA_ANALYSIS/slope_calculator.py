@@ -1,6 +1,14 @@
-import pandas as pd
+import os
+import sys
+
 import numpy as np
 
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import run_loader
+
 # General Part: Functions for processing airfoil geometry and calculating slopes
 def load_airfoil_geometry(file_path, sheet_name="Sheet1", usecols="B:C"):
     """
@@ -18,11 +26,8 @@ def load_airfoil_geometry(file_path, sheet_name="Sheet1", usecols="B:C"):
     tuple
         x and z coordinates as NumPy arrays.
     """
-    airfoil_data = pd.read_excel(file_path, sheet_name=sheet_name, header=1, usecols=usecols)
-    airfoil_data.columns = ['x', 'z']  # Assign column names
-    x_coords = airfoil_data['x'].to_numpy()
-    z_coords = airfoil_data['z'].to_numpy()
-    return x_coords, z_coords
+    # Parsed once and cached on disk by run_loader
+    return run_loader.load_airfoil_geometry(file_path, sheet_name=sheet_name, usecols=usecols)
 
 
 def split_airfoil_surfaces(x_coords, z_coords):
@@ -0,0 +1,196 @@
+import numpy as np
+
+from . import profiling
+from .alpha_index import get_alpha_index
+
+
+def surface_weights(tap_x, tap_z):
+    """
+    Precompute the surface masks and trapezoidal segment widths for a tap layout.
+
+    Taps with z > 0 belong to the upper surface, z < 0 to the lower surface; taps on
+    z = 0 (leading and trailing edge) are left out of both, as in cn_calc/cm_calc.
+
+    Arguments:
+    tap_x : array-like
+        Tap x/c positions, in the order of the pressure columns.
+    tap_z : array-like
+        Tap z positions (only the sign is used).
+
+    Returns:
+    dict
+        'x', 'dx' (segment widths along the tap order), 'upper' and 'lower' (boolean masks).
+    """
+    x = np.asarray(tap_x, dtype=float)
+    z = np.asarray(tap_z, dtype=float)
+    return {'x': x, 'dx': np.diff(x), 'upper': z > 0, 'lower': z < 0}
+
+
+def trapezoid_rows(values, dx):
+    """
+    Trapezoidal integral of every row of a 2-D array over the same x grid.
+
+    Uses the same operation order as np.trapz so each row gives the identical result.
+    """
+    return (dx * (values[:, 1:] + values[:, :-1]) / 2.0).sum(axis=1)
+
+
+def first_matching_rows(angles_of_attack, angles, tolerance=0.0):
+    """
+    Row of the first match of each requested angle, or -1 if it was not measured.
+
+    Looks the angles up in the sorted index of the column (alpha_index.get_alpha_index);
+    the default tolerance of 0 keeps the exact comparison.
+
+    Arguments:
+    angles_of_attack : array-like
+        Angle of attack of every row in the run.
+    angles : array-like
+        Angles to look up.
+
+    Returns:
+    np.ndarray
+        Integer row positions, one per requested angle.
+    """
+    return get_alpha_index(angles_of_attack).find(angles, tolerance)
+
+
+@profiling.traced('cp')
+def pressure_coefficients(pressures, q_inf):
+    """
+    Convert a (n_alpha x n_taps) pressure matrix to Cp in one operation.
+
+    q_inf is either one dynamic pressure for the whole run or one value per row
+    (see freestream.freestream_conditions).
+    """
+    q_inf = np.asarray(q_inf, dtype=float)
+    if q_inf.ndim == 1:
+        q_inf = q_inf[:, None]
+    return np.asarray(pressures, dtype=float) / q_inf
+
+
+def surface_segments(tap_x):
+    """
+    Index ranges of the surfaces in the tap order: a new surface starts wherever x/c decreases.
+
+    Returns:
+    list
+        (start, stop) pairs, e.g. [(0, 25), (25, 49)] for PPS.xlsx.
+    """
+    starts = np.flatnonzero(np.diff(np.asarray(tap_x, dtype=float)) < 0) + 1
+    bounds = np.concatenate([[0], starts, [len(tap_x)]])
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def interpolate_bad_taps(cp, bad, tap_x):
+    """
+    Replace flagged readings by linear interpolation in x/c between the good taps of the same surface.
+
+    Arguments:
+    cp : array-like
+        (n_alpha x n_taps) pressure coefficients.
+    bad : array-like
+        Boolean mask of the same shape (e.g. quality_checks.check_run(...)['bad']).
+    tap_x : array-like
+        Tap x/c positions.
+
+    Returns:
+    np.ndarray
+        Copy of cp with the bad readings replaced (NaN where a surface has fewer than two good taps).
+    """
+    cp = np.atleast_2d(np.array(cp, dtype=float))
+    bad = np.atleast_2d(np.asarray(bad, dtype=bool)) | ~np.isfinite(cp)
+    tap_x = np.asarray(tap_x, dtype=float)
+    for start, stop in surface_segments(tap_x):
+        x = tap_x[start:stop]
+        for row in np.flatnonzero(bad[:, start:stop].any(axis=1)):
+            good = ~bad[row, start:stop]
+            values = cp[row, start:stop]
+            if good.sum() >= 2:
+                values[~good] = np.interp(x[~good], x[good], values[good])
+            else:
+                values[~good] = np.nan
+    return cp
+
+
+@profiling.traced('integrate')
+def integrate_cn_cm(cp, weights, bad=None):
+    """
+    Normal-force and leading-edge moment coefficients for every row of a Cp matrix.
+
+    Arguments:
+    cp : array-like
+        (n_alpha x n_taps) pressure coefficients (a single row is also accepted).
+    weights : dict
+        Output of surface_weights for the tap layout.
+    bad : array-like or None
+        Mask of readings to interpolate over before integrating (see interpolate_bad_taps).
+
+    Returns:
+    dict
+        'cn', 'cm' and the partial integrals 'cn_upper', 'cn_lower', 'cm_upper', 'cm_lower',
+        each an array with one value per row.
+    """
+    cp = np.atleast_2d(np.asarray(cp, dtype=float))
+    if bad is not None:
+        cp = interpolate_bad_taps(cp, bad, weights['x'])
+    x = weights['x']
+    dx = weights['dx']
+
+    cp_u = np.where(weights['upper'], cp, 0)
+    cp_l = np.where(weights['lower'], cp, 0)
+
+    cn_upper = trapezoid_rows(cp_u, dx)
+    cn_lower = trapezoid_rows(cp_l, dx)
+    cm_upper = trapezoid_rows(cp_u * x, dx)
+    cm_lower = trapezoid_rows(cp_l * x, dx)
+    return {
+        'cn': cn_lower - cn_upper,
+        'cm': cm_upper - cm_lower,
+        'cn_upper': cn_upper,
+        'cn_lower': cn_lower,
+        'cm_upper': cm_upper,
+        'cm_lower': cm_lower,
+    }
+
+
+def batch_cn_cm(pressures, q_inf, tap_x, tap_z):
+    """
+    Reduce a whole run at once: Cp, Cn and Cm for every angle of attack.
+
+    Arguments:
+    pressures : array-like
+        (n_alpha x n_taps) surface pressures (Pa).
+    q_inf : float or array-like
+        Free-stream dynamic pressure (Pa), constant or one value per row.
+    tap_x, tap_z : array-like
+        Tap positions (see surface_weights).
+
+    Returns:
+    dict
+        'cp' plus everything returned by integrate_cn_cm.
+    """
+    cp = pressure_coefficients(pressures, q_inf)
+    coefficients = integrate_cn_cm(cp, surface_weights(tap_x, tap_z))
+    coefficients['cp'] = cp
+    return coefficients
+
+
+def lift_drag_coefficients(cn, ct, alpha):
+    """
+    Rotate normal/tangential force coefficients into lift and (pressure) drag.
+
+    Arguments:
+    cn, ct : array-like
+        Normal and tangential force coefficients.
+    alpha : array-like
+        Angle of attack in degrees.
+
+    Returns:
+    tuple
+        (C_l, C_d) arrays.
+    """
+    alpha = np.radians(np.asarray(alpha, dtype=float))
+    cn = np.asarray(cn, dtype=float)
+    ct = np.asarray(ct, dtype=float)
+    return cn * np.cos(alpha) - ct * np.sin(alpha), cn * np.sin(alpha) + ct * np.cos(alpha)
@@ -0,0 +1,248 @@
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from . import profiling, run_loader
+from .airfoil_geometry import load_geometry
+from .ct_calculations import geometry_slope_table
+from .drag_wake_rake import probe_map, run_drag
+from .freestream import chord, load_freestream
+from .quality_checks import check_run
+from .surface_integration import interpolate_bad_taps, lift_drag_coefficients, surface_weights
+
+SAMPLES = 10000
+CONFIDENCE = 0.95  # Two-sided level of the bands
+CHUNK_BYTES = 64 * 2 ** 20  # Memory budget of one chunk of samples
+
+# Standard deviations of the input errors (assumed; override per campaign)
+SIGMAS = {
+    'pressure': 1.0,       # Pa, independent for every reading (transducer noise)
+    'pressure_bias': 1.0,  # Pa, per tap and sample, common to all rows (zero offset)
+    'q_inf': 0.01,         # Relative, per sample (calibration of q against Delta_Pb)
+    'rho': 0.005,          # Relative, per sample
+    'tap_x': 0.001,        # x/c, per tap and sample (tap placement)
+}
+
+OUTPUTS = ['cn', 'cm', 'ct', 'cl', 'cd_pressure', 'drag', 'cd_wake']
+
+
+def _trapezoid_weight_rows(x):
+    # Weights w of every row of x such that (w * y).sum(-1) is the trapezoidal integral of y over x
+    dx = np.diff(x, axis=-1)
+    weights = np.zeros(x.shape)
+    weights[..., :-1] += dx / 2.0
+    weights[..., 1:] += dx / 2.0
+    return weights
+
+
+def integration_weights(tap_x, weights, slope_table):
+    """
+    C_N, C_M and C_T as weight vectors on the Cp row, for one or many tap layouts.
+
+    Same integrals as integrate_cn_cm (trapezoid along the tap order, upper and lower
+    surface masked) and ct_batch (trapezoid per surface times the surface slope), written
+    as Cp . w so every perturbed layout reduces all of its rows in one product. The
+    surface slopes are kept at the nominal tap positions.
+
+    Arguments:
+    tap_x : array-like
+        (n_taps) or (n_layouts x n_taps) tap x/c positions.
+    weights : dict
+        Output of surface_weights (surface masks).
+    slope_table : dict
+        Output of geometry_slope_table (slopes and C_T surface masks).
+
+    Returns:
+    dict
+        'cn', 'cm', 'ct': (n_layouts x n_taps) weights.
+    """
+    x = np.atleast_2d(np.asarray(tap_x, dtype=float))
+    trapezoid = _trapezoid_weight_rows(x)
+    side = weights['lower'].astype(float) - weights['upper'].astype(float)
+    ct = np.zeros(x.shape)
+    for mask, sign in ((slope_table['upper'], -1.0), (slope_table['lower'], 1.0)):
+        ct[:, mask] = sign * slope_table['slopes'][mask] * _trapezoid_weight_rows(x[:, mask])
+    return {'cn': trapezoid * side, 'cm': -trapezoid * x * side, 'ct': ct}
+
+
+def _band(samples, confidence):
+    low, high = np.percentile(samples, [50.0 * (1.0 - confidence), 50.0 * (1.0 + confidence)], axis=0)
+    return samples.mean(axis=0), samples.std(axis=0, ddof=1), low, high
+
+
+@profiling.traced('uncertainty')
+def monte_carlo(run, conditions, tap_x, weights, slope_table, probes=None, n_samples=SAMPLES, sigmas=None,
+                confidence=CONFIDENCE, chord=chord, bad=None, seed=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Confidence bands of the reduced coefficients from perturbed inputs.
+
+    Every sample perturbs the readings (noise per reading and a zero offset per tap), q_inf
+    and rho (one factor per sample) and the tap positions, then reduces all rows at once:
+    the surface pressures of a chunk of samples form one (samples x alphas x taps) array
+    that is integrated with per-sample weight vectors (see integration_weights). Chunks are
+    sized to stay within chunk_bytes.
+
+    Arguments:
+    run : dict
+        Loaded run (run_loader.load_run, live rows or an archive entry).
+    conditions : dict
+        Per-row 'q_inf', 'rho', 'U_inf', 'p_inf' (freestream.run_freestream / load_freestream).
+    tap_x, weights, slope_table :
+        Tap x/c, surface_weights and geometry_slope_table of the surface taps.
+    probes : dict or None
+        Rake probe map (drag_wake_rake.probe_map); None leaves out the wake drag. The wake
+        velocities are referenced to the pitot-static tube of the run (see run_wake_profiles).
+    sigmas : dict or None
+        Overrides of SIGMAS.
+    bad : array-like or None
+        Readings replaced by interpolation before sampling (see quality_checks.check_run).
+    seed : int or None
+        Seed of the random generator, for reproducible bands.
+
+    Returns:
+    dict
+        'alpha', 'n_samples', and per OUTPUTS entry the nominal value and '<name>_mean',
+        '<name>_std', '<name>_low', '<name>_high' (band of the given confidence), one per row.
+    """
+    sigmas = dict(SIGMAS, **(sigmas or {}))
+    rng = np.random.default_rng(seed)
+    alpha = np.asarray(run['alpha'], dtype=float)
+    pressures = np.asarray(run['pressures'][:, :run_loader.SURFACE_TAPS], dtype=float)
+    if bad is not None:
+        # Linear in the readings and q_inf is constant along a row, so the pressures can be repaired directly
+        pressures = interpolate_bad_taps(pressures, bad, tap_x)
+    tap_x = np.asarray(tap_x, dtype=float)
+    q_inf = np.broadcast_to(np.asarray(conditions['q_inf'], dtype=float), alpha.shape)
+    n_alpha, n_taps = pressures.shape
+
+    if probes is not None:
+        rake_columns = np.concatenate([probes['total_columns'], probes['static_columns'], probes['pitot_columns']])
+        rake = np.asarray(run['pressures'][:, rake_columns], dtype=float)
+        n_total, n_static = len(probes['total_columns']), len(probes['static_columns'])
+        # Probe map of the rake and pitot columns alone, in the order of the rake array
+        rake_probes = dict(probes, total_columns=np.arange(n_total),
+                           static_columns=np.arange(n_total, n_total + n_static),
+                           pitot_columns=np.arange(n_total + n_static, len(rake_columns)))
+    else:
+        rake = np.empty((n_alpha, 0))
+
+    # Roughly ten arrays of the chunk's size are alive at once
+    chunk_size = int(max(1, min(n_samples, chunk_bytes // (10 * 8 * n_alpha * (n_taps + rake.shape[1])))))
+    samples = {name: np.full((n_samples, n_alpha), np.nan) for name in OUTPUTS}
+    for start in range(0, n_samples, chunk_size):
+        n = min(chunk_size, n_samples - start)
+        chunk = slice(start, start + n)
+        q_factor = 1.0 + sigmas['q_inf'] * rng.standard_normal((n, 1))
+        rho_factor = 1.0 + sigmas['rho'] * rng.standard_normal((n, 1))
+        q = q_inf * q_factor
+
+        readings = (pressures + sigmas['pressure'] * rng.standard_normal((n, n_alpha, n_taps))
+                    + sigmas['pressure_bias'] * rng.standard_normal((n, 1, n_taps)))
+        cp = readings / q[..., None]
+        layout = integration_weights(tap_x + sigmas['tap_x'] * rng.standard_normal((n, n_taps)), weights, slope_table)
+        samples['cn'][chunk] = np.einsum('sat,st->sa', cp, layout['cn'])
+        samples['cm'][chunk] = np.einsum('sat,st->sa', cp, layout['cm'])
+        samples['ct'][chunk] = np.einsum('sat,st->sa', cp, layout['ct'])
+        samples['cl'][chunk], samples['cd_pressure'][chunk] = lift_drag_coefficients(
+            samples['cn'][chunk], samples['ct'][chunk], alpha)
+
+        if probes is not None:
+            rake_readings = (rake + sigmas['pressure'] * rng.standard_normal((n,) + rake.shape)
+                             + sigmas['pressure_bias'] * rng.standard_normal((n, 1, rake.shape[1])))
+            rho = np.asarray(conditions['rho'], dtype=float) * rho_factor
+            rows = {'alpha': np.tile(alpha, n), 'pressures': rake_readings.reshape(n * n_alpha, -1)}
+            wake = run_drag(rows, rake_probes, np.broadcast_to(rho, q.shape).ravel(), q.ravel(), chord)
+            samples['drag'][chunk] = wake['drag'].reshape(n, n_alpha)
+            samples['cd_wake'][chunk] = wake['cd'].reshape(n, n_alpha)
+        profiling.count('samples', n)
+
+    # Nominal values: the same reduction without perturbations
+    layout = integration_weights(tap_x, weights, slope_table)
+    cp = pressures / q_inf[:, None]
+    nominal = {name: cp @ layout[name][0] for name in ('cn', 'cm', 'ct')}
+    nominal['cl'], nominal['cd_pressure'] = lift_drag_coefficients(nominal['cn'], nominal['ct'], alpha)
+    if probes is not None:
+        wake = run_drag(run, probes, conditions['rho'], q_inf, chord)
+        nominal['drag'], nominal['cd_wake'] = wake['drag'], wake['cd']
+    else:
+        nominal['drag'] = nominal['cd_wake'] = np.full(n_alpha, np.nan)
+
+    result = {'alpha': alpha, 'n_samples': n_samples}
+    for name in OUTPUTS:
+        result[name] = nominal[name]
+        if probes is None and name in ('drag', 'cd_wake'):
+            band = (np.full(n_alpha, np.nan),) * 4
+        else:
+            band = _band(samples[name], confidence)
+        for suffix, values in zip(('mean', 'std', 'low', 'high'), band):
+            result[f"{name}_{suffix}"] = values
+    return result
+
+
+def run_uncertainty(run_file, tap_file='DATA_ANALYSIS/PPS.xlsx', airfoil_file='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx',
+                    n_samples=SAMPLES, sigmas=None, confidence=CONFIDENCE, seed=None, wake=False):
+    """
+    Confidence bands of a run file, with the geometry, freestream and bad-tap handling of batch_reduce.
+
+    Returns:
+    dict
+        See monte_carlo.
+    """
+    run = run_loader.load_run(run_file)
+    tap_geometry = run_loader.load_tap_geometry(tap_file)
+    tap_x = tap_geometry['tap_x']
+    conditions = load_freestream(run_file)
+    slope_table = geometry_slope_table(load_geometry(airfoil_file), tap_x, tap_geometry['tap_z'])
+    bad = check_run(run['pressures'][:, :run_loader.SURFACE_TAPS], conditions['q_inf'], tap_x, run['alpha'])['bad']
+    return monte_carlo(run, conditions, tap_x, surface_weights(tap_x, tap_geometry['tap_z']), slope_table,
+                       probe_map(tap_geometry) if wake else None, n_samples, sigmas, confidence, bad=bad, seed=seed)
+
+
+def write_uncertainty(result, file_path):
+    """Write the nominal values and bands of monte_carlo as CSV, one row per alpha."""
+    columns = ['alpha'] + [f"{name}{suffix}" for name in OUTPUTS for suffix in ('', '_mean', '_std', '_low', '_high')]
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in zip(*(result[name] for name in columns)):
+            writer.writerow([f"{value:.10g}" for value in row])
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo confidence bands of Cn, Cm, Ct, Cl, Cd and the wake drag.")
+    parser.add_argument('run_file', nargs='?', default='DATA_ANALYSIS/raw_2d.txt')
+    parser.add_argument('--taps', default='DATA_ANALYSIS/PPS.xlsx', help="Pressure-port sheet")
+    parser.add_argument('--airfoil', default='DATA_ANALYSIS/AIRFOIL_COORDINATES.xlsx', help="Airfoil coordinates")
+    parser.add_argument('--samples', type=int, default=SAMPLES, help="Monte Carlo samples")
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE, help="Two-sided confidence level")
+    parser.add_argument('--sigma', nargs=2, action='append', default=[], metavar=('INPUT', 'VALUE'),
+                        help=f"Standard deviation of an input error ({', '.join(SIGMAS)}), repeatable")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed")
+    parser.add_argument('--wake-rake', action='store_true', help="Add the wake drag from the rake ports")
+    parser.add_argument('--out', default=None, help="Write the bands as CSV")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start(args)
+
+    sigmas = {name: float(value) for name, value in args.sigma}
+    unknown = set(sigmas) - set(SIGMAS)
+    if unknown:
+        parser.error(f"unknown input {', '.join(sorted(unknown))}; choose from {', '.join(SIGMAS)}")
+    result = run_uncertainty(args.run_file, args.taps, args.airfoil, args.samples, sigmas, args.confidence,
+                             args.seed, args.wake_rake)
+    for i, angle in enumerate(result['alpha']):
+        print(f"Angle of Attack: {angle:.2f} degrees, "
+              + ", ".join(f"{name.upper()}: {result[name][i]:+.4f} [{result[f'{name}_low'][i]:+.4f}, "
+                          f"{result[f'{name}_high'][i]:+.4f}]" for name in ('cn', 'cm', 'ct', 'cd_wake')))
+    if args.out:
+        write_uncertainty(result, args.out)
+        print(f"Bands written to {args.out}")
+    profiling.finish(args)
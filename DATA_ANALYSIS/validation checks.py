@@ -1,6 +1,14 @@
+import os
+import sys
+
 import pandas as pd
 import numpy as np
-from cm_calculations import cm_calc, calculate_cp
+
+if not __package__:  # Run as a script: import the rest of the package from the repository root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    __package__ = 'DATA_ANALYSIS'
+
+from .cm_calculations import cm_calc, calculate_cp
 
 # Constants
 q_inf = 335.7613443  # Free-stream dynamic pressure (Pa)
@@ -0,0 +1,111 @@
+import numpy as np
+
+from .ct_calculations import split_airfoil_surfaces
+
+# Wall corrections for a 2D model spanning a closed test section (Barlow, Rae & Pope,
+# Low-Speed Wind Tunnel Testing, ch. 9 - 10):
+#   sigma    = pi^2 / 48 * (c / h)^2           streamline curvature parameter
+#   eps_sb   = Lambda * sigma                  solid blockage
+#   eps_wb   = c / (2 h) * Cd_u                wake blockage
+#   eps      = eps_sb + eps_wb
+#   alpha    = alpha_u + 57.3 * sigma / (2 pi) * (Cl_u + 4 Cm_c/4,u)
+#   Cl       = Cl_u * (1 - sigma - 2 eps)
+#   Cm_c/4   = Cm_c/4,u * (1 - 2 eps) + sigma * Cl / 4
+#   Cd       = Cd_u * (1 - 3 eps_sb - 2 eps_wb)
+#   q        = q_u * (1 + 2 eps),  U = U_u * (1 + eps),  Re = Re_u * (1 + eps)
+
+
+def curvature_parameter(chord, tunnel_height):
+    """Streamline curvature parameter sigma = pi^2 / 48 * (c / h)^2."""
+    return np.pi ** 2 / 48.0 * (chord / tunnel_height) ** 2
+
+
+def shape_factor(x_coords, z_coords, n_points=400):
+    """
+    Body shape factor Lambda of the airfoil for the solid-blockage correction.
+
+    Thickness form of Allen & Vincenti's integral,
+    Lambda = 16 / pi * integral of t * sqrt(1 + t'^2) d(x/c),
+    with t the half-thickness distribution (the (1 - Cp)^0.5 weighting is left out).
+
+    Arguments:
+    x_coords, z_coords : array-like
+        Airfoil coordinates (x/c, z/c), from the trailing edge over the upper surface
+        to the leading edge and back over the lower surface.
+
+    Returns:
+    float
+        Lambda.
+    """
+    x_upper, z_upper, x_lower, z_lower = split_airfoil_surfaces(np.asarray(x_coords, dtype=float),
+                                                                np.asarray(z_coords, dtype=float))
+    x = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, n_points)))
+    half_thickness = (np.interp(x, x_upper, z_upper) - np.interp(x, x_lower, z_lower)) / 2.0
+    slope = np.gradient(half_thickness, x)
+    integrand = half_thickness * np.sqrt(1.0 + slope ** 2)
+    return float(16.0 / np.pi * np.sum(np.diff(x) * (integrand[1:] + integrand[:-1]) / 2.0))
+
+
+def quarter_chord_moment(cm_le, cn):
+    """Moment coefficient about the quarter chord from the leading-edge moment (cm_calc convention)."""
+    return np.asarray(cm_le, dtype=float) + np.asarray(cn, dtype=float) / 4.0
+
+
+def blockage_factors(cd, chord, tunnel_height, shape_factor):
+    """
+    Solid and wake blockage for every point of a polar.
+
+    Returns:
+    dict
+        'sigma' (float), 'eps_sb' (float), 'eps_wb' and 'eps' (one value per point).
+    """
+    sigma = curvature_parameter(chord, tunnel_height)
+    eps_sb = shape_factor * sigma
+    eps_wb = chord / (2.0 * tunnel_height) * np.asarray(cd, dtype=float)
+    return {'sigma': sigma, 'eps_sb': eps_sb, 'eps_wb': eps_wb, 'eps': eps_sb + eps_wb}
+
+
+def correct_polar(alpha, cl, cd, cm_c4, chord, tunnel_height, shape_factor, extra_cd=()):
+    """
+    Apply the closed-test-section wall corrections to whole polar arrays at once.
+
+    Arguments:
+    alpha : array-like
+        Uncorrected angles of attack (degrees).
+    cl, cd, cm_c4 : array-like
+        Uncorrected lift, drag and quarter-chord moment coefficients. cd sets the
+        wake blockage, so it should be the total (wake) drag where that is available.
+    chord, tunnel_height : float
+        Model chord and test-section height (same unit).
+    shape_factor : float
+        Body shape factor Lambda (see shape_factor).
+    extra_cd : tuple
+        Further drag coefficient arrays (e.g. pressure drag) corrected with the same factors.
+
+    Returns:
+    dict
+        Corrected 'alpha', 'cl', 'cd', 'cm_c4' and 'extra_cd' (tuple), the blockage
+        factors of blockage_factors, and 'q_factor', 'velocity_factor' to apply to
+        q_inf / U_inf and Re.
+    """
+    alpha = np.asarray(alpha, dtype=float)
+    cl = np.asarray(cl, dtype=float)
+    cd = np.asarray(cd, dtype=float)
+    cm_c4 = np.asarray(cm_c4, dtype=float)
+
+    factors = blockage_factors(cd, chord, tunnel_height, shape_factor)
+    sigma, eps_sb, eps_wb, eps = factors['sigma'], factors['eps_sb'], factors['eps_wb'], factors['eps']
+
+    cl_corrected = cl * (1.0 - sigma - 2.0 * eps)
+    drag_factor = 1.0 - 3.0 * eps_sb - 2.0 * eps_wb
+    corrected = {
+        'alpha': alpha + np.degrees(sigma / (2.0 * np.pi)) * (cl + 4.0 * cm_c4),
+        'cl': cl_corrected,
+        'cd': cd * drag_factor,
+        'cm_c4': cm_c4 * (1.0 - 2.0 * eps) + sigma * cl_corrected / 4.0,
+        'extra_cd': tuple(np.asarray(values, dtype=float) * drag_factor for values in extra_cd),
+        'q_factor': 1.0 + 2.0 * eps,
+        'velocity_factor': 1.0 + eps,
+    }
+    corrected.update(factors)
+    return corrected
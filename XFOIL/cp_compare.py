@@ -0,0 +1,208 @@
+import argparse
+import warnings
+
+import numpy as np
+
+from xfoil_io import load_polars
+
+# Points of the common x/c grid (cosine spaced, so the leading edge is resolved)
+GRID_POINTS = 201
+
+
+def common_grid(n_points=GRID_POINTS):
+    """Cosine-spaced x/c grid from the leading to the trailing edge, shared by both surfaces."""
+    return 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, n_points)))
+
+
+def split_surfaces(x):
+    """
+    Split a Cp distribution into its two surfaces, in file order.
+
+    The first surface is the one the file starts with: the upper surface for XFOIL
+    CPWR output (trailing edge -> upper -> leading edge -> lower -> trailing edge), for the
+    pressure-tap order (upper 0 -> 1, then lower 0 -> 1) and for Cpvaluesexperimental.cp.
+    The surfaces meet where x/c turns around (that point belongs to both) or jumps
+    back in a single step (tap order).
+
+    Returns:
+    tuple
+        (upper, lower) index arrays into x.
+    """
+    x = np.asarray(x, dtype=float)
+    step = np.sign(np.diff(x))
+    nonzero = np.flatnonzero(step)
+    if not len(nonzero):
+        return np.arange(len(x)), np.arange(0)
+    # Repeated points (zero steps) keep the direction of the step before them
+    step = step[np.maximum.accumulate(np.where(step != 0, np.arange(len(step)), nonzero[0]))]
+    reversal = np.flatnonzero(step != step[0])
+    if not len(reversal):
+        return np.arange(len(x)), np.arange(0)
+    k = reversal[0]  # Step from point k to point k + 1
+    if k + 1 < len(step) and step[k + 1] == step[0]:
+        return np.arange(k + 1), np.arange(k + 1, len(x))
+    return np.arange(k + 1), np.arange(k, len(x))
+
+
+def interpolation_matrix(x_source, x_grid):
+    """
+    Linear interpolation as a (n_grid x n_source) matrix, same result as np.interp.
+
+    x_source must be strictly increasing; grid points outside it take the end values.
+    """
+    x_source = np.asarray(x_source, dtype=float)
+    x_grid = np.asarray(x_grid, dtype=float)
+    matrix = np.zeros((len(x_grid), len(x_source)))
+    if len(x_source) == 1:
+        matrix[:, 0] = 1.0
+        return matrix
+    right = np.clip(np.searchsorted(x_source, x_grid, side='right'), 1, len(x_source) - 1)
+    left = right - 1
+    t = np.clip((x_grid - x_source[left]) / (x_source[right] - x_source[left]), 0.0, 1.0)
+    rows = np.arange(len(x_grid))
+    matrix[rows, left] = 1.0 - t
+    matrix[rows, right] += t
+    return matrix
+
+
+# Resampling matrices of the x layouts seen by this process, keyed by layout and grid
+_matrices = {}
+
+
+def resampling_matrix(x, x_grid):
+    """
+    Matrix that maps a Cp vector in file order onto the common grid, per surface.
+
+    Built once per x layout: all alphas of a run (and all XFOIL cases on the same
+    panelling) then resample in one matrix product.
+
+    Returns:
+    np.ndarray
+        (2 x n_grid x n_points): upper and lower surface.
+    """
+    x = np.ascontiguousarray(x, dtype=float)
+    x_grid = np.ascontiguousarray(x_grid, dtype=float)
+    key = (x.tobytes(), x_grid.tobytes())
+    if key not in _matrices:
+        matrix = np.zeros((2, len(x_grid), len(x)))
+        for surface, indices in enumerate(split_surfaces(x)):
+            if not len(indices):
+                matrix[surface] = np.nan
+                continue
+            # Sort the surface by x/c; of repeated x/c values the first in file order is used
+            x_unique, first = np.unique(x[indices], return_index=True)
+            matrix[surface][:, indices[first]] = interpolation_matrix(x_unique, x_grid)
+        _matrices[key] = matrix
+    return _matrices[key]
+
+
+def resample(x, cp, x_grid=None):
+    """
+    Resample Cp distributions that share one x layout onto the common grid.
+
+    Arguments:
+    x : array-like
+        x/c of the points, in file order (tap order, or XFOIL contour order).
+    cp : array-like
+        (n_curves x n_points) Cp, e.g. every alpha of a run (a single curve is also accepted).
+    x_grid : array-like or None
+        Common grid (default: common_grid()).
+
+    Returns:
+    np.ndarray
+        (n_curves x 2 x n_grid): upper and lower surface Cp on the grid.
+    """
+    x_grid = common_grid() if x_grid is None else x_grid
+    cp = np.atleast_2d(np.asarray(cp, dtype=float))
+    return np.einsum('sgp,cp->csg', resampling_matrix(x, x_grid), cp)
+
+
+def resample_curves(curves, x_grid=None):
+    """
+    Resample curves with different x layouts; curves with the same layout share one matrix product.
+
+    Arguments:
+    curves : list
+        (x, cp) pairs, one per curve.
+
+    Returns:
+    np.ndarray
+        (n_curves x 2 x n_grid).
+    """
+    x_grid = common_grid() if x_grid is None else x_grid
+    result = np.empty((len(curves), 2, len(x_grid)))
+    groups = {}
+    for i, (x, _) in enumerate(curves):
+        groups.setdefault(np.ascontiguousarray(x, dtype=float).tobytes(), []).append(i)
+    for members in groups.values():
+        x = curves[members[0]][0]
+        result[members] = resample(x, np.vstack([curves[i][1] for i in members]), x_grid)
+    return result
+
+
+def normal_force(cp_grid, x_grid=None):
+    """C_N = integral of (Cp_lower - Cp_upper) d(x/c) of resampled distributions (..., 2, n_grid)."""
+    x_grid = common_grid() if x_grid is None else np.asarray(x_grid, dtype=float)
+    difference = cp_grid[..., 1, :] - cp_grid[..., 0, :]
+    return (np.diff(x_grid) * (difference[..., 1:] + difference[..., :-1]) / 2.0).sum(axis=-1)
+
+
+def compare(cp_a, cp_b, x_grid=None):
+    """
+    Error metrics of every curve of one set against every curve of another, as arrays.
+
+    Arguments:
+    cp_a, cp_b : np.ndarray
+        (n_a x 2 x n_grid) and (n_b x 2 x n_grid) resampled Cp, e.g. the alphas of a run
+        and a set of XFOIL cases (see resample / resample_curves).
+
+    Returns:
+    dict
+        (n_a x n_b) arrays: 'rms' and 'max_abs' of Cp_a - Cp_b over both surfaces,
+        'delta_cn' (C_N,a - C_N,b); plus 'cn_a' (n_a) and 'cn_b' (n_b).
+    """
+    difference = cp_a[:, None] - cp_b[None, :]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN curves
+        rms = np.sqrt(np.nanmean(difference ** 2, axis=(2, 3)))
+        max_abs = np.nanmax(np.abs(difference), axis=(2, 3))
+    cn_a = normal_force(cp_a, x_grid)
+    cn_b = normal_force(cp_b, x_grid)
+    return {'rms': rms, 'max_abs': max_abs, 'delta_cn': cn_a[:, None] - cn_b[None, :], 'cn_a': cn_a, 'cn_b': cn_b}
+
+
+def load_cp_curves(file_paths):
+    """
+    Read Cp files (XFOIL CPWR output or the same format) through the xfoil_io parse cache.
+
+    Returns:
+    list
+        (x, cp) pairs in the order given; files that could not be read raise their error.
+    """
+    curves = []
+    for file_path, parsed in load_polars(file_paths).items():
+        if isinstance(parsed, Exception):
+            raise parsed
+        curves.append((parsed[1]['x'], parsed[1]['Cp']))
+    return curves
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Cp distributions on a common x/c grid.")
+    parser.add_argument('cases', nargs='*', default=['XFOIL/Cpvaluesinviscid.cp', 'XFOIL/Cpviscousflow.cp'],
+                        help="XFOIL Cp files")
+    parser.add_argument('--experiment', nargs='+', default=['XFOIL/Cpvaluesexperimental.cp'],
+                        help="Experimental Cp files")
+    parser.add_argument('--grid', type=int, default=GRID_POINTS, help="Points of the common grid")
+    args = parser.parse_args()
+
+    x_grid = common_grid(args.grid)
+    experiment = resample_curves(load_cp_curves(args.experiment), x_grid)
+    cases = resample_curves(load_cp_curves(args.cases), x_grid)
+    metrics = compare(experiment, cases, x_grid)
+    for i, experiment_file in enumerate(args.experiment):
+        print(f"{experiment_file}: C_N = {metrics['cn_a'][i]:.4f}")
+        for j, case_file in enumerate(args.cases):
+            print(f"  {case_file}: RMS = {metrics['rms'][i, j]:.4f}, max |dCp| = {metrics['max_abs'][i, j]:.4f}, "
+                  f"C_N = {metrics['cn_b'][j]:.4f}, dC_N = {metrics['delta_cn'][i, j]:+.4f}")
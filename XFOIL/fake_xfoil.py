@@ -0,0 +1,101 @@
+"""
+Stand-in for the xfoil binary, for running xfoil_driver without XFOIL installed.
+
+Reads the same command script from stdin (LOAD, VISC, MACH, VPAR N/XTR, PACC,
+ALFA, CPWR, QUIT; everything else is ignored) and writes polar and Cp files in
+XFOIL's layout. The numbers come from thin-airfoil theory plus a made-up drag
+polar, so they exercise the plumbing, not the aerodynamics. Points with
+|alpha| > STALL_ALPHA are left out of the polar, like unconverged XFOIL points.
+With --crash-alpha the process exits with an error at that angle of attack,
+after writing the polar so far, like an XFOIL crash part way through a sweep.
+
+    python XFOIL/xfoil_driver.py --binary "python XFOIL/fake_xfoil.py"
+    python XFOIL/xfoil_driver.py --binary "python XFOIL/fake_xfoil.py --crash-alpha 3"
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from xfoil_io import format_cp, format_polar, read_airfoil
+
+STALL_ALPHA = 15.0  # Degrees beyond which the fake "does not converge"
+POLAR_COLUMNS = ['alpha', 'CL', 'CD', 'CDp', 'CM', 'Top_Xtr', 'Bot_Xtr']
+
+
+def fake_point(alpha, re, ncrit):
+    """Polar row of one angle of attack."""
+    cl = 2.0 * np.pi * np.radians(alpha) + 0.4
+    cd = 0.008 + 0.01 * cl ** 2 + (0.0 if re <= 0 else 2.0 / np.sqrt(re)) + 0.0002 * ncrit
+    return {'alpha': alpha, 'CL': cl, 'CD': cd, 'CDp': 0.4 * cd, 'CM': -0.08, 'Top_Xtr': 0.6, 'Bot_Xtr': 0.9}
+
+
+def fake_cp(x, alpha):
+    """Cp on the airfoil points: suction on the surface before the leading edge, pressure after it."""
+    cl = fake_point(alpha, 0.0, 0.0)['CL']
+    loading = cl / np.pi * np.sqrt(np.clip(1.0 - x, 0.0, None) / (x + 0.01))
+    upper = np.arange(len(x)) <= np.argmin(x)
+    return np.where(upper, -loading, 0.5 * loading)
+
+
+def main(lines, crash_alpha=None):
+    state = {'re': 0.0, 'mach': 0.0, 'ncrit': 9.0, 'xtr': (1.0, 1.0), 'name': '', 'x': None,
+             'alpha': None, 'polar_file': None, 'points': []}
+    lines = iter(lines)
+    for line in lines:
+        words = line.split()
+        if not words:
+            continue
+        command, arguments = words[0].upper(), words[1:]
+        if command == 'LOAD':
+            state['name'], state['x'], _ = read_airfoil(arguments[0])
+        elif command == 'VISC':
+            state['re'] = float(arguments[0])
+        elif command == 'MACH':
+            state['mach'] = float(arguments[0])
+        elif command == 'N':
+            state['ncrit'] = float(arguments[0])
+        elif command == 'XTR':
+            state['xtr'] = (float(arguments[0]), float(arguments[1]))
+        elif command == 'PACC':
+            if state['polar_file'] is None:
+                state['polar_file'] = next(lines).strip()
+                next(lines, '')  # Dump file
+            else:
+                write_polar(state)
+                state['polar_file'] = None
+        elif command == 'ALFA':
+            state['alpha'] = float(arguments[0])
+            if crash_alpha is not None and abs(state['alpha'] - crash_alpha) < 1e-9:
+                if state['polar_file'] is not None:
+                    write_polar(state)
+                sys.exit(f"Floating point exception at alpha = {state['alpha']:g}")
+            if abs(state['alpha']) <= STALL_ALPHA and state['polar_file'] is not None:
+                state['points'].append(fake_point(state['alpha'], state['re'], state['ncrit']))
+        elif command == 'CPWR':
+            file_path = arguments[0] if arguments else next(lines).strip()
+            with open(file_path, 'w') as f:
+                f.write(format_cp(state['x'], fake_cp(state['x'], state['alpha'])))
+        elif command == 'QUIT':
+            break
+    if state['polar_file'] is not None:
+        write_polar(state)
+
+
+def write_polar(state):
+    polar = np.zeros(len(state['points']), dtype=[(name, 'f8') for name in POLAR_COLUMNS])
+    for row, point in enumerate(state['points']):
+        for name in POLAR_COLUMNS:
+            polar[row][name] = point[name]
+    with open(state['polar_file'], 'w') as f:
+        f.write(format_polar(polar, state['name'], state['re'], state['mach'], state['ncrit'], state['xtr']))
+    state['points'] = []
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in for the xfoil binary, reading its commands from stdin.")
+    parser.add_argument('--crash-alpha', type=float, default=None,
+                        help="Exit with an error when this angle of attack is reached")
+    args = parser.parse_args()
+    main(sys.stdin.read().splitlines(), args.crash_alpha)
@@ -1,22 +1,28 @@
+import argparse
+
 import numpy as np
 import scipy as sp 
 import matplotlib.pyplot as plt 
 
-file_path = "XFOIL\CLCDcurvesPiotr.dat"
+from xfoil_io import read_polar
+
+parser = argparse.ArgumentParser(description="Plot the Cl-alpha curve and drag polar of an XFOIL polar.")
+parser.add_argument('--out', default=None, help="Save the figure to this file instead of showing it")
+args = parser.parse_args()
+if args.out:
+    plt.switch_backend('Agg')  # Only saved, so render without a display
+
+file_path = "XFOIL/CLCDcurvesPiotr.dat"
 
 try: 
-    data=np.loadtxt(file_path, skiprows=12)
+    header, polar = read_polar(file_path)
 except Exception as e :
     print(f"Error reading the file: {e}")
     exit()
 
-alfa_column=0
-cl_column=1
-cd_column=2
-
-alfa_data=data[:,alfa_column]
-cl_data=data[:,cl_column]
-cd_data=data[:,cd_column]
+alfa_data=polar['alpha']
+cl_data=polar['CL']
+cd_data=polar['CD']
 
 fig,axs = plt.subplots(2,1,figsize=(8,10))
 
@@ -37,6 +43,8 @@ axs[1].grid(True)
 
 # Step 5: Adjust layout and show the plots
 plt.tight_layout()  # Adjusts spacing between subplots
-plt.show()
-    
-
+if args.out:
+    plt.savefig(args.out)
+    print(f"Figure saved to {args.out}")
+else:
+    plt.show()
@@ -1,30 +1,34 @@
+import argparse
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+from xfoil_io import read_airfoil, read_cp
+
+parser = argparse.ArgumentParser(description="Plot the XFOIL Cp distribution over the airfoil contour.")
+parser.add_argument('--out', default=None, help="Save the figure to this file instead of showing it")
+args = parser.parse_args()
+if args.out:
+    plt.switch_backend('Agg')  # Only saved, so render without a display
+
 # --- Load Cp data ---
 file_path = "XFOIL/Cpvalues.cp"
 try:
-    cp_data = np.loadtxt(file_path, skiprows=1)
+    cp_header, cp_data = read_cp(file_path)
 except Exception as e:
     print(f"Error reading the Cp file: {e}")
     exit()
 
-x_c = 0
-Cp = 1
-
-x_c_data = cp_data[:, x_c]
-Cp_data = cp_data[:, Cp]
+x_c_data = cp_data['x']
+Cp_data = cp_data['Cp']
 
 # --- Load Airfoil data ---
 try:
-    airfoil_data = np.loadtxt("XFOIL/SD6060-104-88_180.dat", skiprows=1)
+    airfoil_name, x, y = read_airfoil("XFOIL/SD6060-104-88_180.dat")
 except Exception as e:
     print(f"Error reading the airfoil file: {e}")
     exit()
 
-x = airfoil_data[:, 0]
-y = airfoil_data[:, 1]
-
 # Find the index of the point closest to x = 0
 idx_x0 = np.argmin(np.abs(x))
 
@@ -54,4 +58,8 @@ plt.ylabel("Cp [-]")
 plt.title("Cp vs x/c")
 plt.legend()
 plt.grid()
-plt.show()
+if args.out:
+    plt.savefig(args.out)
+    print(f"Figure saved to {args.out}")
+else:
+    plt.show()
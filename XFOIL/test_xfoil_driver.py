@@ -0,0 +1,64 @@
+"""
+run_cases against fake_xfoil.py: cold cache, warm cache, partial reuse and a crash part way through a sweep.
+
+    python -m pytest XFOIL/test_xfoil_driver.py
+"""
+import os
+import shlex
+import sys
+
+import numpy as np
+
+import xfoil_driver
+
+XFOIL_DIR = os.path.dirname(os.path.abspath(__file__))
+AIRFOIL = os.path.join(XFOIL_DIR, 'SD6060-104-88_180.dat')
+FAKE = f"{shlex.quote(sys.executable)} {shlex.quote(os.path.join(XFOIL_DIR, 'fake_xfoil.py'))}"
+CASES = [{'re': 2.5e5, 'ncrit': 9.0}, {'re': 0.0}]
+
+
+def run_all(alphas, cache_dir, binary=FAKE):
+    results = {}
+    for case, result in xfoil_driver.run_cases(AIRFOIL, CASES, alphas, workers=2, binary=binary, cache_dir=cache_dir):
+        assert not isinstance(result, Exception), result
+        results[case['re']] = result
+    return results
+
+
+def test_cold_then_warm_cache(tmp_path):
+    alphas = [-2.0, 0.0, 2.0, 16.0]
+    cold = run_all(alphas, str(tmp_path))
+    for result in cold.values():
+        assert not result['cached'].any() and not result['missing'].any()
+        # The fake leaves |alpha| > 15 out of the polar, like an unconverged point
+        np.testing.assert_array_equal(result['converged'], [True, True, True, False])
+        assert result['cp'].shape == (4, len(result['x']))
+
+    # A binary that cannot run proves nothing is recomputed
+    warm = run_all(alphas, str(tmp_path), binary='no-such-xfoil')
+    for re, result in warm.items():
+        assert result['cached'].all()
+        for name in xfoil_driver.POLAR_COLUMNS + ['converged', 'cp']:
+            np.testing.assert_array_equal(result[name], cold[re][name])
+
+
+def test_partial_reuse(tmp_path):
+    run_all([0.0, 1.0], str(tmp_path))
+    results = run_all([0.0, 1.0, 2.0, 3.0], str(tmp_path))
+    for result in results.values():
+        np.testing.assert_array_equal(result['cached'], [True, True, False, False])
+        assert result['converged'].all()
+
+
+def test_crash_caches_only_reached_points(tmp_path):
+    alphas = [0.0, 1.0, 2.0, 3.0]
+    crashed = run_all(alphas, str(tmp_path), binary=f"{FAKE} --crash-alpha 2")
+    for result in crashed.values():
+        np.testing.assert_array_equal(result['missing'], [False, False, True, True])
+        np.testing.assert_array_equal(result['converged'], [True, True, False, False])
+
+    # The points after the crash were not cached as unconverged, so they are computed now
+    results = run_all(alphas, str(tmp_path))
+    for result in results.values():
+        np.testing.assert_array_equal(result['cached'], [True, True, False, False])
+        assert result['converged'].all() and not result['missing'].any()
@@ -0,0 +1,265 @@
+import argparse
+import hashlib
+import itertools
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from xfoil_io import format_polar, read_airfoil, read_cp, read_polar
+
+# xfoil command line (XFOIL_BINARY overrides it, e.g. "python XFOIL/fake_xfoil.py")
+XFOIL_BINARY = os.environ.get('XFOIL_BINARY', 'xfoil')
+
+# Content-addressed store of computed points, one .npz per (geometry, Re, Mach, Ncrit, xtr, alpha)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'xfoil')
+
+# Bump when the command script or the stored representation changes
+CACHE_VERSION = 1
+
+ITERATIONS = 100  # Viscous iterations per point
+TIMEOUT = 300.0  # Seconds per xfoil process
+POLAR_COLUMNS = ['CL', 'CD', 'CDp', 'CM', 'Top_Xtr', 'Bot_Xtr']
+
+
+def geometry_hash(airfoil_file):
+    """Hash of the airfoil coordinates (not of the file name or layout), so copies of a geometry share the cache."""
+    _, x, z = read_airfoil(airfoil_file)
+    return hashlib.sha1(np.round(np.column_stack([x, z]), 8).tobytes()).hexdigest()
+
+
+def point_key(geometry, re, mach, ncrit, xtr, alpha):
+    """Cache key of one point: the geometry hash and the case parameters."""
+    text = f"{CACHE_VERSION}|{geometry}|{re:.6g}|{mach:.6g}|{ncrit:.6g}|{xtr[0]:.6g}|{xtr[1]:.6g}|{alpha:.6g}"
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _point_path(key, cache_dir):
+    return os.path.join(CACHE_DIR if cache_dir is None else cache_dir, key[:2], f"{key}.npz")
+
+
+def _read_point(key, cache_dir):
+    try:
+        with np.load(_point_path(key, cache_dir)) as archive:
+            return {name: archive[name] for name in archive.files}
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+def _write_point(key, point, cache_dir):
+    path = _point_path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{id(point)}.tmp.npz"
+    np.savez(tmp_path, **point)
+    os.replace(tmp_path, path)
+
+
+def command_script(re, mach, ncrit, xtr, alphas, iterations=ITERATIONS):
+    """
+    Keystrokes for one xfoil session: load airfoil.dat, set up the case and run the alphas,
+    writing the polar to polar.dat and the Cp of point i to cp_<i>.cp. Re = 0 runs inviscid.
+    """
+    lines = ['PLOP', 'G F', '', 'LOAD airfoil.dat', 'PANE', 'OPER']
+    if re > 0:
+        lines += [f'VISC {re:g}', f'ITER {iterations}']
+    lines += [f'MACH {mach:g}', 'VPAR', f'N {ncrit:g}', f'XTR {xtr[0]:g} {xtr[1]:g}', '',
+              'PACC', 'polar.dat', '']
+    for i, alpha in enumerate(alphas):
+        lines += [f'ALFA {alpha:g}', f'CPWR cp_{i}.cp']
+    lines += ['PACC', '', 'QUIT']
+    return '\n'.join(lines) + '\n'
+
+
+def run_xfoil(airfoil_file, re, mach, ncrit, xtr, alphas, binary=XFOIL_BINARY, timeout=TIMEOUT):
+    """
+    Run one xfoil session in a scratch directory and parse what it wrote.
+
+    If xfoil exits with an error or times out part way through the sweep, only the points
+    up to the last Cp file written are returned: xfoil got no further, so the points
+    after it are unknown rather than unconverged.
+
+    Returns:
+    list
+        One point per alpha that xfoil reached: the POLAR_COLUMNS values (NaN if the point
+        did not converge), 'converged', and the Cp distribution 'x', 'cp' (empty if none
+        was written).
+
+    Raises:
+    RuntimeError
+        If xfoil wrote neither a polar nor a Cp file, or failed before the first Cp file.
+    """
+    with tempfile.TemporaryDirectory(prefix='xfoil_') as work_dir:
+        shutil.copyfile(airfoil_file, os.path.join(work_dir, 'airfoil.dat'))
+        # Paths in the command line are relative to the caller, xfoil runs in the scratch directory
+        command = [os.path.abspath(part) if os.path.exists(part) else part for part in shlex.split(binary)]
+        try:
+            returncode = subprocess.run(command, input=command_script(re, mach, ncrit, xtr, alphas), text=True,
+                                        cwd=work_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        timeout=timeout).returncode
+            failure = f"exit code {returncode}" if returncode else None
+        except subprocess.TimeoutExpired:
+            failure = f"timed out after {timeout:g} s"
+
+        polar_path = os.path.join(work_dir, 'polar.dat')
+        polar = read_polar(polar_path)[1] if os.path.exists(polar_path) else None
+        written = [i for i in range(len(alphas)) if os.path.exists(os.path.join(work_dir, f'cp_{i}.cp'))]
+        if polar is None and not written:
+            # Nothing written at all: the session failed, do not cache its points as unconverged
+            raise RuntimeError(f"xfoil wrote no output ({failure or 'exit code 0'})")
+        reached = len(alphas) if failure is None else (written[-1] + 1 if written else 0)
+        if not reached:
+            raise RuntimeError(f"xfoil failed before the first point ({failure})")
+        points = []
+        for i, alpha in enumerate(alphas[:reached]):
+            point = {name: np.nan for name in POLAR_COLUMNS}
+            # The polar lists alpha with 3 decimals and leaves out points that did not converge
+            rows = [] if polar is None else np.flatnonzero(np.abs(polar['alpha'] - alpha) < 6e-4)
+            point['converged'] = len(rows) > 0
+            if point['converged']:
+                point.update({name: polar[name][rows[0]] for name in POLAR_COLUMNS if name in polar.dtype.names})
+            cp_path = os.path.join(work_dir, f'cp_{i}.cp')
+            cp = read_cp(cp_path)[1] if os.path.exists(cp_path) else None
+            point['x'] = np.empty(0) if cp is None else cp['x']
+            point['cp'] = np.empty(0) if cp is None else cp['Cp']
+            points.append(point)
+    return points
+
+
+def run_case(airfoil_file, alphas, re=0.0, mach=0.0, ncrit=9.0, xtr=(1.0, 1.0), binary=XFOIL_BINARY,
+             cache_dir=None, geometry=None):
+    """
+    Polar and Cp distributions of one case, from the cache where possible.
+
+    Only the alphas missing from the cache are sent to xfoil (in one session, so each
+    point starts from the previous solution); the new points are stored, converged or not.
+    Points xfoil did not reach before failing (see run_xfoil) are not stored, so the next
+    call computes them again.
+
+    Arguments:
+    airfoil_file : str
+        XFOIL coordinate file.
+    alphas : array-like
+        Angles of attack (degrees).
+    re : float
+        Reynolds number (0: inviscid).
+    mach, ncrit : float
+        Mach number and e^N amplification ratio.
+    xtr : tuple
+        Forced transition (x/c) on the (top, bottom) surface.
+    geometry : str or None
+        Geometry hash, if already computed.
+
+    Returns:
+    dict
+        'alpha', the POLAR_COLUMNS arrays, 'converged', 'cached' (point came from the cache),
+        'missing' (xfoil failed before the point, NaN and not cached), 'x' (Cp points of the first point with a Cp file) and 'cp' (n_alpha x n_points, NaN rows
+        where none was written).
+    """
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+    xtr = tuple(float(value) for value in xtr)
+    geometry = geometry_hash(airfoil_file) if geometry is None else geometry
+    keys = [point_key(geometry, re, mach, ncrit, xtr, alpha) for alpha in alphas]
+    points = [_read_point(key, cache_dir) for key in keys]
+    cached = np.array([point is not None for point in points])
+
+    missing = np.flatnonzero(~cached)
+    if len(missing):
+        computed = run_xfoil(airfoil_file, re, mach, ncrit, xtr, alphas[missing], binary)
+        for i, point in zip(missing, computed):
+            _write_point(keys[i], point, cache_dir)
+            points[i] = point
+    unreached = np.array([point is None for point in points])
+    for i in np.flatnonzero(unreached):
+        points[i] = dict({name: np.nan for name in POLAR_COLUMNS}, converged=False, x=np.empty(0), cp=np.empty(0))
+
+    result = {'alpha': alphas, 'cached': cached, 'missing': unreached,
+              'converged': np.array([bool(point['converged']) for point in points])}
+    for name in POLAR_COLUMNS:
+        result[name] = np.array([float(point[name]) for point in points])
+    x = next((point['x'] for point in points if len(point['x'])), np.empty(0))
+    result['x'] = x
+    result['cp'] = np.array([point['cp'] if len(point['cp']) == len(x) else np.full(len(x), np.nan)
+                             for point in points]).reshape(len(points), len(x))
+    return result
+
+
+def run_cases(airfoil_file, cases, alphas, workers=None, binary=XFOIL_BINARY, cache_dir=None):
+    """
+    Run independent cases concurrently, one xfoil process per case.
+
+    The work happens in the xfoil processes, so a thread per running case is enough to
+    keep all cores busy.
+
+    Arguments:
+    cases : list
+        Dicts with 're' and optionally 'mach', 'ncrit', 'xtr' (see run_case).
+    workers : int or None
+        Concurrent xfoil processes (default: one per CPU).
+
+    Yields:
+    tuple
+        (case, result of run_case or exception) as cases finish.
+    """
+    geometry = geometry_hash(airfoil_file)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {executor.submit(run_case, airfoil_file, alphas, binary=binary, cache_dir=cache_dir,
+                                   geometry=geometry, **case): case
+                   for case in cases}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except (OSError, ValueError, RuntimeError, subprocess.SubprocessError) as e:
+                yield futures[future], e
+
+
+def case_polar(result):
+    """Converged points of a run_case result as a structured polar array (for xfoil_io.format_polar)."""
+    names = ['alpha'] + POLAR_COLUMNS
+    polar = np.zeros(int(result['converged'].sum()), dtype=[(name, 'f8') for name in names])
+    for name in names:
+        polar[name] = result[name][result['converged']]
+    return polar
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run XFOIL alpha sweeps for several Re / Ncrit cases, with caching.")
+    parser.add_argument('--airfoil', default='XFOIL/SD6060-104-88_180.dat', help="XFOIL coordinate file")
+    parser.add_argument('--re', type=float, nargs='+', default=[2.5e5], help="Reynolds numbers (0: inviscid)")
+    parser.add_argument('--ncrit', type=float, nargs='+', default=[9.0], help="Ncrit values")
+    parser.add_argument('--mach', type=float, default=0.0, help="Mach number")
+    parser.add_argument('--xtr', type=float, nargs=2, default=[1.0, 1.0], metavar=('TOP', 'BOTTOM'),
+                        help="Forced transition x/c")
+    parser.add_argument('--alpha', type=float, nargs=3, default=[-6.0, 16.0, 0.5], metavar=('START', 'STOP', 'STEP'),
+                        help="Alpha sweep (degrees, inclusive)")
+    parser.add_argument('--binary', default=XFOIL_BINARY, help="xfoil command line")
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent xfoil processes (default: all CPUs)")
+    parser.add_argument('--out', default=None, help="Directory for one polar file per case")
+    args = parser.parse_args()
+
+    start, stop, step = args.alpha
+    alphas = np.round(np.arange(start, stop + step / 2.0, step), 6)
+    cases = [{'re': re, 'mach': args.mach, 'ncrit': ncrit, 'xtr': tuple(args.xtr)}
+             for re, ncrit in itertools.product(args.re, args.ncrit)]
+    name = read_airfoil(args.airfoil)[0]
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    for case, result in run_cases(args.airfoil, cases, alphas, args.workers, args.binary):
+        label = f"Re = {case['re']:.4g}, Ncrit = {case['ncrit']:g}"
+        if isinstance(result, Exception):
+            print(f"Error: {label}: {result}")
+            continue
+        print(f"{label}: {int(result['converged'].sum())} of {len(alphas)} points converged, "
+              f"{int(result['cached'].sum())} from the cache")
+        if result['missing'].any():
+            print(f"  xfoil failed before alpha = {result['alpha'][result['missing']][0]:g}, "
+                  f"{int(result['missing'].sum())} points not computed")
+        if args.out:
+            out_path = os.path.join(args.out, f"polar_re{case['re']:.4g}_n{case['ncrit']:g}.dat")
+            with open(out_path, 'w') as f:
+                f.write(format_polar(case_polar(result), name, case['re'], case['mach'], case['ncrit'], case['xtr']))
+            print(f"  -> {out_path}")
@@ -0,0 +1,227 @@
+import os
+import pickle
+import re
+
+import numpy as np
+
+# Default location of the bulk parse cache (see load_polars)
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'polars.pkl')
+
+# Bump when the parsed representation changes
+CACHE_VERSION = 1
+
+_NUMBER = r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?"
+_HEADER_PATTERNS = {
+    'mach': re.compile(rf"Mach\s*=\s*({_NUMBER})"),
+    're': re.compile(rf"Re\s*=\s*({_NUMBER})\s*e\s*([-+]?\d+)"),
+    'ncrit': re.compile(rf"Ncrit\s*=\s*({_NUMBER})"),
+    'xtrf': re.compile(rf"xtrf\s*=\s*({_NUMBER})\s*\(top\)\s*({_NUMBER})\s*\(bottom\)"),
+}
+
+
+def _structured(names, values):
+    """Turn an (n x len(names)) float array into a structured array with one field per column."""
+    table = np.zeros(len(values), dtype=[(name, 'f8') for name in names])
+    for column, name in enumerate(names):
+        table[name] = values[:, column]
+    return table
+
+
+def _parse_numbers(lines, n_columns):
+    # One split over the whole block is far faster than np.loadtxt's per-line parsing
+    values = np.array(' '.join(lines).split(), dtype=float)
+    return values.reshape(-1, n_columns)
+
+
+def parse_polar_header(lines):
+    """
+    Read the case description from the header lines of an XFOIL polar file.
+
+    Returns:
+    dict
+        'airfoil', 'mach', 're', 'ncrit', 'xtrf_top', 'xtrf_bottom' (missing entries are NaN / '').
+    """
+    header = {'airfoil': '', 'mach': np.nan, 're': np.nan, 'ncrit': np.nan, 'xtrf_top': np.nan, 'xtrf_bottom': np.nan}
+    for line in lines:
+        if 'polar for:' in line:
+            header['airfoil'] = line.split('polar for:', 1)[1].strip()
+        for key, pattern in _HEADER_PATTERNS.items():
+            match = pattern.search(line)
+            if not match:
+                continue
+            if key == 're':
+                header['re'] = float(match.group(1)) * 10.0 ** int(match.group(2))
+            elif key == 'xtrf':
+                header['xtrf_top'], header['xtrf_bottom'] = float(match.group(1)), float(match.group(2))
+            else:
+                header[key] = float(match.group(1))
+    return header
+
+
+def read_polar(file_path):
+    """
+    Parse an XFOIL polar file (PACC output).
+
+    The header block is found from the '-------' line under the column names rather than
+    from a fixed number of rows, so files from other XFOIL versions (and extra columns) work.
+
+    Arguments:
+    file_path : str
+        Polar file.
+
+    Returns:
+    tuple
+        (header, polar): header as returned by parse_polar_header, polar as a structured array
+        with one field per column ('alpha', 'CL', 'CD', 'CDp', 'CM', 'Top_Xtr', 'Bot_Xtr', ...).
+    """
+    with open(file_path) as f:
+        lines = f.read().splitlines()
+
+    separator = next((i for i, line in enumerate(lines) if line.strip().startswith('---')), None)
+    if separator is None or separator == 0:
+        raise ValueError(f"{file_path}: no '-------' line found under the polar column names")
+
+    names = lines[separator - 1].split()
+    data_lines = [line for line in lines[separator + 1:] if line.strip()]
+    return parse_polar_header(lines[:separator - 1]), _structured(names, _parse_numbers(data_lines, len(names)))
+
+
+def read_cp(file_path):
+    """
+    Parse an XFOIL Cp file (CPWR output) or a Cp file in the same format.
+
+    All leading '#' lines are header; the last one names the columns ('x Cp' or 'x y Cp').
+    'key = value' pairs in the other header lines (e.g. alfa, Re in newer XFOIL versions)
+    are returned in the header.
+
+    Returns:
+    tuple
+        (header, cp): header as a dict of floats, cp as a structured array ('x', 'Cp', maybe 'y').
+    """
+    with open(file_path) as f:
+        lines = f.read().splitlines()
+
+    n_header = 0
+    while n_header < len(lines) and lines[n_header].lstrip().startswith('#'):
+        n_header += 1
+    if n_header == 0:
+        raise ValueError(f"{file_path}: no '#' header line with the Cp column names")
+
+    header = {}
+    for line in lines[:n_header - 1]:
+        for key, value in re.findall(rf"(\w+)\s*=\s*({_NUMBER})", line):
+            header[key.lower()] = float(value)
+    names = lines[n_header - 1].lstrip('#').split()
+    data_lines = [line for line in lines[n_header:] if line.strip()]
+    return header, _structured(names, _parse_numbers(data_lines, len(names)))
+
+
+def read_airfoil(file_path):
+    """
+    Parse an XFOIL airfoil coordinate file (name line followed by x y pairs).
+
+    Returns:
+    tuple
+        (name, x, z) with the coordinates as NumPy arrays in file order.
+    """
+    with open(file_path) as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    values = _parse_numbers(lines[1:], 2)
+    return lines[0].strip(), values[:, 0], values[:, 1]
+
+
+def _read_any(file_path):
+    if file_path.lower().endswith('.cp'):
+        return read_cp(file_path)
+    return read_polar(file_path)
+
+
+def load_polars(file_paths, cache_file=CACHE_FILE):
+    """
+    Bulk-load many XFOIL polar (and .cp) files through one on-disk parse cache.
+
+    The cache holds every parsed file keyed by absolute path and is validated per file
+    against mtime and size, so only new or changed files are parsed.
+
+    Arguments:
+    file_paths : list
+        Polar / Cp files.
+    cache_file : str or None
+        Cache file (None: no caching).
+
+    Returns:
+    dict
+        file path -> (header, structured array), in the order given. Files that could not be
+        parsed map to the exception raised.
+    """
+    cache = {}
+    if cache_file is not None and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                version, cache = pickle.load(f)
+            if version != CACHE_VERSION:
+                cache = {}
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            cache = {}
+
+    results = {}
+    changed = False
+    for file_path in file_paths:
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(file_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if key in cache and cache[key][0] == signature:
+                results[file_path] = cache[key][1]
+                continue
+            parsed = _read_any(file_path)
+        except (OSError, ValueError) as e:
+            results[file_path] = e
+            continue
+        cache[key] = (signature, parsed)
+        results[file_path] = parsed
+        changed = True
+
+    if cache_file is not None and changed:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((CACHE_VERSION, cache), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_file)
+    return results
+
+
+def format_polar(polar, airfoil='', re=0.0, mach=0.0, ncrit=9.0, xtr=(1.0, 1.0)):
+    """
+    Text of an XFOIL polar file (PACC layout) for a structured polar array, readable by read_polar.
+
+    Arguments:
+    polar : np.ndarray
+        Structured array with one field per column ('alpha', 'CL', 'CD', ...).
+    airfoil, re, mach, ncrit, xtr :
+        Case description written to the header (xtr as (top, bottom)).
+    """
+    names = polar.dtype.names
+    lines = [
+        "       XFOIL         Version 6.99",
+        "",
+        f" Calculated polar for: {airfoil}",
+        "",
+        " 1 1 Reynolds number fixed          Mach number fixed",
+        "",
+        f" xtrf = {xtr[0]:7.3f} (top) {xtr[1]:12.3f} (bottom)",
+        f" Mach = {mach:7.3f}     Re = {re / 1e6:9.3f} e 6     Ncrit = {ncrit:7.3f}",
+        "",
+        "  " + " ".join(f"{name:>9}" for name in names),
+        "  " + " ".join("-" * 9 for _ in names),
+    ]
+    for row in polar:
+        lines.append("  " + " ".join(f"{row[name]:9.5f}" for name in names))
+    return "\n".join(lines) + "\n"
+
+
+def format_cp(x, cp, alpha=None):
+    """Text of an XFOIL Cp file (CPWR layout, 'x Cp' columns), readable by read_cp."""
+    header = [] if alpha is None else [f"#  alfa = {alpha:.5f}"]
+    lines = header + ["#    x        Cp  "] + [f"{xi:10.5f}{cpi:10.5f}" for xi, cpi in zip(x, cp)]
+    return "\n".join(lines) + "\n"